@@ -4,34 +4,34 @@ st.set_page_config(page_title="Análise de Comércio Exterior", layout="wide")
 
 import pandas as pd
 from io import BytesIO
-from babel.numbers import format_decimal
+import os
 import re
-from PyPDF2 import PdfReader
+import datetime
 import logging
-import plotly.graph_objects as go
+import threading
 import requests
 
 # ====== Importações dos módulos existentes ======
+# Plotly, PyPDF2 e os módulos de gráficos ficam fora daqui: são importados
+# no primeiro uso, para a página inicial abrir sem carregá-los.
 try:
     from modulos.api_comex import (
         obter_data_ultima_atualizacao,
-        obter_descricao_ncm,
-        obter_dados_comerciais,
-        obter_dados_comerciais_ano_anterior,
-        obter_dados_comerciais_ano_atual,
-        obter_dados_2024_por_pais,
-        obter_dados_2024_por_pais_export
+        obter_descricao_ncm
     )
     import modulos.processamento as proc
-    import modulos.grafico_importacoes_kg as graf_kg
-    import modulos.grafico_exportacoes_kg as graf_exp
-    import modulos.grafico_importacoes_fob as graf_fob
-    import modulos.grafico_exportacoes_fob as graf_exp_fob
-    import modulos.grafico_preco_medio_fob as graf_preco_medio
-    import modulos.resumo_tabelas as resumo_tabelas  # Função exibir_resumos precisa aceitar args
-    from modulos.grafico_treemap_import import gerar_treemap_importacoes_2024
-    from modulos.grafico_treemap_export import gerar_treemap_exportacoes_2024
-    from modulos.grafico_importacoes_12meses import gerar_grafico_importacoes_12meses  # Verificar retorno
+    import modulos.config as config
+    from modulos.planilha_cgim import MonitorPlanilha
+    from modulos.extracao_pdf import iterar_ncms_pdf
+    import modulos.cache_pdf as cache_pdf
+    import modulos.historico_pautas as historico_pautas
+    from modulos.cache_figuras import cache_figuras
+    from modulos.cache_compartilhado import cache_compartilhado
+    from modulos.fila_analises import fila_analises, versao_dados, GRAFICOS_DESEMPENHO, gerar_grafico_desempenho
+    from modulos.visao_geral_pauta import colunas_visao_geral, montar_visao_geral
+    from modulos.formatacao import formatar_decimal
+    from modulos.instrumentacao import medido, rastreando, rastro_atual
+    from modulos.perfilamento import perfilando
 except ImportError as e:
     st.error(f"Erro fatal ao importar módulos: {e}. Verifique se os arquivos existem nos caminhos corretos ('modulos/...') e se não há erros de sintaxe neles.")
     logging.critical(f"Erro de importação: {e}", exc_info=True)
@@ -83,31 +83,68 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# ---- Carrega a Planilha Excel Automaticamente do GitHub ----
+# ---- Carrega a Planilha Excel (cópia local monitorada ou GitHub) ----
+@st.cache_resource
+def obter_monitor_planilha(caminho):
+    """Um único monitor por processo: todas as sessões compartilham a mesma planilha em memória."""
+    return MonitorPlanilha(caminho).iniciar()
+
 excel_url = "https://github.com/rdzomer/Ficha-NCM/raw/refs/heads/main/20241011_NCMs-CGIM-DINTE.xlsx"
-try:
+_PLANILHA_LOCAL = "local"
+
+def _baixar_planilha_github():
     response = requests.get(excel_url)
     response.raise_for_status()  # Levanta erro se a resposta não for 200
     excel_bytes = BytesIO(response.content)
-    st.session_state.df_excel = proc.carregar_dados_excel(excel_bytes)
+    dados = proc.carregar_dados_excel(excel_bytes)
     logging.info("Planilha Excel carregada com sucesso a partir do GitHub.")
-except Exception as e:
-    st.error("Erro ao carregar a planilha Excel do GitHub: " + str(e))
-    logging.error("Erro ao carregar a planilha Excel do GitHub: " + str(e), exc_info=True)
+    return dados
+
+@medido
+def dados_planilha():
+    """Planilha CGIM estruturada (dict de DataFrames) compartilhada entre as sessões, ou None."""
+    chave = st.session_state.get("chave_planilha")
+    if chave is None:
+        return None
+    if chave == _PLANILHA_LOCAL:
+        return obter_monitor_planilha(config.PLANILHA_CGIM_LOCAL).dados()
+    return cache_compartilhado.obter("planilha", chave)
+
+# A sessão guarda só a chave da planilha; os DataFrames ficam uma única vez no processo
+if config.PLANILHA_CGIM_LOCAL:
+    try:
+        obter_monitor_planilha(config.PLANILHA_CGIM_LOCAL)
+        st.session_state.chave_planilha = _PLANILHA_LOCAL
+    except Exception as e:
+        st.error("Erro ao carregar a planilha Excel local: " + str(e))
+        logging.error("Erro ao carregar a planilha Excel local: " + str(e), exc_info=True)
+else:
+    try:
+        # Baixada uma vez por processo (e de novo após o TTL), não a cada execução do script
+        cache_compartilhado.obter_ou_calcular("planilha", excel_url, _baixar_planilha_github, ttl=config.TTL_PLANILHA_GITHUB)
+        st.session_state.chave_planilha = excel_url
+    except Exception as e:
+        st.error("Erro ao carregar a planilha Excel do GitHub: " + str(e))
+        logging.error("Erro ao carregar a planilha Excel do GitHub: " + str(e), exc_info=True)
+
+@st.cache_resource
+def obter_preaquecedor():
+    """Um único pré-aquecedor por processo: aquece o cache compartilhado a cada divulgação do ComexStat."""
+    from modulos.preaquecimento import PreAquecedor, ncms_cgim
+    if config.PLANILHA_CGIM_LOCAL:
+        carregar = obter_monitor_planilha(config.PLANILHA_CGIM_LOCAL).dados
+    else:
+        carregar = lambda: cache_compartilhado.obter_ou_calcular("planilha", excel_url, _baixar_planilha_github,
+                                                                 ttl=config.TTL_PLANILHA_GITHUB)
+    return PreAquecedor(lambda: ncms_cgim(carregar())).iniciar()
+
+if config.PREAQUECIMENTO_ATIVO:
+    obter_preaquecedor()
 
 # ------------------------
 # FUNÇÕES AUXILIARES
 # ------------------------
 
-def formatar_numero(valor):
-    """Formata número para o padrão brasileiro, tratando erros."""
-    if pd.isna(valor):
-        return ""  # Retorna string vazia para NaN ou None
-    try:
-        return format_decimal(float(valor), format="#,##0.##", locale='pt_BR')
-    except (ValueError, TypeError):
-        return str(valor)
-
 def criar_dataframe_resumido(df):
     """Cria um DataFrame com colunas específicas para resumo."""
     if not isinstance(df, pd.DataFrame) or df.empty:
@@ -135,6 +172,7 @@ def criar_dataframe_resumido(df):
     logging.info(f"Criando DataFrame resumido com colunas: {colunas_existentes_no_df}")
     return df[colunas_existentes_no_df].copy()
 
+@medido
 def exibir_dados(df, periodo, error, resumido=False):
     """Exibe um DataFrame formatado no Streamlit, com tratamento de erros."""
     st.markdown(f"#### {periodo}")
@@ -181,7 +219,7 @@ def exibir_dados(df, periodo, error, resumido=False):
                          if col not in colunas_excluir_formatacao and pd.api.types.is_numeric_dtype(df_para_exibir[col])]
     if colunas_numericas:
         try:
-            df_formatado[colunas_numericas] = df_formatado[colunas_numericas].apply(lambda col: col.map(formatar_numero))
+            df_formatado[colunas_numericas] = df_formatado[colunas_numericas].apply(formatar_decimal)
             logging.info(f"Formatação numérica aplicada às colunas: {colunas_numericas} para '{periodo}'.")
         except Exception as e:
              logging.error(f"Erro ao aplicar formatação numérica para '{periodo}': {e}", exc_info=True)
@@ -194,6 +232,7 @@ def exibir_dados(df, periodo, error, resumido=False):
     )
 
 
+@medido
 def exibir_comparativo(
     df_2024_parcial,
     df_2025_parcial,
@@ -249,43 +288,12 @@ def exibir_comparativo(
     exibir_dados(df_comparativo, "Comparativo Agregado", None, resumido)
 
 
-def obter_dados_tuple(ncm_code, tipo, last_updated_month):
-    """
-    Busca dados de exportação e importação da API Comex usando funções cacheadas.
-    Retorna (dados_export, dados_import, erro_exp, erro_imp).
-    """
-    logging.info(f"Obtendo dados tipo '{tipo}' para NCM {ncm_code}, mês {last_updated_month}...")
-    dados_export, dados_import = [], []
-    erro_exp, erro_imp = None, None
-    try:
-        if tipo == "historico_anual":
-            dados_export, erro_exp = obter_dados_comerciais(ncm_code, "export")
-            dados_import, erro_imp = obter_dados_comerciais(ncm_code, "import")
-        elif tipo == "2024_parcial":
-            dados_export, erro_exp = obter_dados_comerciais_ano_anterior(ncm_code, "export", last_updated_month)
-            dados_import, erro_imp = obter_dados_comerciais_ano_anterior(ncm_code, "import", last_updated_month)
-        elif tipo == "2025_parcial":
-            dados_export, erro_exp = obter_dados_comerciais_ano_atual(ncm_code, "export", last_updated_month)
-            dados_import, erro_imp = obter_dados_comerciais_ano_atual(ncm_code, "import", last_updated_month)
-        else:
-            erro_msg = f"Tipo de dados '{tipo}' inválido solicitado."
-            erro_exp, erro_imp = erro_msg, erro_msg
-            logging.error(erro_msg)
-        log_msg = f"Busca tipo '{tipo}' para NCM {ncm_code}: "
-        log_msg += f"Exp: {len(dados_export) if isinstance(dados_export, list) else 'Erro/Inválido'} regs (Erro: {erro_exp}), "
-        log_msg += f"Imp: {len(dados_import) if isinstance(dados_import, list) else 'Erro/Inválido'} regs (Erro: {erro_imp})"
-        logging.info(log_msg)
-    except Exception as e:
-        logging.error(f"Erro inesperado em obter_dados_tuple para tipo '{tipo}', NCM {ncm_code}: {e}", exc_info=True)
-        erro_exp = erro_exp or f"Erro inesperado na busca: {e}"
-        erro_imp = erro_imp or f"Erro inesperado na busca: {e}"
-    dados_export = dados_export if isinstance(dados_export, list) else []
-    dados_import = dados_import if isinstance(dados_import, list) else []
-    return dados_export, dados_import, erro_exp, erro_imp
-
+@st.fragment
+@medido
 def exibir_excel(ncm_code):
     """Exibe informações do NCM buscadas no arquivo Excel carregado."""
-    if "df_excel" not in st.session_state or not isinstance(st.session_state.df_excel, dict) or not st.session_state.df_excel:
+    dados_excel = dados_planilha()
+    if not isinstance(dados_excel, dict) or not dados_excel:
         logging.info("Dados estruturados do Excel não carregados ou ausentes no session_state. Pulando exibição do Excel.")
         st.info("Planilha Excel da CGIM não está disponível.")
         return
@@ -294,7 +302,7 @@ def exibir_excel(ncm_code):
     resultado_entidades = pd.DataFrame()
     try:
         logging.info(f"Chamando proc.buscar_informacoes_ncm_completo para NCM: {ncm_code}")
-        resultado_ncm, resultado_entidades = proc.buscar_informacoes_ncm_completo(st.session_state.df_excel, ncm_code)
+        resultado_ncm, resultado_entidades = proc.buscar_informacoes_ncm_completo(dados_excel, ncm_code)
         logging.info(f"Resultado NCM (tipo): {type(resultado_ncm)}, Vazio?: {resultado_ncm.empty if isinstance(resultado_ncm, pd.DataFrame) else 'N/A'}")
         if isinstance(resultado_ncm, pd.DataFrame) and not resultado_ncm.empty:
             logging.info(f"Resultado NCM (colunas): {resultado_ncm.columns.tolist()}")
@@ -358,54 +366,113 @@ def exibir_excel(ncm_code):
         else:
             st.info(f"Não há informações de entidades associadas ao NCM {ncm_code} na planilha.")
 
+# ---- Camada de dados da página de detalhe ----
+# A busca e o processamento rodam na fila de análises (modulos/fila_analises.py),
+# fora do script. Cada seção da página (tabelas, cada gráfico, cada treemap) é
+# um fragmento que lê do resultado compartilhado da tarefa apenas os dados de
+# que depende, então um widget reexecuta só o seu fragmento, sem nova busca.
+# O resultado é fixado na sessão uma vez por execução completa do script
+# (fixar_resultado_analise): com a API em erro, os fragmentos não disparam
+# cada um a sua nova tentativa.
+
+_SERIES_INDISPONIVEIS = {
+    "df_hist_anual": None, "df_2024_parcial": None, "df_2025_parcial": None,
+    "error_hist": "Análise do NCM indisponível.", "error_2024_parcial": "Análise do NCM indisponível.",
+    "error_2025_parcial": "Análise do NCM indisponível.", "erro_processamento": None,
+}
+
+def fixar_resultado_analise(ncm_code, last_updated_month, last_updated_year, resultado):
+    """Fixa o resultado lido nesta execução do script; os fragmentos o reutilizam ao reexecutar."""
+    st.session_state.analise_exibida = ((ncm_code, last_updated_month, last_updated_year), resultado)
+
+def _resultado_analise(ncm_code, last_updated_month=None):
+    """Resultado fixado nesta execução ou, na falta dele, o da tarefa do NCM na fila (aguarda, se preciso)."""
+    chave = (ncm_code, last_updated_month or st.session_state.last_updated_month, st.session_state.last_updated_year)
+    fixado = st.session_state.get("analise_exibida")
+    if fixado is not None and fixado[0] == chave:
+        return fixado[1]
+    resultado = fila_analises.resultado(*chave)
+    fixar_resultado_analise(*chave, resultado)
+    return resultado
+
+@medido
+def carregar_series_api(ncm_code, last_updated_month):
+    """Séries processadas (anual, 2024 e 2025 parciais) e respectivos erros."""
+    resultado = _resultado_analise(ncm_code, last_updated_month)
+    return resultado["series"] if resultado else _SERIES_INDISPONIVEIS
+
+def obter_dados_por_pais(ncm_code, tipo_flow):
+    """Dados de 2024 por país ('import' ou 'export') usados nos treemaps."""
+    resultado = _resultado_analise(ncm_code)
+    return resultado["dados_pais"].get(tipo_flow) if resultado else None
+
+def _versao_dados():
+    """Versão da base ComexStat usada nas figuras (ano-mês da última atualização)."""
+    return versao_dados(st.session_state.last_updated_year, st.session_state.last_updated_month)
+
+@st.fragment(run_every=1)
+def exibir_andamento_analise(ncm_code, last_updated_month, last_updated_year):
+    """Acompanha a tarefa do NCM na fila; ao terminar, reexecuta a página para exibi-la."""
+    tarefa = fila_analises.obter(ncm_code, last_updated_month, last_updated_year)
+    if tarefa is None or tarefa.concluida:
+        st.rerun()
+    st.progress(tarefa.progresso, text=f"{tarefa.etapa}...")
+
+def _montar_treemap(ncm_code, ncm_formatado, tipo_flow, tipo_str, func_gerar_grafico):
+    """Busca os dados por país e monta o Treemap; retorna None (com aviso na tela) se não houver figura."""
+    dados = obter_dados_por_pais(ncm_code, tipo_flow)
+    logging.info(f"Dados brutos obtidos para Treemap {tipo_flow} NCM {ncm_code}: Tipo {type(dados)}, Conteúdo inicial: {str(dados)[:200]}...")
+    if not isinstance(dados, list) or not dados:
+        st.info(f"Nenhum dado de {tipo_str} 2024 por país disponível para gerar o Treemap (NCM: {ncm_formatado}).")
+        logging.info(f"Dados vazios, None ou tipo inválido ({type(dados)}) para Treemap {tipo_flow} NCM {ncm_code}.")
+        return None
+    df_treemap = pd.DataFrame(dados)
+    colunas_necessarias = ["country", "metricFOB"]
+    if not all(col in df_treemap.columns for col in colunas_necessarias):
+        st.warning(f"Os dados de {tipo_str} por país retornados não possuem as colunas esperadas ({', '.join(colunas_necessarias)}).")
+        logging.warning(f"Colunas ausentes para Treemap {tipo_flow} NCM {ncm_code}. Colunas presentes: {df_treemap.columns.tolist()}")
+        return None
+    df_treemap['metricFOB'] = pd.to_numeric(df_treemap['metricFOB'], errors='coerce').fillna(0)
+    if df_treemap.empty or df_treemap['metricFOB'].sum() <= 0:
+         st.info(f"Dados de {tipo_str} 2024 por país estão vazios ou zerados para o Treemap (NCM: {ncm_formatado}).")
+         logging.info(f"DataFrame vazio ou métrica zerada/negativa para Treemap {tipo_flow} NCM {ncm_code}.")
+         return None
+    fig = func_gerar_grafico(df_treemap, ncm_code, ncm_formatado)
+    import plotly.graph_objects as go
+    if not isinstance(fig, go.Figure):
+         st.warning(f"Não foi possível gerar o gráfico Treemap de {tipo_str}.")
+         logging.warning(f"Função 'gerar_treemap..._{tipo_str}_2024' não retornou uma figura Plotly válida para NCM {ncm_code}.")
+         return None
+    return fig
+
+@st.fragment
+@medido
 def exibir_treemap(ncm_code, ncm_formatado, tipo_flow):
     """Busca dados e exibe o Treemap de importações ou exportações de 2024 por país."""
     titulo = f"📊 Treemap - {'Origem Importações' if tipo_flow == 'import' else 'Destino Exportações'} 2024 (US$ FOB)"
     st.subheader(titulo)
-    dados = None
     func_gerar_grafico = None
     tipo_str = ""
     try:
         if tipo_flow == 'import':
             tipo_str = "importações"
+            from modulos.grafico_treemap_import import gerar_treemap_importacoes_2024
             func_gerar_grafico = gerar_treemap_importacoes_2024
-            dados = obter_dados_2024_por_pais(ncm_code)
-            logging.info(f"Dados brutos obtidos para Treemap {tipo_flow} NCM {ncm_code}: Tipo {type(dados)}, Conteúdo inicial: {str(dados)[:200]}...")
         elif tipo_flow == 'export':
             tipo_str = "exportações"
+            from modulos.grafico_treemap_export import gerar_treemap_exportacoes_2024
             func_gerar_grafico = gerar_treemap_exportacoes_2024
-            dados = obter_dados_2024_por_pais_export(ncm_code)
-            logging.info(f"Dados brutos obtidos para Treemap {tipo_flow} NCM {ncm_code}: Tipo {type(dados)}, Conteúdo inicial: {str(dados)[:200]}...")
         else:
             st.error("Tipo de fluxo inválido para Treemap.")
             logging.error(f"Tipo de fluxo inválido '{tipo_flow}' para Treemap.")
             return
-        if not isinstance(dados, list) or not dados:
-            st.info(f"Nenhum dado de {tipo_str} 2024 por país disponível para gerar o Treemap (NCM: {ncm_formatado}).")
-            logging.info(f"Dados vazios, None ou tipo inválido ({type(dados)}) para Treemap {tipo_flow} NCM {ncm_code}.")
-            return
-        df_treemap = pd.DataFrame(dados)
-        colunas_necessarias = ["country", "metricFOB"]
-        if not all(col in df_treemap.columns for col in colunas_necessarias):
-            st.warning(f"Os dados de {tipo_str} por país retornados não possuem as colunas esperadas ({', '.join(colunas_necessarias)}).")
-            logging.warning(f"Colunas ausentes para Treemap {tipo_flow} NCM {ncm_code}. Colunas presentes: {df_treemap.columns.tolist()}")
-            return
-        df_treemap['metricFOB'] = pd.to_numeric(df_treemap['metricFOB'], errors='coerce').fillna(0)
-        if df_treemap.empty or df_treemap['metricFOB'].sum() <= 0:
-             st.info(f"Dados de {tipo_str} 2024 por país estão vazios ou zerados para o Treemap (NCM: {ncm_formatado}).")
-             logging.info(f"DataFrame vazio ou métrica zerada/negativa para Treemap {tipo_flow} NCM {ncm_code}.")
-             return
-        if func_gerar_grafico is None:
-             st.error(f"Erro interno: Função para gerar gráfico de {tipo_str} não definida.")
-             logging.error(f"func_gerar_grafico é None para tipo {tipo_flow}")
-             return
-        fig = func_gerar_grafico(df_treemap, ncm_code, ncm_formatado)
-        if isinstance(fig, go.Figure):
+        fig = cache_figuras.obter_ou_gerar(
+            f"treemap_{tipo_flow}", ncm_code, _versao_dados(),
+            lambda: _montar_treemap(ncm_code, ncm_formatado, tipo_flow, tipo_str, func_gerar_grafico)
+        )
+        if fig is not None:
              st.plotly_chart(fig, use_container_width=True)
              logging.info(f"Treemap de {tipo_str} exibido para NCM {ncm_code}.")
-        else:
-             st.warning(f"Não foi possível gerar o gráfico Treemap de {tipo_str}.")
-             logging.warning(f"Função 'gerar_treemap..._{tipo_str}_2024' não retornou uma figura Plotly válida para NCM {ncm_code}.")
     except ImportError as e:
          st.error(f"Erro: Módulo ou função para gerar Treemap de {tipo_str} não importado(a) corretamente: {e}")
          logging.error(f"ImportError ao tentar gerar Treemap {tipo_flow} para NCM {ncm_code}.", exc_info=True)
@@ -419,46 +486,47 @@ def exibir_treemap(ncm_code, ncm_formatado, tipo_flow):
         st.error(f"Erro inesperado ao gerar Treemap de {tipo_str}: {e}")
         logging.error(f"Erro INESPERADO na função exibir_treemap ({tipo_flow}, NCM {ncm_code}): {e}", exc_info=True)
 
-def exibir_api(ncm_code, last_updated_month, last_updated_year):
-    """Orquestra a busca e exibição de dados e gráficos da API Comex."""
-    st.subheader("📊 Dados da API Comex e Gráficos")
+@medido
+def exibir_resumos(df_hist_anual, df_2024_parcial, df_2025_parcial, last_updated_month):
+    """Exibe os quadros-resumo de importações e exportações lado a lado."""
+    from modulos.resumo_tabelas import montar_resumos, formatar_resumo
+    resumos = montar_resumos(df_hist_anual, df_2024_parcial, df_2025_parcial, last_updated_month)
+    if resumos is None:
+        st.warning("Dados históricos não disponíveis.")
+        return
+    df_imp_final, df_exp_final = (formatar_resumo(df) for df in resumos)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### 📊 Quadro Resumo das Importações")
+        st.dataframe(df_imp_final.style.set_properties(**{'text-align': 'left'}),
+                     use_container_width=True, hide_index=True)
+
+    with col2:
+        st.markdown("### 📊 Quadro Resumo das Exportações")
+        st.dataframe(df_exp_final.style.set_properties(**{'text-align': 'left'}),
+                     use_container_width=True, hide_index=True)
+
+@st.fragment
+@medido
+def exibir_tabelas_api(ncm_code, last_updated_month):
+    """Tabelas históricas, comparativas e quadros-resumo (o checkbox reexecuta só este trecho)."""
     exibir_resumida = st.checkbox("Exibir tabelas comparativas resumidas", key="chk_resumida", value=True)
-    dados_export_hist, dados_import_hist, err_exp_hist, err_imp_hist = obter_dados_tuple(ncm_code, "historico_anual", last_updated_month)
-    dados_export_24p, dados_import_24p, err_exp_24p, err_imp_24p = obter_dados_tuple(ncm_code, "2024_parcial", last_updated_month)
-    dados_export_25p, dados_import_25p, err_exp_25p, err_imp_25p = obter_dados_tuple(ncm_code, "2025_parcial", last_updated_month)
-    df_hist_anual, df_2024_parcial, df_2025_parcial = None, None, None
-    error_hist, error_2024_parcial, error_2025_parcial = None, None, None
-    try:
-        df_hist_anual, error_hist_proc = proc.processar_dados_export_import(dados_export_hist, dados_import_hist, last_updated_month)
-        periodo_hist = "Série Temporal (Anual)"
-        error_hist = error_hist_proc or err_exp_hist or err_imp_hist
-        df_2024_parcial, error_2024_proc = proc.processar_dados_ano_anterior(dados_export_24p, dados_import_24p, last_updated_month)
-        periodo_2024_parcial = f"2024 (Jan a {last_updated_month:02d})"
-        error_2024_parcial = error_2024_proc or err_exp_24p or err_imp_24p
-        df_2025_parcial, error_2025_proc = proc.processar_dados_ano_atual(dados_export_25p, dados_import_25p, last_updated_month)
-        periodo_2025_parcial = f"2025 (Jan a {last_updated_month:02d})"
-        error_2025_parcial = error_2025_proc or err_exp_25p or err_imp_25p
-    except AttributeError as e:
-         st.error(f"Erro: Uma função de processamento não foi encontrada no módulo 'processamento': {e}.")
-         logging.error(f"Erro de atributo no módulo 'proc' durante processamento API: {e}", exc_info=True)
-         error_hist = error_hist or f"Erro de processamento: {e}"
-         error_2024_parcial = error_2024_parcial or f"Erro de processamento: {e}"
-         error_2025_parcial = error_2025_parcial or f"Erro de processamento: {e}"
-    except Exception as e:
-         st.error(f"Erro inesperado durante o processamento dos dados da API: {e}")
-         logging.error(f"Erro inesperado no processamento dos dados da API: {e}", exc_info=True)
-         error_hist = error_hist or f"Erro inesperado de processamento: {e}"
-         error_2024_parcial = error_2024_parcial or f"Erro inesperado de processamento: {e}"
-         error_2025_parcial = error_2025_parcial or f"Erro inesperado de processamento: {e}"
+    series = carregar_series_api(ncm_code, last_updated_month)
+    if series["erro_processamento"]:
+        st.error(series["erro_processamento"])
+    df_hist_anual = series["df_hist_anual"]
+    df_2024_parcial = series["df_2024_parcial"]
+    df_2025_parcial = series["df_2025_parcial"]
     with st.container(border=True):
         st.markdown("##### Dados Históricos e Comparativos")
-    exibir_dados(df_hist_anual, periodo_hist, error_hist, resumido=False)
+    exibir_dados(df_hist_anual, "Série Temporal (Anual)", series["error_hist"], resumido=False)
     st.divider()
     exibir_comparativo(
         df_2024_parcial,
         df_2025_parcial,
-        error_2024_parcial,
-        error_2025_parcial,
+        series["error_2024_parcial"],
+        series["error_2025_parcial"],
         exibir_resumida,
         st.session_state.last_updated_month
     )
@@ -466,130 +534,112 @@ def exibir_api(ncm_code, last_updated_month, last_updated_year):
         df_24_valido = isinstance(df_2024_parcial, pd.DataFrame) and not df_2024_parcial.empty
         df_25_valido = isinstance(df_2025_parcial, pd.DataFrame) and not df_2025_parcial.empty
         if df_24_valido and df_25_valido:
-             resumo_tabelas.exibir_resumos(
+             exibir_resumos(
                 df_hist_anual,
                 df_2024_parcial,
-            df_2025_parcial,
-            st.session_state.last_updated_month
-    )
-
+                df_2025_parcial,
+                st.session_state.last_updated_month
+             )
              logging.info("Quadros-resumo exibidos.")
         else:
              st.info("Não foi possível exibir os quadros-resumo (dados parciais ausentes ou inválidos).")
              logging.warning(f"Quadros-resumo pulados. DF24 válido: {df_24_valido}, DF25 válido: {df_25_valido}")
-    except TypeError as e:
-         if "positional arguments but" in str(e):
-              st.error("Erro: A função 'exibir_resumos' no módulo 'resumo_tabelas' não está configurada para receber os dados necessários.")
-              logging.error(f"TypeError em resumo_tabelas.exibir_resumos: {e}.", exc_info=True)
-         else:
-              st.warning(f"Erro ao chamar a função de quadros-resumo: {e}")
-              logging.warning(f"Falha ao chamar resumo_tabelas.exibir_resumos: {e}", exc_info=True)
-    except AttributeError as e:
-         st.warning(f"Função 'exibir_resumos' não encontrada ou erro no módulo 'resumo_tabelas': {e}")
-         logging.warning(f"Falha ao chamar resumo_tabelas.exibir_resumos: {e}", exc_info=True)
     except Exception as e:
         st.warning(f"Não foi possível exibir os quadros-resumo: {e}")
-        logging.warning(f"Falha ao chamar resumo_tabelas.exibir_resumos: {e}", exc_info=True)
+        logging.warning(f"Falha ao exibir os quadros-resumo: {e}", exc_info=True)
+
+@st.fragment
+@medido
+def exibir_grafico_desempenho(chave, ncm_code, ncm_formatado, last_updated_month, last_updated_year):
+    """Exibe um dos gráficos anuais de GRAFICOS_DESEMPENHO (depende das séries anual e 2024 parcial)."""
+    titulo, modulo, nome_funcao, _ = GRAFICOS_DESEMPENHO[chave]
+    try:
+        st.markdown(f"##### {titulo}")
+        # Em geral a figura já foi montada pela fila; gerar só roda após descarte do cache
+        fig = cache_figuras.obter_ou_gerar(
+            chave, ncm_code, _versao_dados(),
+            lambda: gerar_grafico_desempenho(chave, carregar_series_api(ncm_code, last_updated_month),
+                                             ncm_formatado, last_updated_month, last_updated_year)
+        )
+        import plotly.graph_objects as go
+        if isinstance(fig, go.Figure):
+             st.plotly_chart(fig, use_container_width=True)
+        else:
+             st.warning(f"Gráfico de {titulo} não pôde ser gerado.")
+    except AttributeError as e:
+         st.error(f"Erro: Função '{nome_funcao}' não encontrada em '{modulo}': {e}")
+         logging.error(f"Erro de atributo em {modulo}.{nome_funcao}: {e}", exc_info=True)
+    except Exception as e:
+         st.error(f"Erro ao gerar gráfico de {titulo}: {e}")
+         logging.error(f"Erro em {nome_funcao}: {e}", exc_info=True)
+
+@st.fragment
+@medido
+def exibir_grafico_12meses(ncm_code, ncm_formatado):
+    """
+    Exibe o gráfico de importações acumuladas em 12 meses (série mensal própria).
+    Com "Série completa", busca desde 1997: a série longa vira linha WebGL reduzida.
+    """
+    try:
+        st.markdown("##### Importações Acumuladas (12 Meses - KG)")
+        serie_completa = st.toggle("Série completa (desde 1997)", key="tgl_12m_completa")
+        import plotly.graph_objects as go
+        from modulos.grafico_importacoes_12meses import gerar_grafico_importacoes_12meses
+        versao = _versao_dados()
+        # Sem opções, a chave é a mesma da figura padrão montada pela fila
+        opcoes = {"inicio": "1997-01"} if serie_completa else {}
+        fig_12m = cache_figuras.obter_ou_gerar(
+            "importacoes_12meses", ncm_code, versao,
+            lambda: gerar_grafico_importacoes_12meses(ncm_code, ncm_formatado, fim=versao, **opcoes),
+            **opcoes
+        )
+        if fig_12m is not None:
+            if isinstance(fig_12m, go.Figure):
+                 st.plotly_chart(fig_12m, use_container_width=True)
+                 st.caption("Fonte: Comex Stat/MDIC. Elaboração própria.")
+                 logging.info("Gráfico 12 meses (Plotly) exibido.")
+            else:
+                 st.warning("Gráfico de importações 12 meses não pôde ser exibido (formato não reconhecido).")
+                 logging.warning(f"Tipo retornado por gerar_grafico_importacoes_12meses: {type(fig_12m)}")
+        else:
+            st.info(f"Gráfico indisponível para o NCM {ncm_formatado}: não há dados suficientes (mínimo 12 meses consecutivos) "
+                    "ou a consulta à API falhou. Verifique os logs para detalhes.")
+            logging.info("Gráfico 12 meses não gerado (retornou None).")
+    except ImportError as e:
+         st.error(f"Erro: A função 'gerar_grafico_importacoes_12meses' não foi importada corretamente: {e}")
+         logging.error(f"ImportError ao carregar gerar_grafico_importacoes_12meses: {e}", exc_info=True)
+    except AttributeError as e:
+         st.error(f"Erro: Função 'gerar_grafico_importacoes_12meses' não encontrada no módulo importado: {e}")
+         logging.error(f"Erro de atributo em gerar_grafico_importacoes_12meses: {e}", exc_info=True)
+    except Exception as e:
+         st.error(f"Erro ao gerar/exibir gráfico de Importações 12 Meses: {e}")
+         logging.error(f"Erro em gerar_grafico_importacoes_12meses: {e}", exc_info=True)
+
+@medido
+def exibir_api(ncm_code, last_updated_month, last_updated_year):
+    """Orquestra a exibição de dados e gráficos da API Comex, um fragmento por seção."""
+    st.subheader("📊 Dados da API Comex e Gráficos")
+    exibir_tabelas_api(ncm_code, last_updated_month)
     st.markdown("### Gráficos de Desempenho")
+    series = carregar_series_api(ncm_code, last_updated_month)
+    df_hist_anual = series["df_hist_anual"]
     if isinstance(df_hist_anual, pd.DataFrame) and not df_hist_anual.empty:
         ncm_formatado = f"{str(ncm_code)[:4]}.{str(ncm_code)[4:6]}.{str(ncm_code)[6:]}"
         col_graf1, col_graf2 = st.columns(2)
         with col_graf1:
-            try:
-                st.markdown("##### Importações (KG)")
-                fig_import_kg = graf_kg.gerar_grafico_importacoes(df_hist_anual, df_2024_parcial, ncm_formatado, last_updated_month, last_updated_year)
-                if isinstance(fig_import_kg, go.Figure):
-                     st.plotly_chart(fig_import_kg, use_container_width=True)
-                else:
-                     st.warning("Gráfico de Importações (KG) não pôde ser gerado.")
-            except AttributeError as e:
-                 st.error(f"Erro: Função 'gerar_grafico_importacoes' não encontrada em 'graf_kg': {e}")
-                 logging.error(f"Erro de atributo em graf_kg.gerar_grafico_importacoes: {e}", exc_info=True)
-            except Exception as e:
-                 st.error(f"Erro ao gerar gráfico de Importações (KG): {e}")
-                 logging.error(f"Erro em gerar_grafico_importacoes (KG): {e}", exc_info=True)
-            try:
-                st.markdown("##### Importações (US$ FOB)")
-                fig_import_fob = graf_fob.gerar_grafico_importacoes_fob(df_hist_anual, df_2024_parcial, ncm_formatado, last_updated_month, last_updated_year)
-                if isinstance(fig_import_fob, go.Figure):
-                     st.plotly_chart(fig_import_fob, use_container_width=True)
-                else:
-                     st.warning("Gráfico de Importações (FOB) não pôde ser gerado.")
-            except AttributeError as e:
-                 st.error(f"Erro: Função 'gerar_grafico_importacoes_fob' não encontrada em 'graf_fob': {e}")
-                 logging.error(f"Erro de atributo em graf_fob.gerar_grafico_importacoes_fob: {e}", exc_info=True)
-            except Exception as e:
-                 st.error(f"Erro ao gerar gráfico de Importações (FOB): {e}")
-                 logging.error(f"Erro em gerar_grafico_importacoes_fob: {e}", exc_info=True)
-            try:
-                st.markdown("##### Preço Médio (US$ FOB/KG)")
-                fig_preco_medio = graf_preco_medio.gerar_grafico_preco_medio(df_hist_anual, df_2024_parcial, ncm_formatado, last_updated_month)
-                if isinstance(fig_preco_medio, go.Figure):
-                     st.plotly_chart(fig_preco_medio, use_container_width=True)
-                else:
-                     st.warning("Gráfico de Preço Médio não pôde ser gerado.")
-            except AttributeError as e:
-                 st.error(f"Erro: Função 'gerar_grafico_preco_medio' não encontrada em 'graf_preco_medio': {e}")
-                 logging.error(f"Erro de atributo em graf_preco_medio.gerar_grafico_preco_medio: {e}", exc_info=True)
-            except Exception as e:
-                 st.error(f"Erro ao gerar gráfico de Preço Médio: {e}")
-                 logging.error(f"Erro em gerar_grafico_preco_medio: {e}", exc_info=True)
+            for chave in ("import_kg", "import_fob", "preco_medio"):
+                exibir_grafico_desempenho(chave, ncm_code, ncm_formatado, last_updated_month, last_updated_year)
         with col_graf2:
-            try:
-                st.markdown("##### Exportações (KG)")
-                fig_export_kg = graf_exp.gerar_grafico_exportacoes(df_hist_anual, df_2024_parcial, ncm_formatado, last_updated_month, last_updated_year)
-                if isinstance(fig_export_kg, go.Figure):
-                     st.plotly_chart(fig_export_kg, use_container_width=True)
-                else:
-                     st.warning("Gráfico de Exportações (KG) não pôde ser gerado.")
-            except AttributeError as e:
-                 st.error(f"Erro: Função 'gerar_grafico_exportacoes' não encontrada em 'graf_exp': {e}")
-                 logging.error(f"Erro de atributo em graf_exp.gerar_grafico_exportacoes: {e}", exc_info=True)
-            except Exception as e:
-                 st.error(f"Erro ao gerar gráfico de Exportações (KG): {e}")
-                 logging.error(f"Erro em gerar_grafico_exportacoes (KG): {e}", exc_info=True)
-            try:
-                st.markdown("##### Exportações (US$ FOB)")
-                fig_export_fob = graf_exp_fob.gerar_grafico_exportacoes_fob(df_hist_anual, df_2024_parcial, ncm_formatado, last_updated_month, last_updated_year)
-                if isinstance(fig_export_fob, go.Figure):
-                     st.plotly_chart(fig_export_fob, use_container_width=True)
-                else:
-                     st.warning("Gráfico de Exportações (FOB) não pôde ser gerado.")
-            except AttributeError as e:
-                 st.error(f"Erro: Função 'gerar_grafico_exportacoes_fob' não encontrada em 'graf_exp_fob': {e}")
-                 logging.error(f"Erro de atributo em graf_exp_fob.gerar_grafico_exportacoes_fob: {e}", exc_info=True)
-            except Exception as e:
-                 st.error(f"Erro ao gerar gráfico de Exportações (FOB): {e}")
-                 logging.error(f"Erro em gerar_grafico_exportacoes_fob: {e}", exc_info=True)
-            try:
-                st.markdown("##### Importações Acumuladas (12 Meses - KG)")
-                fig_12m = gerar_grafico_importacoes_12meses(ncm_code, ncm_formatado)
-                if fig_12m is not None:
-                    if isinstance(fig_12m, go.Figure):
-                         st.plotly_chart(fig_12m, use_container_width=True)
-                         st.caption("Fonte: Comex Stat/MDIC. Elaboração própria.")
-                         logging.info("Gráfico 12 meses (Plotly) exibido.")
-                    else:
-                         st.warning("Gráfico de importações 12 meses não pôde ser exibido (formato não reconhecido).")
-                         logging.warning(f"Tipo retornado por gerar_grafico_importacoes_12meses: {type(fig_12m)}")
-                else:
-                    logging.info("Gráfico 12 meses não gerado (retornou None).")
-            except NameError:
-                 st.error("Erro: A função 'gerar_grafico_importacoes_12meses' não foi importada corretamente.")
-                 logging.error("NameError ao chamar gerar_grafico_importacoes_12meses.")
-            except AttributeError as e:
-                 st.error(f"Erro: Função 'gerar_grafico_importacoes_12meses' não encontrada no módulo importado: {e}")
-                 logging.error(f"Erro de atributo em gerar_grafico_importacoes_12meses: {e}", exc_info=True)
-            except Exception as e:
-                 st.error(f"Erro ao gerar/exibir gráfico de Importações 12 Meses: {e}")
-                 logging.error(f"Erro em gerar_grafico_importacoes_12meses: {e}", exc_info=True)
-        
+            for chave in ("export_kg", "export_fob"):
+                exibir_grafico_desempenho(chave, ncm_code, ncm_formatado, last_updated_month, last_updated_year)
+            exibir_grafico_12meses(ncm_code, ncm_formatado)
+
         cols = st.columns(2)
         with cols[0]:
             exibir_treemap(ncm_code, ncm_formatado, tipo_flow='import')
         with cols[1]:
             exibir_treemap(ncm_code, ncm_formatado, tipo_flow='export')
-    elif not error_hist:
+    elif not series["error_hist"]:
         st.warning("Não há dados históricos da API disponíveis para gerar os gráficos.")
 
 # Obter mês e ano mais recentes da API Comex
@@ -604,10 +654,11 @@ if "last_updated_month" not in st.session_state or "last_updated_year" not in st
         st.session_state.last_updated_month = 3  # fallback
         st.warning(f"Erro ao definir o mês/ano de atualização. Usando valores padrão. Erro: {e}")
 
+@medido
 def analisar_ncm(ncm_code, can_analyze_api, last_updated_month, last_updated_year):
     ncm_formatado = f"{ncm_code[:4]}.{ncm_code[4:6]}.{ncm_code[6:8]}"
     st.header(f"🔍 Análise Detalhada - NCM {ncm_formatado}")
-    if st.session_state.ncms_filtradas:
+    if st.session_state.ncms_filtradas or st.session_state.get("extracao_pdf"):
          if st.button("⬅️ Voltar para a lista de NCMs", key="back_button"):
              st.session_state.selected_ncm = None
              logging.info("Botão 'Voltar' clicado.")
@@ -632,7 +683,8 @@ def analisar_ncm(ncm_code, can_analyze_api, last_updated_month, last_updated_yea
              st.error(f"Erro crítico ao obter descrição do Ncm: {e}")
              logging.error(f"Erro crítico em obter_descricao_ncm para {ncm_code}: {e}", exc_info=True)
     try:
-        if isinstance(st.session_state.df_excel, dict) and st.session_state.df_excel:
+        dados_excel = dados_planilha()
+        if isinstance(dados_excel, dict) and dados_excel:
             exibir_excel(ncm_code)
         else:
             st.info("Planilha Excel não carregada ou inválida, pulando seção de dados do Excel.")
@@ -660,8 +712,8 @@ def main():
 """, unsafe_allow_html=True)
     if 'selected_ncm' not in st.session_state:
         st.session_state.selected_ncm = None
-    if 'df_excel' not in st.session_state:
-        st.session_state.df_excel = None
+    if 'chave_planilha' not in st.session_state:
+        st.session_state.chave_planilha = None
     if 'ncms_filtradas' not in st.session_state:
         st.session_state.ncms_filtradas = []
     if 'last_updated_date' not in st.session_state:
@@ -690,76 +742,79 @@ def main():
     with st.expander("📁 Carregar Arquivos (Pauta PDF)", expanded=True):
         col1 = st.columns(1)[0]
         with col1:
-            uploaded_pdf = st.file_uploader("1. Carregar PDF da Pauta", type=['pdf'], key="pdf_uploader")
+            uploaded_pdfs = st.file_uploader("1. Carregar PDF(s) da Pauta", type=['pdf'], key="pdf_uploader",
+                                             accept_multiple_files=True)
         process_button_clicked = st.button("Processar Arquivos e Filtrar NCMs", key="process_button",
-                                           disabled=(not uploaded_pdf),
+                                           disabled=(not uploaded_pdfs),
                                            use_container_width=True)
         if process_button_clicked:
-            with st.spinner("Processando arquivos... Por favor, aguarde."):
-                try:
-                    pdf_bytes = uploaded_pdf.getvalue()
-                    ncms_pdf_pontuados = extrair_ncms_pdf(pdf_bytes)
-                    ncms_pdf_8digitos = {formatar_ncm_8digitos(ncm) for ncm in ncms_pdf_pontuados if formatar_ncm_8digitos(ncm)}
-                    logging.info(f"{len(ncms_pdf_8digitos)} NCMs únicos (8 dígitos) extraídos do PDF.")
-                    if "df_excel" not in st.session_state or not st.session_state.df_excel:
-                        st.error("Planilha Excel não carregada. Verifique o link ou a conexão com o GitHub.")
-                        return
-                    dados_excel_carregados = st.session_state.df_excel
-                    df_departamentos = dados_excel_carregados.get("NCMs-CGIM-DINTE")
-                    if not isinstance(df_departamentos, pd.DataFrame) or df_departamentos.empty:
-                         msg_erro_excel = "Aba CGIM ('NCMs-CGIM-DINTE' ou primeira aba) não encontrada, está vazia ou inválida no Excel."
-                         st.error(f"Erro de Processamento: {msg_erro_excel}")
-                         raise ValueError(msg_erro_excel)
-                    if 'NCM' not in df_departamentos.columns:
-                         msg_erro_excel = "Coluna 'NCM' não encontrada na aba CGIM do Excel."
-                         st.error(f"Erro de Processamento: {msg_erro_excel}")
-                         raise KeyError(msg_erro_excel)
-                    ncms_excel = set(df_departamentos['NCM'].dropna())
-                    logging.info(f"{len(ncms_excel)} NCMs únicos (8 dígitos) extraídos da aba CGIM do Excel.")
-                    ncms_comuns = sorted(list(ncms_pdf_8digitos.intersection(ncms_excel)))
-                    logging.info(f"{len(ncms_comuns)} NCMs comuns encontrados entre PDF e Excel.")
+            try:
+                dados_excel_carregados = dados_planilha()
+                if not dados_excel_carregados:
+                    st.error("Planilha Excel não carregada. Verifique o link ou a conexão com o GitHub.")
+                    return
+                df_departamentos = dados_excel_carregados.get("NCMs-CGIM-DINTE")
+                if not isinstance(df_departamentos, pd.DataFrame) or df_departamentos.empty:
+                     msg_erro_excel = "Aba CGIM ('NCMs-CGIM-DINTE' ou primeira aba) não encontrada, está vazia ou inválida no Excel."
+                     st.error(f"Erro de Processamento: {msg_erro_excel}")
+                     raise ValueError(msg_erro_excel)
+                if 'NCM' not in df_departamentos.columns:
+                     msg_erro_excel = "Coluna 'NCM' não encontrada na aba CGIM do Excel."
+                     st.error(f"Erro de Processamento: {msg_erro_excel}")
+                     raise KeyError(msg_erro_excel)
+                ncms_excel = set(df_departamentos['NCM'].dropna())
+                logging.info(f"{len(ncms_excel)} NCMs únicos (8 dígitos) extraídos da aba CGIM do Excel.")
+                st.session_state.ncms_filtradas = []
+                st.session_state.selected_ncm = None
+                if len(uploaded_pdfs) == 1:
+                    # A leitura do PDF segue em segundo plano; a interseção com a CGIM é
+                    # atualizada página a página e exibida por exibir_extracao_em_andamento
+                    iniciar_extracao_pdf(uploaded_pdfs[0].getvalue(), ncms_excel, uploaded_pdfs[0].name)
+                else:
+                    with st.spinner(f"Processando {len(uploaded_pdfs)} pautas em paralelo... Por favor, aguarde."):
+                        registros, falhas = historico_pautas.processar_pautas([(arq.name, arq.getvalue()) for arq in uploaded_pdfs])
+                    for nome_pdf, erro_pdf in falhas.items():
+                        st.warning(f"⚠️ Não foi possível ler a pauta '{nome_pdf}': {erro_pdf}")
+                    ncms_comuns = sorted(set().union(*(historico_pautas.filtrar_cgim(r, ncms_excel) for r in registros)))
+                    logging.info(f"{len(ncms_comuns)} NCMs comuns encontrados entre {len(registros)} PDFs e Excel.")
                     if ncms_comuns:
                         st.session_state.ncms_filtradas = ncms_comuns
-                        st.success(f"✅ Arquivos processados! {len(ncms_comuns)} NCMs da CGIM encontradas na pauta.")
-                        st.session_state.selected_ncm = None
-                    else:
-                        st.warning("⚠️ Nenhuma NCM comum encontrada entre a planilha CGIM e o PDF da pauta.")
-                        st.session_state.ncms_filtradas = []
-                        st.session_state.selected_ncm = None
-                    
-                except KeyError as e:
-                     st.error(f"Erro de Processamento: Coluna não encontrada - {e}. Verifique o nome/conteúdo da coluna na planilha Excel.")
-                     logging.error(f"KeyError ao processar arquivos: {e}", exc_info=True)
-                     st.session_state.ncms_filtradas = []
-                     st.session_state.df_excel = None
-                except ValueError as e:
-                     if "Aba CGIM" not in str(e):
-                          st.error(f"Erro de Processamento: {e}.")
-                     logging.error(f"ValueError ao processar arquivos: {e}", exc_info=True)
-                     st.session_state.ncms_filtradas = []
-                     st.session_state.df_excel = None
-                except Exception as e:
-                    st.error(f"Erro inesperado ao processar os arquivos: {str(e)}")
-                    logging.error(f"Erro inesperado ao processar arquivos: {e}", exc_info=True)
-                    st.session_state.ncms_filtradas = []
-                    st.session_state.df_excel = None
-    if st.session_state.ncms_filtradas:
+                        st.success(f"✅ {len(registros)} pautas processadas! {len(ncms_comuns)} NCMs da CGIM encontradas.")
+                    elif registros:
+                        st.warning("⚠️ Nenhuma NCM comum encontrada entre a planilha CGIM e os PDFs das pautas.")
+            except KeyError as e:
+                 st.error(f"Erro de Processamento: Coluna não encontrada - {e}. Verifique o nome/conteúdo da coluna na planilha Excel.")
+                 logging.error(f"KeyError ao processar arquivos: {e}", exc_info=True)
+                 st.session_state.ncms_filtradas = []
+                 st.session_state.chave_planilha = None
+            except ValueError as e:
+                 if "Aba CGIM" not in str(e):
+                      st.error(f"Erro de Processamento: {e}.")
+                 logging.error(f"ValueError ao processar arquivos: {e}", exc_info=True)
+                 st.session_state.ncms_filtradas = []
+                 st.session_state.chave_planilha = None
+            except Exception as e:
+                st.error(f"Erro inesperado ao processar os arquivos: {str(e)}")
+                logging.error(f"Erro inesperado ao processar arquivos: {e}", exc_info=True)
+                st.session_state.ncms_filtradas = []
+                st.session_state.chave_planilha = None
+        aviso_extracao = st.session_state.pop("aviso_extracao", None)
+        if aviso_extracao:
+            tipo_aviso, msg_aviso = aviso_extracao
+            getattr(st, tipo_aviso)(msg_aviso)
+    exibir_historico_pautas()
+    if st.session_state.get("extracao_pdf"):
+        exibir_extracao_em_andamento()
+    elif st.session_state.ncms_filtradas:
+        exibir_visao_geral_pauta(st.session_state.ncms_filtradas)
+        exibir_exportacao_pauta(st.session_state.ncms_filtradas)
+        exibir_fichas_estaticas_pauta(st.session_state.ncms_filtradas)
         st.header("📋 NCMs da CGIM na Pauta (Clique para analisar)")
-        num_cols = 5
-        cols = st.columns(num_cols)
-        for idx, ncm in enumerate(st.session_state.ncms_filtradas):
-            col_index = idx % num_cols
-            ncm_fmt_button = f"{ncm[:4]}.{ncm[4:6]}.{ncm[6:]}"
-            with cols[col_index]:
-                if st.button(ncm_fmt_button, key=f"btn_{ncm}", help=f"Analisar NCM {ncm_fmt_button}", use_container_width=True):
-                    st.session_state.selected_ncm = ncm
-                    logging.info(f"Botão NCM {ncm} clicado. Selecionado: {st.session_state.selected_ncm}")
-                    if hasattr(st, "experimental_rerun"):
-                     st.experimental_rerun()
+        exibir_grade_ncms(st.session_state.ncms_filtradas)
     if st.session_state.selected_ncm:
         can_analyze_api = st.session_state.last_updated_month is not None and st.session_state.last_updated_year is not None
         analisar_ncm(st.session_state.selected_ncm, can_analyze_api, st.session_state.last_updated_month, st.session_state.last_updated_year)
-    elif not st.session_state.ncms_filtradas:
+    elif not st.session_state.ncms_filtradas and not st.session_state.get("extracao_pdf"):
         st.header("🔍 Ou Faça uma Busca Manual de NCM")
         ncm_input = st.text_input("Digite o código NCM (com ou sem pontos):", key="manual_ncm_input", max_chars=10)
         buscar_manual_button = st.button("Buscar NCM Manualmente", key="manual_search_button")
@@ -771,32 +826,365 @@ def main():
                       analisar_ncm(ncm_clean, can_analyze_api, st.session_state.last_updated_month, st.session_state.last_updated_year)
             else:
                  st.warning("NCM inválido. Digite um NCM com 8 dígitos (pontos são opcionais).")
+    exibir_uso_memoria()
+    exibir_rastro()
 
-@st.cache_data
-def extrair_ncms_pdf(pdf_file_bytes):
-    """Extrai NCMs no formato xxxx.xx.xx de bytes de um arquivo PDF."""
-    ncms_encontradas = set()
-    logging.info("Iniciando extração de NCMs do PDF...")
+@medido
+def exibir_grade_ncms(ncms, prefixo_chave="btn"):
+    """Exibe a grade de botões de NCMs; o clique seleciona o NCM para análise."""
+    num_cols = 5
+    cols = st.columns(num_cols)
+    for idx, ncm in enumerate(ncms):
+        col_index = idx % num_cols
+        ncm_fmt_button = f"{ncm[:4]}.{ncm[4:6]}.{ncm[6:]}"
+        with cols[col_index]:
+            if st.button(ncm_fmt_button, key=f"{prefixo_chave}_{ncm}", help=f"Analisar NCM {ncm_fmt_button}", use_container_width=True):
+                st.session_state.selected_ncm = ncm
+                logging.info(f"Botão NCM {ncm} clicado. Selecionado: {st.session_state.selected_ncm}")
+                st.rerun()
+
+def _executar_extracao_pdf(andamento, pdf_bytes, ncms_excel, sha256, nome_arquivo):
+    """Consome o gerador de extração (em thread própria), atualizando o andamento a cada página."""
+    por_pagina, num_paginas, com_erro = {}, 0, []
     try:
-        pdf_stream = BytesIO(pdf_file_bytes)
-        reader = PdfReader(pdf_stream)
-        num_paginas = len(reader.pages)
-        logging.info(f"Lendo PDF com {num_paginas} páginas.")
-        for i, page in enumerate(reader.pages):
-            try:
-                text = page.extract_text()
-                if text:
-                    matches = re.findall(r'\b(\d{4}\.\d{2}\.\d{2})\b', text)
-                    if matches:
-                         ncms_encontradas.update(matches)
-            except Exception as e_page:
-                 logging.warning(f"Erro ao extrair texto da página {i+1} do PDF: {e_page}")
-        logging.info(f"Extração de NCMs do PDF concluída. {len(ncms_encontradas)} NCMs únicos (com pontos) encontrados.")
+        for indice, num_paginas, matches in iterar_ncms_pdf(pdf_bytes):
+            if matches is None:
+                com_erro.append(indice)
+                matches = []
+            elif matches:
+                por_pagina[indice] = matches
+            novos = {formatar_ncm_8digitos(ncm) for ncm in matches} & ncms_excel
+            if not novos <= andamento["ncms_comuns"]:
+                # Novo conjunto a cada atualização: a interface nunca lê um conjunto pela metade
+                andamento["ncms_comuns"] = andamento["ncms_comuns"] | novos
+            andamento["num_paginas"] = num_paginas
+            andamento["paginas_lidas"] = indice + 1
+        logging.info(f"{len(andamento['ncms_comuns'])} NCMs comuns encontrados entre PDF e Excel.")
+        registro = cache_pdf.gravar(sha256, num_paginas, por_pagina, paginas_com_erro=com_erro)
+        historico_pautas.registrar_pauta(sha256, nome_arquivo, registro["ncms"])
     except Exception as e:
-        st.error(f"Erro crítico ao ler o arquivo PDF: {e}")
         logging.error(f"Erro crítico ao ler PDF: {e}", exc_info=True)
-        return []
-    return list(ncms_encontradas)
+        andamento["erro"] = str(e)
+    finally:
+        andamento["concluida"] = True
+
+def iniciar_extracao_pdf(pdf_bytes, ncms_excel, nome_arquivo):
+    """
+    Inicia a leitura progressiva do PDF da pauta em segundo plano. Se a mesma
+    pauta já foi lida (cache em disco), o resultado é usado imediatamente.
+    """
+    sha256 = cache_pdf.sha256_pdf(pdf_bytes)
+    registro = cache_pdf.obter(sha256)
+    if registro is not None:
+        historico_pautas.registrar_pauta(sha256, nome_arquivo, registro["ncms"])
+        st.session_state.extracao_pdf = {
+            "paginas_lidas": registro["num_paginas"], "num_paginas": registro["num_paginas"],
+            "ncms_comuns": {formatar_ncm_8digitos(ncm) for ncm in registro["ncms"]} & ncms_excel,
+            "concluida": True, "erro": None,
+        }
+        return
+    andamento = {"paginas_lidas": 0, "num_paginas": 0, "ncms_comuns": set(), "concluida": False, "erro": None}
+    st.session_state.extracao_pdf = andamento
+    threading.Thread(target=_executar_extracao_pdf, args=(andamento, pdf_bytes, ncms_excel, sha256, nome_arquivo),
+                     name="extracao-pdf", daemon=True).start()
+    logging.info("Iniciando extração de NCMs do PDF...")
+
+def _visao_geral_cacheada(ncms, last_updated_year, last_updated_month):
+    def montar():
+        df_visao, erro = montar_visao_geral(list(ncms), last_updated_year, last_updated_month)
+        if erro:
+            # Exceções não são memorizadas: a próxima tentativa consulta a API de novo
+            raise RuntimeError(erro)
+        return df_visao
+    return cache_compartilhado.obter_ou_calcular(
+        "visao_geral", (ncms, last_updated_year, last_updated_month), montar, ttl=config.TTL_VISAO_GERAL
+    )
+
+@st.fragment
+@medido
+def exibir_visao_geral_pauta(ncms):
+    """Tabela ordenável com os principais indicadores de importação de todos os NCMs da pauta."""
+    with st.expander(f"📊 Visão Geral da Pauta ({len(ncms)} NCMs)", expanded=False):
+        if st.session_state.last_updated_month is None or st.session_state.last_updated_year is None:
+            st.warning("Visão geral indisponível (data de atualização da API não obtida).")
+            return
+        if not st.session_state.get("visao_geral_ativa"):
+            if st.button("Gerar visão geral", key="visao_geral_button"):
+                st.session_state.visao_geral_ativa = True
+            else:
+                st.caption("Consulta os dados de todos os NCMs em lote e monta uma tabela para triagem.")
+                return
+        try:
+            with st.spinner(f"Consultando a API para {len(ncms)} NCMs..."):
+                df_visao = _visao_geral_cacheada(tuple(ncms), st.session_state.last_updated_year, st.session_state.last_updated_month)
+        except Exception as e:
+            st.error(f"Não foi possível montar a visão geral da pauta: {e}")
+            logging.error(f"Erro ao montar a visão geral da pauta: {e}", exc_info=True)
+            return
+        colunas = colunas_visao_geral(st.session_state.last_updated_year, st.session_state.last_updated_month)
+        st.dataframe(
+            df_visao,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                colunas["fob"]: st.column_config.NumberColumn(format="%.0f"),
+                colunas["kg"]: st.column_config.NumberColumn(format="%.0f"),
+                colunas["variacao"]: st.column_config.NumberColumn(format="%.1f%%"),
+                colunas["preco"]: st.column_config.NumberColumn(format="%.2f"),
+                colunas["participacao"]: st.column_config.NumberColumn(format="%.1f%%"),
+                colunas["tendencia"]: st.column_config.LineChartColumn(y_min=0),
+            },
+        )
+        st.caption("Clique no cabeçalho de uma coluna para ordenar. Fonte: Comex Stat/MDIC.")
+
+def _gerar_planilha_fichas(ncms, last_updated_month, last_updated_year, barra):
+    """Bytes do Excel com as fichas da pauta (o arquivo temporário é apagado em seguida)."""
+    from modulos.exportacao_xlsx import exportar_pauta_xlsx
+    caminho, com_erro = exportar_pauta_xlsx(
+        list(ncms), last_updated_month, last_updated_year,
+        progresso=lambda feitos, total: barra.progress(feitos / total, text=f"Fichas prontas: {feitos} de {total}"),
+    )
+    try:
+        with open(caminho, "rb") as arquivo:
+            return arquivo.read(), com_erro
+    finally:
+        os.remove(caminho)
+
+@st.fragment
+@medido
+def exibir_exportacao_pauta(ncms):
+    """Exportação das fichas de todos os NCMs da pauta para um único arquivo Excel."""
+    with st.expander(f"📥 Exportar Fichas da Pauta para Excel ({len(ncms)} NCMs)", expanded=False):
+        if st.session_state.last_updated_month is None or st.session_state.last_updated_year is None:
+            st.warning("Exportação indisponível (data de atualização da API não obtida).")
+            return
+        chave = (tuple(ncms), versao_dados(st.session_state.last_updated_year, st.session_state.last_updated_month))
+        exportacao = cache_compartilhado.obter("exportacao", chave)
+        if exportacao is None:
+            if not st.button("Gerar planilha das fichas", key="exportacao_button"):
+                st.caption("Uma aba de resumo e uma aba por NCM (séries, comparativo, quadros-resumo e países).")
+                return
+            barra = st.progress(0.0, text="Enviando os NCMs para análise...")
+            try:
+                exportacao = cache_compartilhado.obter_ou_calcular(
+                    "exportacao", chave,
+                    lambda: _gerar_planilha_fichas(ncms, st.session_state.last_updated_month, st.session_state.last_updated_year, barra),
+                    ttl=config.TTL_VISAO_GERAL,
+                )
+            except Exception as e:
+                st.error(f"Não foi possível gerar a planilha das fichas: {e}")
+                logging.error(f"Erro ao exportar as fichas da pauta: {e}", exc_info=True)
+                return
+            finally:
+                barra.empty()
+        conteudo, com_erro = exportacao
+        if com_erro:
+            st.warning(f"{com_erro} NCM(s) com erro na consulta à API; veja a coluna 'Situação' da aba Resumo.")
+        st.download_button(
+            "Baixar planilha (.xlsx)", data=conteudo, file_name=f"fichas_ncm_{chave[1]}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="exportacao_download",
+        )
+
+@st.fragment
+@medido
+def exibir_fichas_estaticas_pauta(ncms):
+    """Geração em lote das fichas HTML pré-renderizadas dos NCMs da pauta."""
+    from modulos.fichas_html import ficha_atual, gerar_fichas
+    with st.expander("🗂️ Fichas Pré-Geradas (HTML)", expanded=False):
+        if st.session_state.last_updated_month is None or st.session_state.last_updated_year is None:
+            st.warning("Fichas indisponíveis (data de atualização da API não obtida).")
+            return
+        atuais = sum(ficha_atual(ncm, st.session_state.last_updated_month, st.session_state.last_updated_year) is not None
+                     for ncm in ncms)
+        st.caption(f"{atuais} de {len(ncms)} NCMs com ficha pré-gerada nos dados atuais. "
+                   "A página de um NCM com ficha atual abre direto dela, sem refazer a análise.")
+        if atuais < len(ncms) and st.button("Gerar fichas que faltam", key="fichas_html_button"):
+            barra = st.progress(0.0, text="Enviando os NCMs para análise...")
+            geradas, com_erro = gerar_fichas(
+                ncms, st.session_state.last_updated_month, st.session_state.last_updated_year, dados_planilha(),
+                progresso=lambda feitos, total: barra.progress(feitos / total, text=f"Fichas prontas: {feitos} de {total}"),
+            )
+            barra.empty()
+            st.success(f"{geradas} fichas geradas.")
+            if com_erro:
+                st.warning(f"{com_erro} NCM(s) com erro na consulta à API ficaram sem ficha.")
+
+@medido
+def exibir_ficha_estatica(ncm_code, caminho):
+    """Exibe a ficha pré-gerada do NCM (dados atuais), sem refazer a análise."""
+    from modulos.fichas_html import html_para_exibicao
+    conteudo = html_para_exibicao(caminho)
+    gerada_em = datetime.datetime.fromtimestamp(os.path.getmtime(caminho))
+    col_info, col_baixar, col_vivo = st.columns([3, 1, 1])
+    col_info.caption(f"Ficha pré-gerada em {gerada_em:%d/%m/%Y %H:%M}, com os dados atuais da API Comex.")
+    col_baixar.download_button("Baixar ficha (HTML)", data=conteudo, file_name=f"ficha_ncm_{ncm_code}.html",
+                               mime="text/html", key="ficha_html_download")
+    if col_vivo.button("Abrir página interativa", key="ficha_ao_vivo_button"):
+        st.session_state.ficha_ao_vivo = ncm_code
+        st.rerun()
+    if hasattr(st, "iframe"):
+        st.iframe(conteudo, height=config.FICHA_HTML_ALTURA)
+    else:  # versões do Streamlit sem st.iframe
+        import streamlit.components.v1 as components
+        components.html(conteudo, height=config.FICHA_HTML_ALTURA, scrolling=True)
+
+def _figura_cascata(rastro):
+    """Barras horizontais com início e duração de cada trecho do rastro (cascata)."""
+    import plotly.graph_objects as go
+    from modulos.tema_graficos import aplicar_tema
+    trechos = rastro.trechos
+    agora = rastro.duracao_ms if rastro.duracao_ms is not None else rastro.agora_ms()
+    duracoes = [t["duracao_ms"] if t["duracao_ms"] is not None else agora - t["inicio_ms"] for t in trechos]
+    fig = go.Figure(go.Bar(
+        y=list(range(len(trechos))), x=duracoes, base=[t["inicio_ms"] for t in trechos], orientation="h",
+        marker_color=["darkorange" if t.get("erro") else "steelblue" for t in trechos],
+        hovertemplate="%{customdata}<br>início %{base:.1f} ms, duração %{x:.1f} ms<extra></extra>",
+        customdata=[t["nome"] for t in trechos],
+    ))
+    fig.update_layout(
+        height=max(200, 22 * len(trechos) + 60), margin=dict(l=10, r=10, t=10, b=40), xaxis_title="ms",
+        yaxis=dict(autorange="reversed", tickmode="array", tickvals=list(range(len(trechos))),
+                   ticktext=["\u2003" * t["profundidade"] + t["nome"] for t in trechos]),
+    )
+    return aplicar_tema(fig)
+
+def exibir_rastro():
+    """Cascata de tempos desta execução do script (e da análise do NCM aberto), com ?debug=1 na URL."""
+    rastro = rastro_atual()
+    if rastro is None or st.query_params.get("debug") != "1":
+        return
+    rastros = [("Execução do script", rastro)]
+    if st.session_state.get("selected_ncm") and st.session_state.last_updated_month is not None:
+        tarefa = fila_analises.obter(st.session_state.selected_ncm, st.session_state.last_updated_month,
+                                     st.session_state.last_updated_year)
+        if tarefa is not None and tarefa.rastro is not None:
+            rastros.append((f"Análise do NCM na fila (segundo plano, {tarefa.status})", tarefa.rastro))
+    with st.expander(f"⏱️ Tempos desta execução ({rastro.agora_ms():.0f} ms)", expanded=False):
+        for titulo, rastro_exibido in rastros:
+            st.markdown(f"##### {titulo}")
+            if not rastro_exibido.trechos:
+                st.caption("Nenhum trecho medido.")
+                continue
+            st.plotly_chart(_figura_cascata(rastro_exibido), use_container_width=True)
+            df_trechos = pd.DataFrame(rastro_exibido.trechos)
+            df_soma = (df_trechos.groupby("nome")["duracao_ms"].agg(["count", "sum", "max"])
+                       .sort_values("sum", ascending=False).rename(columns={"count": "chamadas", "sum": "total (ms)", "max": "máximo (ms)"}))
+            st.dataframe(df_soma, use_container_width=True)
+        if config.ARQUIVO_RASTRO and config.RASTRO_ATIVO:
+            st.caption(f"Rastros gravados em {config.ARQUIVO_RASTRO}.")
+
+def exibir_perfil(perfil):
+    """Onde ficou o perfil desta execução (e o da análise do NCM aberto), com ?perfil=1 na URL."""
+    perfis = [("desta execução", perfil)]
+    if st.session_state.get("selected_ncm") and st.session_state.last_updated_month is not None:
+        tarefa = fila_analises.obter(st.session_state.selected_ncm, st.session_state.last_updated_month,
+                                     st.session_state.last_updated_year)
+        if tarefa is not None and tarefa.perfil is not None and tarefa.perfil.caminho:
+            perfis.append(("da análise do NCM na fila", tarefa.perfil))
+    for i, (descricao, perfil_exibido) in enumerate(perfis):
+        if not perfil_exibido.caminho:
+            continue
+        memoria = ""
+        if perfil_exibido.pico_memoria_bytes is not None:
+            memoria = f", pico de memória de {perfil_exibido.pico_memoria_bytes / 1024 / 1024:.1f} MB"
+        st.caption(f"🔬 Perfil {descricao} ({perfil_exibido.ferramenta}, {perfil_exibido.duracao_s:.2f} s{memoria}) "
+                   f"gravado em {perfil_exibido.caminho}.")
+        with open(perfil_exibido.caminho, "rb") as arquivo:
+            st.download_button(f"Baixar perfil {descricao}", arquivo.read(), file_name=os.path.basename(perfil_exibido.caminho),
+                               key=f"perfil_download_{i}")
+
+def exibir_uso_memoria():
+    """Ocupação do cache compartilhado do processo, por espaço de nomes."""
+    estatisticas = cache_compartilhado.estatisticas()
+    with st.expander("🧠 Memória compartilhada do processo", expanded=False):
+        col_uso, col_teto, col_fila = st.columns(3)
+        col_uso.metric("Em uso", f"{estatisticas['bytes'] / 1024 / 1024:.1f} MB")
+        col_teto.metric("Teto", f"{estatisticas['teto_bytes'] / 1024 / 1024:.0f} MB")
+        col_fila.metric("Análises na fila", sum(n for status, n in fila_analises.resumo().items() if status in ("pendente", "executando")))
+        if estatisticas["namespaces"]:
+            df_uso = pd.DataFrame.from_dict(estatisticas["namespaces"], orient="index")
+            df_uso["MB"] = df_uso.pop("bytes") / 1024 / 1024
+            df_uso["limite_bytes"] = df_uso["limite_bytes"].map(lambda v: "" if pd.isna(v) else f"{v / 1024 / 1024:.0f} MB")
+            st.dataframe(df_uso.rename(columns={"limite_bytes": "limite"}), use_container_width=True)
+        if config.PREAQUECIMENTO_ATIVO:
+            estado = obter_preaquecedor().estado()
+            if estado:
+                situacao = f"concluído em {estado['concluida_em']}" if estado.get("concluida_em") else "em andamento"
+                st.caption(f"🔥 Pré-aquecimento dos dados {estado['versao_dados']}: {len(estado['concluidos'])} de "
+                           f"{estado.get('total') or '?'} NCMs ({situacao}; {len(estado['com_erro'])} com erro).")
+        if cache_compartilhado.persistente is not None:
+            disco = cache_compartilhado.persistente.estatisticas()
+            st.caption(f"💾 Cache SQLite compartilhado entre processos: {disco['itens']} itens, "
+                       f"{disco['bytes'] / 1024 / 1024:.1f} de {disco['teto_bytes'] / 1024 / 1024:.0f} MB ({disco['arquivo']}).")
+
+def _ncms_cgim():
+    """Conjunto de NCMs da aba CGIM carregada, ou None se a planilha não estiver disponível."""
+    dados_excel = dados_planilha()
+    df_cgim = dados_excel.get("NCMs-CGIM-DINTE") if isinstance(dados_excel, dict) else None
+    if not isinstance(df_cgim, pd.DataFrame) or df_cgim.empty or 'NCM' not in df_cgim.columns:
+        return None
+    return set(df_cgim['NCM'].dropna())
+
+@medido
+def exibir_historico_pautas():
+    """Histórico de pautas já processadas: reabrir sem reler o PDF e comparar duas pautas."""
+    historico = historico_pautas.carregar_historico()
+    ncms_excel = _ncms_cgim()
+    if not historico or ncms_excel is None:
+        return
+    rotulos = [f"{r['nome']} ({r['data_processamento'][:10]})" for r in historico]
+    with st.expander(f"🗂️ Histórico de Pautas ({len(historico)})", expanded=False):
+        col_pauta, col_abrir = st.columns([4, 1])
+        with col_pauta:
+            idx_abrir = st.selectbox("Pauta", range(len(historico)), index=len(historico) - 1,
+                                     format_func=lambda i: rotulos[i], key="hist_pauta_abrir")
+        with col_abrir:
+            st.write("")
+            if st.button("Abrir", key="hist_abrir_button", use_container_width=True):
+                st.session_state.ncms_filtradas = historico_pautas.filtrar_cgim(historico[idx_abrir], ncms_excel)
+                st.session_state.selected_ncm = None
+                st.rerun()
+        if len(historico) < 2:
+            return
+        st.markdown("##### Comparação entre pautas (NCMs da CGIM)")
+        col_base, col_comp = st.columns(2)
+        with col_base:
+            idx_base = st.selectbox("Pauta anterior", range(len(historico)), index=len(historico) - 2,
+                                    format_func=lambda i: rotulos[i], key="hist_pauta_base")
+        with col_comp:
+            idx_comp = st.selectbox("Pauta atual", range(len(historico)), index=len(historico) - 1,
+                                    format_func=lambda i: rotulos[i], key="hist_pauta_comp")
+        diferencas = historico_pautas.comparar_pautas(historico[idx_base], historico[idx_comp], ncms_excel)
+        for coluna, (chave, titulo) in zip(st.columns(3), [("novas", "🆕 Novas"), ("repetidas", "🔁 Repetidas"), ("retiradas", "➖ Retiradas")]):
+            with coluna:
+                ncms = diferencas[chave]
+                st.markdown(f"**{titulo}: {len(ncms)}**")
+                st.dataframe(pd.DataFrame({"NCM": [f"{n[:4]}.{n[4:6]}.{n[6:]}" for n in ncms]}),
+                             use_container_width=True, hide_index=True, height=250)
+
+@st.fragment(run_every=1)
+def exibir_extracao_em_andamento():
+    """Barra de progresso e grade de NCMs parciais, atualizadas enquanto o PDF é lido."""
+    andamento = st.session_state.get("extracao_pdf")
+    if not andamento:
+        return
+    ncms_comuns = sorted(andamento["ncms_comuns"])
+    if andamento["concluida"]:
+        del st.session_state["extracao_pdf"]
+        st.session_state.ncms_filtradas = [] if andamento["erro"] else ncms_comuns
+        if andamento["erro"]:
+            st.session_state.aviso_extracao = ("error", f"Erro crítico ao ler o arquivo PDF: {andamento['erro']}")
+        elif ncms_comuns:
+            st.session_state.aviso_extracao = ("success", f"✅ Arquivos processados! {len(ncms_comuns)} NCMs da CGIM encontradas na pauta.")
+        else:
+            st.session_state.aviso_extracao = ("warning", "⚠️ Nenhuma NCM comum encontrada entre a planilha CGIM e o PDF da pauta.")
+        st.rerun()
+    lidas, total = andamento["paginas_lidas"], andamento["num_paginas"]
+    st.progress(lidas / total if total else 0.0,
+                text=f"Lendo a pauta: página {lidas} de {total or '?'} — {len(ncms_comuns)} NCMs da CGIM encontradas até agora.")
+    if ncms_comuns:
+        st.header("📋 NCMs da CGIM na Pauta (Clique para analisar)")
+        exibir_grade_ncms(ncms_comuns, prefixo_chave="btn_parcial")
 
 def formatar_ncm_8digitos(ncm_value):
     """Converte NCM de vários formatos para 8 dígitos (string), ou retorna vazio."""
@@ -807,13 +1195,14 @@ def formatar_ncm_8digitos(ncm_value):
     ncm_8 = ncm_digits[:8]
     return ncm_8 if len(ncm_8) == 8 else ""
 
+@medido
 def analisar_ncm(ncm_code, can_analyze_api, last_updated_month, last_updated_year):
     """
     Função central para exibir a análise detalhada de um NCM selecionado ou buscado.
     """
     ncm_formatado = f"{ncm_code[:4]}.{ncm_code[4:6]}.{ncm_code[6:8]}"
     st.header(f"🔍 Análise Detalhada - NCM {ncm_formatado}")
-    if st.session_state.ncms_filtradas:
+    if st.session_state.ncms_filtradas or st.session_state.get("extracao_pdf"):
          if st.button("⬅️ Voltar para a lista de NCMs", key="back_button"):
              st.session_state.selected_ncm = None
              logging.info("Botão 'Voltar' clicado.")
@@ -825,9 +1214,25 @@ def analisar_ncm(ncm_code, can_analyze_api, last_updated_month, last_updated_yea
               logging.info("Botão 'Limpar Busca' clicado.")
               if hasattr(st, "experimental_rerun"):
                 st.experimental_rerun()
-    with st.spinner(f"Buscando descrição para NCM {ncm_formatado}..."):
+    if can_analyze_api and st.session_state.get("ficha_ao_vivo") != ncm_code:
+        from modulos.fichas_html import ficha_atual
+        caminho_ficha = ficha_atual(ncm_code, last_updated_month, last_updated_year)
+        if caminho_ficha:
+            exibir_ficha_estatica(ncm_code, caminho_ficha)
+            return
+    tarefa = None
+    if can_analyze_api:
+        # A análise roda na fila; outra sessão pode já tê-la iniciado ou concluído
+        tarefa = fila_analises.submeter(ncm_code, last_updated_month, last_updated_year,
+                                        perfilar=st.query_params.get("perfil") == "1")
+    if tarefa is not None and not tarefa.concluida:
+        exibir_andamento_analise(ncm_code, last_updated_month, last_updated_year)
+    else:
         try:
-            descricao = obter_descricao_ncm(ncm_code)
+            if tarefa is not None and tarefa.resultado:
+                descricao = tarefa.resultado["descricao"]
+            else:
+                descricao = obter_descricao_ncm(ncm_code)
             if descricao and "Erro" not in descricao:
                 st.subheader(f"📖 {descricao}")
                 logging.info(f"Descrição obtida para NCM {ncm_code}: {descricao}")
@@ -838,7 +1243,8 @@ def analisar_ncm(ncm_code, can_analyze_api, last_updated_month, last_updated_yea
              st.error(f"Erro crítico ao obter descrição do Ncm: {e}")
              logging.error(f"Erro crítico em obter_descricao_ncm para {ncm_code}: {e}", exc_info=True)
     try:
-        if isinstance(st.session_state.df_excel, dict) and st.session_state.df_excel:
+        dados_excel = dados_planilha()
+        if isinstance(dados_excel, dict) and dados_excel:
             exibir_excel(ncm_code)
         else:
             st.info("Planilha Excel não carregada ou inválida, pulando seção de dados do Excel.")
@@ -846,7 +1252,12 @@ def analisar_ncm(ncm_code, can_analyze_api, last_updated_month, last_updated_yea
     except Exception as e:
          st.error(f"Erro ao exibir dados do Excel para NCM {ncm_code}: {e}")
          logging.error(f"Erro em exibir_excel para {ncm_code}: {e}", exc_info=True)
-    if can_analyze_api:
+    if tarefa is not None and not tarefa.concluida:
+        return
+    if tarefa is not None and tarefa.status == "falhou":
+        st.error(f"Erro ao analisar o NCM {ncm_formatado} em segundo plano: {tarefa.erro}")
+    elif can_analyze_api:
+        fixar_resultado_analise(ncm_code, last_updated_month, last_updated_year, tarefa.resultado)
         with st.spinner(f"Carregando dados da API e gráficos para NCM {ncm_formatado}..."):
             try:
                 exibir_api(ncm_code, last_updated_month, last_updated_year)
@@ -858,7 +1269,15 @@ def analisar_ncm(ncm_code, can_analyze_api, last_updated_month, last_updated_yea
 
 if __name__ == "__main__":
     try:
-        main()
+        ncm_aberto = st.session_state.get("selected_ncm")
+        with perfilando(f"script NCM {ncm_aberto}" if ncm_aberto else "script",
+                        ativo=config.PERFIL_ATIVO or st.query_params.get("perfil") == "1") as perfil:
+            with rastreando("execução do script", ativo=config.RASTRO_ATIVO or st.query_params.get("debug") == "1") as rastro:
+                if rastro is not None:
+                    rastro.atributos["ncm"] = ncm_aberto
+                main()
+        if perfil is not None and st.query_params.get("perfil") == "1":
+            exibir_perfil(perfil)
     except Exception as e:
          logging.critical(f"Erro fatal não capturado na execução principal: {e}", exc_info=True)
          try:
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark dos extratores de texto de PDF (velocidade e recall de NCMs).
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_backends_pdf                      # pautas sintéticas
+    python -m benchmarks.bench_backends_pdf --corpus pautas/     # pautas reais (*.pdf)
+    python -m benchmarks.bench_backends_pdf --recall-minimo 0.995 --saida resultado.json
+
+Nas pautas sintéticas o gabarito são os NCMs inseridos no PDF. Nas pautas
+reais não há gabarito, então usa-se a união do que todos os extratores
+encontraram. Ao final é indicado o extrator mais rápido que atinge o recall
+mínimo, no formato da variável de configuração FICHA_NCM_PDF_BACKEND.
+"""
+import argparse
+import json
+import pathlib
+import time
+
+from benchmarks.pdf_sintetico import gerar_pdf_pauta
+from modulos.extracao_pdf import EXTRATORES, extrair_ncms
+
+
+def _corpus_sintetico():
+    for paginas, sem_ncm in [(50, 0.0), (200, 0.5), (400, 0.8)]:
+        pdf_bytes, esperado = gerar_pdf_pauta(paginas, semente=paginas, fracao_paginas_sem_ncm=sem_ncm)
+        gabarito = {ncm for ncms in esperado.values() for ncm in ncms}
+        yield f"sintetica_{paginas}p_{int(sem_ncm * 100)}pct_vazias", pdf_bytes, gabarito
+
+
+def _corpus_diretorio(diretorio):
+    for caminho in sorted(pathlib.Path(diretorio).glob("*.pdf")):
+        yield caminho.name, caminho.read_bytes(), None
+
+
+def escolher_backend(resultados, recall_minimo):
+    """
+    Escolhe o extrator mais rápido (tempo total no corpus) cujo recall mínimo
+    entre os documentos atinge `recall_minimo`. Retorna None se nenhum atinge.
+    """
+    aprovados = [(r["tempo_total_s"], nome) for nome, r in resultados.items() if r["recall_min"] >= recall_minimo]
+    return min(aprovados)[1] if aprovados else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="diretório com pautas reais em PDF (padrão: pautas sintéticas)")
+    parser.add_argument("--backends", nargs="+", default=list(EXTRATORES), choices=list(EXTRATORES))
+    parser.add_argument("--recall-minimo", type=float, default=1.0)
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    args = parser.parse_args()
+
+    documentos = list(_corpus_diretorio(args.corpus) if args.corpus else _corpus_sintetico())
+    if not documentos:
+        raise SystemExit(f"Nenhum PDF encontrado em '{args.corpus}'.")
+
+    # Extração sequencial para medir o custo do extrator, sem o pool de processos
+    encontrados, tempos = {}, {}
+    for nome_doc, pdf_bytes, _ in documentos:
+        for backend in args.backends:
+            inicio = time.perf_counter()
+            encontrados[nome_doc, backend] = set(extrair_ncms(pdf_bytes, processos=1, backend=backend))
+            tempos[nome_doc, backend] = time.perf_counter() - inicio
+
+    resultados = {backend: {"tempo_total_s": 0.0, "recall_min": 1.0, "documentos": {}} for backend in args.backends}
+    print(f"{'documento':<34} {'extrator':<13} {'tempo (s)':>9} {'recall':>7}")
+    for nome_doc, _, gabarito in documentos:
+        if gabarito is None:
+            gabarito = set().union(*(encontrados[nome_doc, b] for b in args.backends))
+        for backend in args.backends:
+            achados = encontrados[nome_doc, backend]
+            recall = len(achados & gabarito) / len(gabarito) if gabarito else 1.0
+            r = resultados[backend]
+            r["tempo_total_s"] += tempos[nome_doc, backend]
+            r["recall_min"] = min(r["recall_min"], recall)
+            r["documentos"][nome_doc] = {"tempo_s": tempos[nome_doc, backend], "recall": recall,
+                                         "ncms_encontrados": len(achados), "ncms_gabarito": len(gabarito)}
+            print(f"{nome_doc:<34} {backend:<13} {tempos[nome_doc, backend]:>9.2f} {recall:>7.1%}")
+
+    escolhido = escolher_backend(resultados, args.recall_minimo)
+    print()
+    for backend, r in resultados.items():
+        print(f"{backend:<13} tempo total {r['tempo_total_s']:>7.2f}s  recall mínimo {r['recall_min']:.1%}")
+    if escolhido:
+        print(f"\nMais rápido com recall >= {args.recall_minimo:.1%}: FICHA_NCM_PDF_BACKEND={escolhido}")
+    else:
+        print(f"\nNenhum extrator atingiu recall >= {args.recall_minimo:.1%}.")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({"recall_minimo": args.recall_minimo, "escolhido": escolhido, "resultados": resultados},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark da extração de NCMs de pautas em PDF: sequencial x paralela.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_extracao_pdf --paginas 100 300 600 --processos 4
+    python -m benchmarks.bench_extracao_pdf --limiar --processos 4
+
+Para cada tamanho gera uma pauta sintética, mede as duas extrações e confere
+que os resultados são idênticos (e iguais aos NCMs inseridos no PDF).
+
+Com --limiar, mede o custo por página da extração sequencial e o de iniciar
+o pool de processos e estima a partir de quantas páginas a extração paralela
+compensa, no formato de FICHA_NCM_PDF_PAGINAS_MINIMAS_PARALELO.
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.pdf_sintetico import gerar_pdf_pauta
+from modulos.config import PDF_BACKEND
+from modulos.extracao_pdf import _inicializar_processo, extrair_ncms, numero_processos
+
+
+def _medir(funcao, repeticoes):
+    melhor, resultado = float("inf"), None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def estimar_limiar(processos, repeticoes, paginas=200):
+    """
+    Páginas a partir das quais a extração paralela compensa: o tempo ganho ao
+    dividir as páginas entre `processos` núcleos supera o de iniciar o pool.
+
+    Returns:
+        tuple: (segundos por página, segundos para iniciar o pool, limiar ou None se nunca compensa).
+    """
+    pdf_bytes, _ = gerar_pdf_pauta(paginas, semente=paginas)
+    t_seq, _ = _medir(lambda: extrair_ncms(pdf_bytes, processos=1), repeticoes)
+    por_pagina = t_seq / paginas
+
+    def iniciar_pool():
+        # Mesmo contexto e inicializador da extração: cada processo abre o PDF
+        with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_inicializar_processo, initargs=(pdf_bytes, PDF_BACKEND)) as pool:
+            list(pool.map(abs, range(processos)))
+    t_pool, _ = _medir(iniciar_pool, repeticoes)
+    if processos < 2:
+        return por_pagina, t_pool, None
+    return por_pagina, t_pool, math.ceil(t_pool / (por_pagina * (1 - 1 / processos)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paginas", type=int, nargs="+", default=[100, 300, 600])
+    parser.add_argument("--processos", type=int, default=None, help="padrão: configuração (um por núcleo)")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--limiar", action="store_true",
+                        help="estima o número de páginas a partir do qual a extração paralela compensa")
+    args = parser.parse_args()
+    processos = numero_processos(args.processos)
+
+    if args.limiar:
+        por_pagina, t_pool, limiar = estimar_limiar(processos, args.repeticoes)
+        print(f"{os.cpu_count()} núcleos, {processos} processos: {por_pagina * 1000:.1f} ms por página; "
+              f"{t_pool:.2f} s para iniciar o pool.")
+        if limiar is None:
+            print("Com um único núcleo a extração paralela não compensa (a extração é sempre sequencial).")
+        else:
+            print(f"FICHA_NCM_PDF_PAGINAS_MINIMAS_PARALELO={limiar}")
+        return
+
+    print(f"{'páginas':>8} {'sequencial (s)':>15} {'paralelo (s)':>13} {'ganho':>7}  idêntico")
+    for num_paginas in args.paginas:
+        pdf_bytes, esperado = gerar_pdf_pauta(num_paginas, semente=num_paginas)
+        ncms_esperados = sorted({ncm for ncms in esperado.values() for ncm in ncms})
+        t_seq, r_seq = _medir(lambda: extrair_ncms(pdf_bytes, processos=1), args.repeticoes)
+        t_par, r_par = _medir(lambda: extrair_ncms(pdf_bytes, processos=processos), args.repeticoes)
+        identico = r_seq == r_par == ncms_esperados
+        print(f"{num_paginas:>8} {t_seq:>15.2f} {t_par:>13.2f} {t_seq / t_par:>6.1f}x  {'sim' if identico else 'NÃO'}")
+        if not identico:
+            raise SystemExit(f"Resultado divergente para {num_paginas} páginas.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Formatação pt_BR vetorizada (modulos/formatacao.py) x babel, célula a célula.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_formatacao --valores 200000
+
+Para cada padrão usado no app ("#,##0.##", "#,##0.00" e "#,##0") formata a
+mesma amostra com as duas implementações, confere que as strings são
+idênticas e mostra o tempo de cada uma. A amostra mistura valores comuns,
+empates de arredondamento (2.675, 0.125), negativos que arredondam para zero
+("-0"), inteiros, números acima de 2**53 e infinitos. Sai com código 1 na
+primeira divergência.
+
+O babel não é dependência do app; instale-o só para rodar a comparação
+(pip install babel).
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from modulos.formatacao import formatar_decimal
+
+# Padrão do babel -> (casas_min, casas_max) de formatar_decimal
+PADROES = {"#,##0.##": (0, 2), "#,##0.00": (2, 2), "#,##0": (0, 0)}
+
+
+def amostra(quantidade, semente=1):
+    """Valores float variados, com os casos de borda do arredondamento e do sinal."""
+    rnd = random.Random(semente)
+    bordas = [0.0, -0.0, 0.5, 1.5, 2.5, -2.5, 0.125, 0.375, 2.675, 1.005, -0.004, -0.001, 999.995, 1e15 + 0.5,
+              2.0 ** 53, 2.0 ** 63, -(2.0 ** 70), 123456789.125, float("inf"), float("-inf")]
+    valores = bordas + [round(rnd.uniform(-1e6, 1e6), rnd.choice((0, 1, 2, 3, 4))) for _ in range(quantidade // 2)]
+    valores += [rnd.uniform(-1e12, 1e12) * 10 ** rnd.randint(-8, 0) for _ in range(quantidade - len(valores))]
+    return valores
+
+
+def _medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+def comparar(valores, padrao):
+    """(segundos babel, segundos vetorizado, [(valor, babel, vetorizado)] divergentes)."""
+    from babel.numbers import format_decimal
+    casas_min, casas_max = PADROES[padrao]
+    t_babel, esperado = _medir(lambda: [format_decimal(v, padrao, locale="pt_BR") for v in valores])
+    t_vetor, obtido = _medir(lambda: formatar_decimal(np.array(valores), casas_min, casas_max))
+    divergentes = [(v, e, o) for v, e, o in zip(valores, esperado, obtido) if e != o]
+    return t_babel, t_vetor, divergentes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--valores", type=int, default=200000)
+    parser.add_argument("--semente", type=int, default=1)
+    args = parser.parse_args()
+    try:
+        import babel  # noqa: F401
+    except ImportError:
+        raise SystemExit("babel não instalado: pip install babel")
+
+    valores = amostra(args.valores, args.semente)
+    inteiros = [int(v) for v in valores if np.isfinite(v) and abs(v) < 2 ** 62]
+    print(f"{'padrão':<10} {'entrada':<7} {'babel (s)':>10} {'vetorizado (s)':>15} {'ganho':>7}  idêntico")
+    falhou = False
+    for padrao in PADROES:
+        for rotulo, entrada in (("float", valores), ("int", inteiros)):
+            t_babel, t_vetor, divergentes = comparar(entrada, padrao)
+            print(f"{padrao:<10} {rotulo:<7} {t_babel:>10.2f} {t_vetor:>15.3f} {t_babel / t_vetor:>6.1f}x  "
+                  f"{'sim' if not divergentes else f'NÃO ({len(divergentes)})'}")
+            for valor, esperado, obtido in divergentes[:5]:
+                print(f"    {valor!r}: babel {esperado!r}, vetorizado {obtido!r}")
+            falhou |= bool(divergentes)
+    if falhou:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
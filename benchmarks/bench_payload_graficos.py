@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Tamanho (JSON enviado ao navegador) de cada gráfico da página de um NCM.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_payload_graficos --paises 40
+
+Monta os gráficos da página a partir de respostas sintéticas da API
+ComexStat (sem acesso à rede) e mostra os bytes de cada figura e o total por
+NCM. A última coluna repete a medida com o template "streamlit" (o que o
+st.plotly_chart usaria sem o tema enxuto; "plotly" se o Streamlit não estiver
+instalado), para mostrar o quanto o tema enxuto economiza.
+"""
+import argparse
+import random
+
+import pandas as pd
+
+import modulos.processamento as proc
+import modulos.grafico_importacoes_12meses as graf_12m
+from modulos.fila_analises import GRAFICOS_DESEMPENHO, gerar_grafico_desempenho
+from modulos.grafico_treemap_import import gerar_treemap_importacoes_2024
+from modulos.grafico_treemap_export import gerar_treemap_exportacoes_2024
+from modulos.tema_graficos import tamanho_payload
+
+PAISES = [f"País {i:03d}" for i in range(250)]
+
+
+def _series_sinteticas(ultimo_ano, mes, semente):
+    rnd = random.Random(semente)
+
+    def registros(anos):
+        return [{"year": str(ano), "metricFOB": rnd.uniform(1e5, 5e7), "metricKG": rnd.uniform(1e4, 5e6)} for ano in anos]
+
+    anuais = range(1997, ultimo_ano + 1)
+    df_hist, _ = proc.processar_dados_export_import(registros(anuais), registros(anuais), mes)
+    df_parcial, _ = proc.processar_dados_ano_anterior(registros([ultimo_ano - 1]), registros([ultimo_ano - 1]), mes)
+    df_atual, _ = proc.processar_dados_ano_atual(registros([ultimo_ano]), registros([ultimo_ano]), mes)
+    return {"df_hist_anual": df_hist, "df_2024_parcial": df_parcial, "df_2025_parcial": df_atual}
+
+
+def montar_graficos(num_paises, semente=1, ultimo_ano=2025, mes=3):
+    """{nome: figura} com todos os gráficos da página de um NCM sintético."""
+    rnd = random.Random(semente)
+    series = _series_sinteticas(ultimo_ano, mes, semente)
+    figuras = {chave: gerar_grafico_desempenho(chave, series, "8410.20.30", mes, ultimo_ano) for chave in GRAFICOS_DESEMPENHO}
+    por_pais = pd.DataFrame({"country": rnd.sample(PAISES, num_paises),
+                             "metricFOB": [rnd.uniform(1e3, 1e7) for _ in range(num_paises)]})
+    figuras["treemap_import"] = gerar_treemap_importacoes_2024(por_pais, "84102030", "8410.20.30")
+    figuras["treemap_export"] = gerar_treemap_exportacoes_2024(por_pais, "84102030", "8410.20.30")
+    mensal = [{"year": str(ano), "monthNumber": str(m), "metricKG": rnd.uniform(0, 1e6)}
+              for ano in range(2019, ultimo_ano + 1) for m in range(1, 13)]
+    graf_12m._obter_dados_mensais_comex = lambda *args, **kwargs: mensal
+    figuras["importacoes_12meses"] = graf_12m.gerar_grafico_importacoes_12meses("84102030", "8410.20.30")
+    return figuras
+
+
+def template_streamlit():
+    """Registra o template do Streamlit e devolve o nome dele ("plotly" sem o Streamlit)."""
+    try:
+        from streamlit.elements.lib.streamlit_plotly_theme import configure_streamlit_plotly_theme
+    except ImportError:
+        return "plotly"
+    configure_streamlit_plotly_theme()
+    return "streamlit"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paises", type=int, default=40, help="países nos treemaps")
+    args = parser.parse_args()
+
+    figuras = montar_graficos(args.paises)
+    padrao = template_streamlit()
+    print(f"{'gráfico':<22} {'traços':>7} {'bytes':>9} {'tema ' + padrao:>16}")
+    total, total_padrao = 0, 0
+    for nome, fig in figuras.items():
+        tamanho = tamanho_payload(fig)
+        tamanho_padrao = tamanho_payload(fig.update_layout(template=padrao))
+        total, total_padrao = total + tamanho, total_padrao + tamanho_padrao
+        print(f"{nome:<22} {len(fig.data):>7} {tamanho:>9} {tamanho_padrao:>16}")
+    print(f"{'total por NCM':<22} {'':>7} {total:>9} {total_padrao:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Teste de carga: várias sessões simultâneas do app contra a API simulada.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.carga_sessoes --sessoes 8 --ncms-por-sessao 3 --latencia 300
+    python -m benchmarks.carga_sessoes --sessoes 20 --saida carga.json --max-p95 15
+
+Cada sessão é um AppTest do Streamlit (sem navegador) rodando o app.py neste
+mesmo processo, como as sessões de um servidor real: os módulos, a fila de
+análises e os caches em memória são compartilhados entre elas. O AppTest não
+permite duas execuções do script ao mesmo tempo, então elas se revezam (a
+espera entra no tempo da página, como a disputa pela CPU num servidor); a
+leitura do PDF, as análises da fila e as chamadas à API feitas por elas correm
+em paralelo, como no app real.
+
+Cada sessão abre a página, carrega uma pauta em PDF sintética com NCMs da
+planilha CGIM do repositório, espera a leitura do PDF e abre alguns NCMs da
+pauta, um de cada vez, esperando a análise terminar (como quem acompanha a
+barra de progresso).
+
+A API é o simulador de benchmarks/comex_simulado.py, iniciado aqui com a
+latência pedida (ou um já em execução, com --api-url), e os caches em disco
+ficam numa pasta temporária, para que a execução comece sempre a frio.
+
+Ao final mostra a vazão (páginas por minuto), os tempos p50/p95 de cada tipo de
+página, o pico de memória (RSS) do processo e quantas requisições chegaram à
+API. Com --max-p95, termina com erro se o p95 de abrir um NCM passar do limite.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLANILHA = os.path.join(RAIZ, "20241011_NCMs-CGIM-DINTE.xlsx")
+
+
+def _rss_mb():
+    """RSS atual do processo, em MB (Linux; 0 se indisponível)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as arquivo:
+            for linha in arquivo:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def _pico_rss_mb():
+    """Maior RSS do processo desde o início, em MB (ru_maxrss vem em KB no Linux e em bytes no macOS)."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)]
+
+
+# O AppTest usa um Runtime global do Streamlit, trocado a cada execução: duas
+# execuções do script ao mesmo tempo, em threads diferentes, se atrapalham
+_lock_execucao = threading.Lock()
+
+
+def _executar(at, acao=None):
+    """Executa o script da sessão (opcionalmente após uma interação), uma sessão por vez."""
+    with _lock_execucao:
+        return (acao or at).run()
+
+
+class Sessao:
+    """Uma sessão simulada: abre o app, carrega a pauta e abre NCMs."""
+
+    def __init__(self, indice, pdf_bytes, num_ncms, timeout):
+        self.indice, self.pdf_bytes, self.num_ncms, self.timeout = indice, pdf_bytes, num_ncms, timeout
+        self.paginas = []  # (tipo, segundos)
+        self.erros = []
+
+    def _medir(self, tipo, acao):
+        inicio = time.perf_counter()
+        acao()
+        self.paginas.append((tipo, time.perf_counter() - inicio))
+
+    def _verificar(self, at, etapa):
+        if at.exception:
+            raise RuntimeError(f"{etapa}: {at.exception[0].value}")
+
+    def executar(self):
+        from streamlit.testing.v1 import AppTest
+        from modulos.fila_analises import fila_analises
+
+        at = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=self.timeout)
+        try:
+            self._medir("abrir o app", lambda: _executar(at))
+            self._verificar(at, "abrir o app")
+
+            def processar_pauta():
+                _executar(at, at.file_uploader(key="pdf_uploader").upload(f"pauta_{self.indice}.pdf", self.pdf_bytes, "application/pdf"))
+                _executar(at, at.button(key="process_button").click())
+                # A leitura do PDF segue em segundo plano; a página é atualizada até ela terminar
+                limite = time.monotonic() + self.timeout
+                while "extracao_pdf" in at.session_state:
+                    if time.monotonic() > limite:
+                        raise TimeoutError("leitura da pauta")
+                    time.sleep(0.2)
+                    _executar(at)
+            self._medir("processar a pauta", processar_pauta)
+            self._verificar(at, "processar a pauta")
+
+            ncms = list(at.session_state["ncms_filtradas"])
+            if not ncms:
+                raise RuntimeError("nenhum NCM da CGIM encontrado na pauta")
+            mes, ano = at.session_state["last_updated_month"], at.session_state["last_updated_year"]
+            for ncm in random.Random(self.indice).sample(ncms, min(self.num_ncms, len(ncms))):
+                def abrir_ncm():
+                    at.session_state["selected_ncm"] = ncm
+                    _executar(at)
+                    tarefa = fila_analises.obter(ncm, mes, ano)
+                    if tarefa is not None and not tarefa.aguardar(self.timeout):
+                        raise TimeoutError(f"análise do NCM {ncm}")
+                    _executar(at)
+                self._medir("abrir um NCM", abrir_ncm)
+                self._verificar(at, f"abrir o NCM {ncm}")
+        except Exception as e:
+            self.erros.append(f"sessão {self.indice}: {e}")
+
+
+def _gerar_pautas(quantidade, paginas):
+    """PDFs de pauta com NCMs sorteados da aba CGIM da planilha do repositório."""
+    from benchmarks.pdf_sintetico import gerar_pdf_pauta
+    from modulos.processamento import carregar_dados_excel
+
+    ncms = carregar_dados_excel(PLANILHA)["NCMs-CGIM-DINTE"]["NCM"].dropna().unique().tolist()
+    ncms_fmt = [f"{n[:4]}.{n[4:6]}.{n[6:]}" for n in ncms]
+    return [gerar_pdf_pauta(paginas, ncms_por_pagina=2, semente=i, ncms=random.Random(i).sample(ncms_fmt, 40),
+                            fracao_paginas_sem_ncm=0.3)[0]
+            for i in range(quantidade)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessoes", type=int, default=8, help="sessões simultâneas")
+    parser.add_argument("--ncms-por-sessao", type=int, default=3, help="NCMs abertos por sessão")
+    parser.add_argument("--pautas", type=int, default=None, help="pautas distintas (padrão: uma por sessão)")
+    parser.add_argument("--paginas", type=int, default=20, help="páginas de cada pauta")
+    parser.add_argument("--latencia", type=float, default=300.0, help="latência média da API simulada (ms)")
+    parser.add_argument("--variacao", type=float, default=100.0, help="variação da latência (ms)")
+    parser.add_argument("--fracao-429", type=float, default=0.0, help="fração das consultas respondidas com HTTP 429")
+    parser.add_argument("--api-url", help="usa uma API já em execução (ex.: python -m benchmarks.comex_simulado)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="limite (s) de cada página")
+    parser.add_argument("--saida", help="grava o relatório neste arquivo JSON")
+    parser.add_argument("--max-p95", type=float, help="falha se o p95 de abrir um NCM passar deste valor (s)")
+    args = parser.parse_args()
+
+    # A configuração é lida na importação dos módulos: tudo precisa estar definido antes
+    simulado = None
+    if args.api_url:
+        api_url = args.api_url.rstrip("/")
+    else:
+        from benchmarks.comex_simulado import ComexSimulado
+        simulado = ComexSimulado(0, args.latencia, args.variacao, args.fracao_429).iniciar()
+        api_url = simulado.url
+    dir_cache = tempfile.mkdtemp(prefix="carga_ficha_ncm_")
+    os.environ.update({
+        "FICHA_NCM_API_URL": api_url,
+        "FICHA_NCM_PLANILHA_LOCAL": PLANILHA,
+        "FICHA_NCM_DIR_CACHE": dir_cache,
+        "FICHA_NCM_ARQUIVO_RASTRO": "",
+    })
+    import logging
+    logging.disable(logging.WARNING)
+
+    def estatisticas_api():
+        with urllib.request.urlopen(f"{api_url}/_estatisticas", timeout=10) as resposta:
+            return json.load(resposta)
+
+    pautas = _gerar_pautas(args.pautas or args.sessoes, args.paginas)
+    api_inicio = estatisticas_api()
+    rss_inicio = _rss_mb()
+    print(f"{args.sessoes} sessões, {args.ncms_por_sessao} NCMs cada, API em {api_url} "
+          f"(latência {args.latencia:.0f} ± {args.variacao:.0f} ms), cache em {dir_cache}")
+
+    sessoes = [Sessao(i, pautas[i % len(pautas)], args.ncms_por_sessao, args.timeout) for i in range(args.sessoes)]
+    threads = [threading.Thread(target=s.executar, name=f"sessao-{s.indice}") for s in sessoes]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    api_fim = estatisticas_api()
+    if simulado:
+        simulado.parar()
+
+    paginas = [p for s in sessoes for p in s.paginas]
+    erros = [e for s in sessoes for e in s.erros]
+    por_tipo = {}
+    for tipo, segundos in paginas:
+        por_tipo.setdefault(tipo, []).append(segundos)
+    requisicoes = {endpoint: n - api_inicio["por_endpoint"].get(endpoint, 0)
+                   for endpoint, n in api_fim["por_endpoint"].items()}
+    ncms_abertos = len(por_tipo.get("abrir um NCM", []))
+    relatorio = {
+        "parametros": vars(args),
+        "duracao_s": duracao,
+        "paginas_por_minuto": len(paginas) / duracao * 60,
+        "ncms_por_minuto": ncms_abertos / duracao * 60,
+        "paginas": {tipo: {"quantidade": len(t), "p50_s": _percentil(t, 50), "p95_s": _percentil(t, 95),
+                           "media_s": statistics.mean(t), "max_s": max(t)}
+                    for tipo, t in por_tipo.items()},
+        "rss_inicio_mb": rss_inicio,
+        "rss_pico_mb": _pico_rss_mb(),
+        "requisicoes_api": {"total": sum(requisicoes.values()), "por_ncm_aberto": sum(requisicoes.values()) / max(ncms_abertos, 1),
+                            "por_endpoint": requisicoes},
+        "erros": erros,
+    }
+
+    print(f"\nDuração: {duracao:.1f} s — {relatorio['paginas_por_minuto']:.1f} páginas/min, "
+          f"{relatorio['ncms_por_minuto']:.1f} NCMs abertos/min")
+    print(f"\n{'página':<20} {'qtd':>5} {'p50 (s)':>9} {'p95 (s)':>9} {'máx (s)':>9}")
+    for tipo, r in relatorio["paginas"].items():
+        print(f"{tipo:<20} {r['quantidade']:>5} {r['p50_s']:>9.2f} {r['p95_s']:>9.2f} {r['max_s']:>9.2f}")
+    print(f"\nMemória (RSS): {rss_inicio:.0f} MB antes das sessões, pico de {relatorio['rss_pico_mb']:.0f} MB")
+    print(f"Requisições à API: {relatorio['requisicoes_api']['total']} "
+          f"({relatorio['requisicoes_api']['por_ncm_aberto']:.1f} por NCM aberto)")
+    for endpoint, n in sorted(requisicoes.items()):
+        print(f"  {endpoint:<40} {n:>6}")
+    if erros:
+        print(f"\n{len(erros)} sessões com erro:")
+        for erro in erros:
+            print(f"  {erro}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nRelatório gravado em {args.saida}.")
+    if erros:
+        raise SystemExit(f"{len(erros)} sessões terminaram com erro.")
+    p95_ncm = relatorio["paginas"].get("abrir um NCM", {}).get("p95_s")
+    if args.max_p95 is not None and p95_ncm is not None and p95_ncm > args.max_p95:
+        raise SystemExit(f"p95 de abrir um NCM ({p95_ncm:.2f} s) acima do limite de {args.max_p95:.2f} s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita a API ComexStat, com latência configurável.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.comex_simulado --porta 8765 --latencia 300 --variacao 100
+    FICHA_NCM_API_URL=http://127.0.0.1:8765 streamlit run app.py
+
+Atende os endpoints usados pelo app (/general/dates/updated, /tables/ncm/<NCM>
+e POST /general) com respostas sintéticas de benchmarks/comex_sintetico.py:
+os valores dependem só do NCM, do fluxo e do período pedidos, então a mesma
+consulta devolve sempre a mesma resposta. Cada requisição espera a latência
+configurada antes de responder e uma fração delas pode receber HTTP 429, para
+exercitar as novas tentativas do app. GET /_estatisticas devolve quantas
+requisições cada endpoint recebeu.
+"""
+import argparse
+import collections
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks import comex_sintetico as sint
+
+ATUALIZACAO = {"updated": "2025-09-05", "year": 2025, "monthNumber": 8}
+
+
+def _semente(*partes):
+    return zlib.crc32("|".join(str(p) for p in partes).encode("utf-8"))
+
+
+def responder_general(consulta):
+    """Registros ('data.list') para o corpo de uma consulta POST /general."""
+    ncms = [str(n) for f in consulta.get("filters", []) if f.get("filter") == "ncm" for n in f.get("values", [])] or ["00000000"]
+    detalhes = consulta.get("details", [])
+    metricas = consulta.get("metrics", ["metricFOB", "metricKG"])
+    fluxo = consulta.get("flow", "import")
+    de, ate = consulta["period"]["from"], consulta["period"]["to"]
+    ano_de, ano_ate = int(de[:4]), min(int(ate[:4]), ATUALIZACAO["year"])
+    mes_ate = int(ate[5:7]) if ano_ate == int(ate[:4]) else 12
+    if ano_ate == ATUALIZACAO["year"]:
+        mes_ate = min(mes_ate, ATUALIZACAO["monthNumber"])
+    anos = list(range(ano_de, ano_ate + 1))
+
+    registros = []
+    for ncm in ncms:
+        semente = _semente(ncm, fluxo, de, ate)
+        if "country" in detalhes:
+            novos = sint.registros_por_pais(40, semente)
+        elif consulta.get("monthDetail"):
+            novos = sint.registros_mensais(anos, semente, ate_mes=mes_ate, metricas=metricas)
+        else:
+            novos = sint.registros_anuais(anos, semente)
+        for registro in novos:
+            for metrica in ("metricFOB", "metricKG"):
+                if metrica not in metricas:
+                    registro.pop(metrica, None)
+            if "ncm" in detalhes:
+                registro["coNcm"] = ncm
+            registros.append(registro)
+    return registros
+
+
+class ComexSimulado:
+    """
+    API ComexStat simulada, servida numa thread em segundo plano.
+
+    Args:
+        porta (int): Porta local (0 = escolhida pelo sistema).
+        latencia_ms (float), variacao_ms (float): Espera antes de cada resposta
+            (latência ± variação, uniforme).
+        fracao_429 (float): Fração das consultas POST /general respondidas com HTTP 429.
+    """
+
+    def __init__(self, porta=0, latencia_ms=0.0, variacao_ms=0.0, fracao_429=0.0, semente=0):
+        self.latencia_ms, self.variacao_ms, self.fracao_429 = latencia_ms, variacao_ms, fracao_429
+        self.contagens = collections.Counter()
+        self._rng = random.Random(semente)
+        self._lock = threading.Lock()
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", porta), self._manipulador())
+        self._servidor.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name="comex-simulado", daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def estatisticas(self):
+        with self._lock:
+            return {"total": sum(self.contagens.values()), "por_endpoint": dict(self.contagens)}
+
+    def _registrar(self, endpoint):
+        """Conta a requisição e sorteia a espera e se ela recebe 429."""
+        with self._lock:
+            self.contagens[endpoint] += 1
+            espera = max(self.latencia_ms + self._rng.uniform(-self.variacao_ms, self.variacao_ms), 0) / 1000
+            recusar = endpoint.startswith("POST") and self._rng.random() < self.fracao_429
+        time.sleep(espera)
+        return recusar
+
+    def _manipulador(self):
+        simulado = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, formato, *args):
+                pass
+
+            def _json(self, corpo, status=200):
+                dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def do_GET(self):
+                caminho = self.path.split("?", 1)[0].rstrip("/")
+                if caminho == "/_estatisticas":
+                    return self._json(simulado.estatisticas())
+                if caminho == "/general/dates/updated":
+                    simulado._registrar("GET /general/dates/updated")
+                    return self._json({"data": ATUALIZACAO, "success": True})
+                if caminho.startswith("/tables/ncm/"):
+                    ncm = caminho.rsplit("/", 1)[-1]
+                    simulado._registrar("GET /tables/ncm")
+                    return self._json({"data": [{"id": ncm, "text": f"Produto sintético do NCM {ncm}"}], "success": True})
+                self._json({"message": "não encontrado"}, 404)
+
+            def do_POST(self):
+                corpo = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.path.split("?", 1)[0].rstrip("/") != "/general":
+                    return self._json({"message": "não encontrado"}, 404)
+                try:
+                    consulta = json.loads(corpo)
+                    tipo = "mensal" if consulta.get("monthDetail") else "anual"
+                    if "country" in consulta.get("details", []):
+                        tipo = "por país"
+                except (ValueError, AttributeError):
+                    return self._json({"message": "corpo inválido"}, 400)
+                if simulado._registrar(f"POST /general ({tipo})"):
+                    return self._json({"message": "Too Many Requests"}, 429)
+                self._json({"data": {"list": responder_general(consulta)}, "success": True})
+
+        return Manipulador
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=300.0, help="latência média de cada resposta (ms)")
+    parser.add_argument("--variacao", type=float, default=100.0, help="variação da latência, para mais ou para menos (ms)")
+    parser.add_argument("--fracao-429", type=float, default=0.0, help="fração das consultas respondidas com HTTP 429")
+    args = parser.parse_args()
+
+    simulado = ComexSimulado(args.porta, args.latencia, args.variacao, args.fracao_429).iniciar()
+    print(f"API ComexStat simulada em {simulado.url} (Ctrl+C para encerrar)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(json.dumps(simulado.estatisticas(), ensure_ascii=False, indent=2))
+        simulado.parar()
+
+
+if __name__ == "__main__":
+    main()
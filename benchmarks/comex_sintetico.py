@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Respostas sintéticas da API ComexStat para os benchmarks.
+
+Os registros têm o mesmo formato da lista 'data.list' devolvida pelo endpoint
+/general (ano, mês e métricas como strings; 'coNcm' e 'country' quando esses
+detalhes são pedidos) e são reprodutíveis: a mesma semente gera sempre os
+mesmos valores. Os volumes seguem uma tendência com sazonalidade e ruído,
+para que somas móveis, variações e preços médios tenham valores realistas.
+"""
+import math
+import random
+
+PAISES = [f"País {i:03d}" for i in range(250)]
+
+
+def ncms_sinteticos(quantidade, semente=0):
+    """NCMs de 8 dígitos distintos (ex.: "84102030"), em ordem sorteada."""
+    rng = random.Random(semente)
+    ncms = set()
+    while len(ncms) < quantidade:
+        ncms.add(f"{rng.randint(2501, 9706):04d}{rng.randint(10, 99):02d}{rng.randint(10, 99):02d}")
+    return rng.sample(sorted(ncms), quantidade)
+
+
+def _volume(rng, base, indice, sazonal=0.0):
+    """Volume com tendência de crescimento, sazonalidade (mensal) e ruído."""
+    tendencia = base * (1 + 0.04 * indice)
+    return max(tendencia * (1 + sazonal * math.sin(indice * math.pi / 6)) * rng.uniform(0.7, 1.3), 0)
+
+
+def registros_anuais(anos, semente=0, ncm=None):
+    """Um registro por ano (consulta com monthDetail=False)."""
+    rng = random.Random(semente)
+    base_kg, preco = rng.uniform(1e5, 5e7), rng.uniform(0.5, 40)
+    registros = []
+    for i, ano in enumerate(anos):
+        kg = _volume(rng, base_kg, i)
+        registro = {"year": str(ano), "metricFOB": str(round(kg * preco * rng.uniform(0.9, 1.1))), "metricKG": str(round(kg))}
+        if ncm:
+            registro["coNcm"] = ncm
+        registros.append(registro)
+    return registros
+
+
+def registros_mensais(anos, semente=0, ncms=None, ate_mes=12, metricas=("metricFOB", "metricKG")):
+    """
+    Um registro por mês (monthDetail=True) de cada NCM, até `ate_mes` no último ano.
+    Alguns meses ficam sem registro, como acontece na API para NCMs pouco movimentados.
+    """
+    rng = random.Random(semente)
+    registros = []
+    for ncm in ncms or [None]:
+        base_kg, preco = rng.uniform(1e3, 5e6), rng.uniform(0.5, 40)
+        indice = 0
+        for ano in anos:
+            for mes in range(1, (ate_mes if ano == anos[-1] else 12) + 1):
+                indice += 1
+                if rng.random() < 0.03:
+                    continue
+                kg = _volume(rng, base_kg, indice / 12, sazonal=0.25)
+                registro = {"year": str(ano), "monthNumber": str(mes)}
+                if "metricFOB" in metricas:
+                    registro["metricFOB"] = str(round(kg * preco * rng.uniform(0.9, 1.1)))
+                if "metricKG" in metricas:
+                    registro["metricKG"] = str(round(kg))
+                if ncm:
+                    registro["coNcm"] = ncm
+                registros.append(registro)
+    return registros
+
+
+def registros_por_pais(num_paises, semente=0, ncms=None):
+    """Importações de um ano por país (details=["country"]), com concentração típica nos maiores."""
+    rng = random.Random(semente)
+    registros = []
+    for ncm in ncms or [None]:
+        for posicao, pais in enumerate(rng.sample(PAISES, num_paises)):
+            registro = {"country": pais, "metricFOB": str(round(rng.uniform(1e3, 1e6) * 1e7 / (posicao + 1) ** 1.5 / 1e3))}
+            if ncm:
+                registro["coNcm"] = ncm
+            registros.append(registro)
+    return registros
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Gerador de pautas sintéticas em PDF para os benchmarks de extração.
+
+Escreve o PDF diretamente (objetos, fluxos de conteúdo e tabela xref), sem
+depender de bibliotecas de geração, com linhas de texto no estilo das pautas
+reais: itens com NCM no formato xxxx.xx.xx, descrições e alíquotas.
+"""
+import random
+
+_DESCRICOES = [
+    "Chapas e tiras de aluminio, de espessura superior a 0,2 mm",
+    "Tubos de aco sem costura, laminados a quente",
+    "Vidro float incolor, de espessura nao superior a 6 mm",
+    "Fios de cobre refinado, com maior dimensao da secao superior a 6 mm",
+    "Papel kraft para sacos, nao revestido, em rolos",
+    "Barras de ferro ou aco nao ligado, simplesmente forjadas",
+    "Cloreto de sodio puro, a granel",
+    "Pastas quimicas de madeira, a soda ou ao sulfato",
+]
+
+
+def _ncm_aleatorio(rng):
+    return f"{rng.randint(2501, 9706):04d}.{rng.randint(10, 99):02d}.{rng.randint(10, 99):02d}"
+
+
+def _escapar(texto):
+    return texto.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def gerar_pdf_pauta(num_paginas, ncms_por_pagina=8, linhas_por_pagina=40, semente=0, ncms=None,
+                    fracao_paginas_sem_ncm=0.0):
+    """
+    Gera uma pauta sintética.
+
+    Args:
+        num_paginas (int): Número de páginas.
+        ncms_por_pagina (int): Quantidade de linhas com NCM por página (as demais
+            são texto sem NCM). Use 0 para páginas sem nenhum NCM.
+        linhas_por_pagina (int): Total de linhas de texto por página.
+        semente (int): Semente do gerador aleatório (resultado reprodutível).
+        ncms (list | None): NCMs a sortear; se None, são gerados aleatoriamente.
+        fracao_paginas_sem_ncm (float): Fração das páginas sem nenhum NCM (atas,
+            capas, anexos), como nas pautas reais.
+
+    Returns:
+        tuple: (pdf_bytes, {indice_pagina: [ncms inseridos na página]})
+    """
+    rng = random.Random(semente)
+    esperado = {}
+    conteudos = []
+    for p in range(num_paginas):
+        linhas = [f"PAUTA DE REUNIAO - PAGINA {p + 1} DE {num_paginas}"]
+        n_ncms = 0 if rng.random() < fracao_paginas_sem_ncm else min(ncms_por_pagina, linhas_por_pagina - 1)
+        posicoes_ncm = set(rng.sample(range(1, linhas_por_pagina), n_ncms))
+        for i in range(1, linhas_por_pagina):
+            if i in posicoes_ncm:
+                ncm = rng.choice(ncms) if ncms else _ncm_aleatorio(rng)
+                esperado.setdefault(p, []).append(ncm)
+                linhas.append(f"{p * 100 + i}. NCM {ncm} - {rng.choice(_DESCRICOES)} - Aliquota {rng.randint(0, 35)}%")
+            else:
+                linhas.append(f"Processo {rng.randint(10000, 99999)}/{rng.randint(2019, 2025)} - {rng.choice(_DESCRICOES)}")
+        comandos = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        comandos += [f"({_escapar(linha)}) '" for linha in linhas]
+        comandos.append("ET")
+        conteudos.append("\n".join(comandos).encode("latin-1"))
+
+    # Objetos: 1 catálogo, 2 árvore de páginas, 3 fonte, depois (página, conteúdo) por página
+    objetos = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for conteudo in conteudos:
+        num_pagina = len(objetos) + 1
+        kids.append(f"{num_pagina} 0 R")
+        objetos.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {num_pagina + 1} 0 R >>".encode("latin-1")
+        )
+        objetos.append(b"<< /Length " + str(len(conteudo)).encode() + b" >>\nstream\n" + conteudo + b"\nendstream")
+    objetos[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode("latin-1")
+
+    saida = bytearray(b"%PDF-1.4\n")
+    deslocamentos = []
+    for n, corpo in enumerate(objetos, start=1):
+        deslocamentos.append(len(saida))
+        saida += f"{n} 0 obj\n".encode() + corpo + b"\nendobj\n"
+    inicio_xref = len(saida)
+    saida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode()
+    for d in deslocamentos:
+        saida += f"{d:010d} 00000 n \n".encode()
+    saida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n".encode()
+    return bytes(saida), esperado
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Relatório do tempo de importação na inicialização do app.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.relatorio_importacao --repeticoes 3 --estrito
+
+Lê os imports de nível de módulo do app.py (inclusive os do bloco try), os
+executa num interpretador novo com `python -X importtime` e mostra o tempo
+total, a parte que cabe ao app (o que o próprio Streamlit já importa é
+descontado), os módulos mais caros e se algum módulo pesado (Plotly Express,
+PyPDF2, babel...) foi carregado na inicialização, em vez de no primeiro uso.
+Com --estrito, termina com erro nesse caso (usado no CI).
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Só devem ser importados quando a funcionalidade que os usa é acionada. O Streamlit já
+# carrega parte do Plotly (plotly.graph_objects), então a verificação é por módulo.
+MODULOS_PESADOS = ("plotly.express", "PyPDF2", "pdfplumber", "babel", "matplotlib", "openpyxl", "xlsxwriter")
+
+
+def imports_inicializacao(caminho_app):
+    """Comandos de import executados ao carregar o app (fora de funções)."""
+    with open(caminho_app, encoding="utf-8") as arquivo:
+        arvore = ast.parse(arquivo.read())
+    comandos = []
+    pendentes = list(arvore.body)
+    while pendentes:
+        no = pendentes.pop(0)
+        if isinstance(no, (ast.Import, ast.ImportFrom)):
+            comandos.append(ast.unparse(no))
+        elif isinstance(no, (ast.Try, ast.If)):
+            pendentes.extend(no.body)
+    return comandos
+
+
+def medir(comandos):
+    """
+    Executa os imports num processo novo com -X importtime.
+
+    Returns:
+        list: (módulo, tempo próprio em µs, tempo acumulado em µs), na ordem do relatório.
+    """
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "\n".join(comandos)],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if processo.returncode != 0:
+        raise SystemExit(f"Falha ao importar os módulos do app:\n{processo.stderr[-2000:]}")
+    registros = []
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        registros.append((nome.strip(), int(proprio), int(acumulado)))
+    return registros
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=3, help="mede N vezes e usa a mais rápida")
+    parser.add_argument("--top", type=int, default=15, help="quantos módulos listar")
+    parser.add_argument("--estrito", action="store_true", help="falha se um módulo pesado for carregado na inicialização")
+    parser.add_argument("--resumo", help="acrescenta o relatório em Markdown neste arquivo (ex.: $GITHUB_STEP_SUMMARY)")
+    args = parser.parse_args()
+
+    comandos = imports_inicializacao(os.path.join(RAIZ, "app.py"))
+    registros = min((medir(comandos) for _ in range(args.repeticoes)), key=lambda r: sum(x[1] for x in r))
+    do_streamlit = {nome for nome, *_ in medir(["import streamlit"])}
+    do_app = [r for r in registros if r[0] not in do_streamlit]
+    total_ms = sum(proprio for _, proprio, _ in registros) / 1000
+    app_ms = sum(proprio for _, proprio, _ in do_app) / 1000
+    pesados = sorted(p for p in MODULOS_PESADOS if any(nome == p or nome.startswith(p + ".") for nome, *_ in do_app))
+    mais_caros = sorted(do_app, key=lambda r: r[1], reverse=True)[:args.top]
+
+    linhas = [
+        f"Tempo de importação na inicialização: {total_ms:.0f} ms ({len(registros)} módulos)",
+        f"Além do Streamlit: {app_ms:.0f} ms ({len(do_app)} módulos)",
+        f"Módulos pesados carregados na inicialização: {', '.join(pesados) or 'nenhum'}",
+        "",
+        f"{'módulo':<50} {'próprio (ms)':>13} {'acumulado (ms)':>15}",
+    ]
+    linhas += [f"{nome:<50} {proprio / 1000:>13.1f} {acumulado / 1000:>15.1f}" for nome, proprio, acumulado in mais_caros]
+    print("\n".join(linhas))
+
+    if args.resumo:
+        with open(args.resumo, "a", encoding="utf-8") as arquivo:
+            arquivo.write("### Tempo de importação na inicialização\n\n")
+            arquivo.write(f"**{total_ms:.0f} ms** ({len(registros)} módulos), dos quais **{app_ms:.0f} ms** "
+                          f"além do Streamlit ({len(do_app)} módulos). "
+                          f"Módulos pesados: {', '.join(pesados) or 'nenhum'}.\n\n")
+            arquivo.write("| módulo | próprio (ms) | acumulado (ms) |\n|---|---:|---:|\n")
+            for nome, proprio, acumulado in mais_caros:
+                arquivo.write(f"| `{nome}` | {proprio / 1000:.1f} | {acumulado / 1000:.1f} |\n")
+
+    if args.estrito and pesados:
+        raise SystemExit(f"Módulos pesados importados na inicialização: {', '.join(pesados)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Suíte de benchmarks dos caminhos quentes, com conferência dos resultados.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.suite --saida resultados.json
+    python -m benchmarks.suite --comparar resultados_anteriores.json --estrito
+    python -m benchmarks.suite --casos graficos. --repeticoes 10
+    python -m benchmarks.suite --atualizar-gabarito
+
+Mede, sobre respostas sintéticas da API ComexStat (sem acesso à rede), o
+processamento das séries (histórico anual de 22 anos e acumulados parciais),
+a montagem dos quadros-resumo, todos os gráficos (desempenho anual, treemaps
+com 200 países, importações em 12 meses sobre 7 anos de dados mensais e
+sobre a série longa desde 1997), a visão geral de uma pauta com vários NCMs,
+a leitura da planilha CGIM do repositório e a extração de NCMs de pautas em
+PDF geradas na hora.
+
+Cada caso guarda a assinatura do resultado (hash dos valores, com números
+arredondados a 10 algarismos significativos; sem dtypes nem o layout das
+figuras, que variam com a versão do pandas/plotly) e a confere com o
+gabarito em benchmarks/gabarito.json: uma otimização que mude algum número
+faz a suíte terminar com erro. Quando a mudança for intencional, regrave o gabarito com
+--atualizar-gabarito e inclua o novo arquivo no mesmo commit.
+
+Os tempos vão para um JSON (--saida) que pode ser comparado com o de uma
+execução anterior (--comparar); com --estrito, casos mais lentos que a
+tolerância também fazem a suíte terminar com erro.
+"""
+import argparse
+import base64
+import datetime
+import hashlib
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import comex_sintetico as sint
+from benchmarks.pdf_sintetico import gerar_pdf_pauta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARQUIVO_GABARITO = os.path.join(RAIZ, "benchmarks", "gabarito.json")
+PLANILHA = os.path.join(RAIZ, "20241011_NCMs-CGIM-DINTE.xlsx")
+
+ULTIMO_ANO, ULTIMO_MES = 2025, 8
+NCM, NCM_FORMATADO = "84102030", "8410.20.30"
+ALGARISMOS = 10
+# Campos de cada traço que entram na assinatura das figuras: os dados
+# desenhados. Layout, estilo e a estrutura do JSON do Plotly ficam de fora
+# (mudam entre versões do plotly sem mudar o que o gráfico mostra).
+CAMPOS_TRACO = ("type", "name", "x", "y", "z", "labels", "values", "parents", "ids", "text", "customdata")
+
+
+# ------------------------------------------------------------------------
+# Assinatura dos resultados
+# ------------------------------------------------------------------------
+def _arredondar(valor):
+    """
+    Números como floats com ALGARISMOS significativos: diferenças de última
+    casa e de dtype (1 em int64 ou 1.0 em float64) não mudam a assinatura.
+    """
+    if isinstance(valor, int) and not isinstance(valor, bool):
+        valor = float(valor)
+    if isinstance(valor, float):
+        if not math.isfinite(valor) or valor == 0:
+            return str(valor) if not math.isfinite(valor) else 0.0
+        return float(f"{valor:.{ALGARISMOS - 1}e}")
+    if isinstance(valor, dict):
+        # Arrays NumPy serializados pelo Plotly como {"dtype", "bdata"[, "shape"]}
+        if "bdata" in valor and "dtype" in valor:
+            array = np.frombuffer(base64.b64decode(valor["bdata"]), dtype=valor["dtype"])
+            if "shape" in valor:
+                array = array.reshape([int(n) for n in str(valor["shape"]).split(",")])
+            return _arredondar(array.tolist())
+        return {chave: _arredondar(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_arredondar(v) for v in valor]
+    return valor
+
+
+def _normalizar(resultado):
+    """
+    Estrutura JSON com os valores do resultado (DataFrames, figuras, tuplas,
+    dicts). DataFrames entram com nomes de colunas e valores, sem os dtypes;
+    figuras, só com os CAMPOS_TRACO de cada traço.
+    """
+    if resultado is None or isinstance(resultado, (str, int, float, bool)):
+        return resultado
+    if isinstance(resultado, pd.DataFrame):
+        return {"colunas": [str(c) for c in resultado.columns],
+                "dados": json.loads(resultado.to_json(orient="values", double_precision=15, date_format="iso"))}
+    if isinstance(resultado, pd.Series):
+        return _normalizar(resultado.to_frame())
+    if hasattr(resultado, "to_plotly_json"):
+        tracos = json.loads(resultado.to_json()).get("data", [])
+        return [{campo: traco[campo] for campo in CAMPOS_TRACO if campo in traco} for traco in tracos]
+    if isinstance(resultado, dict):
+        return {str(chave): _normalizar(v) for chave, v in resultado.items()}
+    if isinstance(resultado, (list, tuple)):
+        return [_normalizar(v) for v in resultado]
+    raise TypeError(f"Tipo de resultado sem assinatura: {type(resultado).__name__}")
+
+
+def assinatura(resultado):
+    """Hash SHA-256 (16 primeiros dígitos) dos valores do resultado."""
+    texto = json.dumps(_arredondar(_normalizar(resultado)), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:16]
+
+
+# ------------------------------------------------------------------------
+# Casos
+# ------------------------------------------------------------------------
+def _series(semente=0):
+    """Séries processadas de um NCM: histórico 2004-2025 e acumulados parciais."""
+    import modulos.processamento as proc
+    anos = range(2004, ULTIMO_ANO + 1)
+    df_hist, _ = proc.processar_dados_export_import(sint.registros_anuais(anos, semente), sint.registros_anuais(anos, semente + 1), ULTIMO_MES)
+    df_2024, _ = proc.processar_dados_ano_anterior(sint.registros_anuais([ULTIMO_ANO - 1], semente + 2),
+                                                   sint.registros_anuais([ULTIMO_ANO - 1], semente + 3), ULTIMO_MES)
+    df_2025, _ = proc.processar_dados_ano_atual(sint.registros_anuais([ULTIMO_ANO], semente + 4),
+                                                sint.registros_anuais([ULTIMO_ANO], semente + 5), ULTIMO_MES)
+    return {"df_hist_anual": df_hist, "df_2024_parcial": df_2024, "df_2025_parcial": df_2025}
+
+
+def montar_casos(num_ncms_pauta=100, paginas_pdf=150):
+    """
+    {nome: função sem argumentos que executa o caso}. As entradas são geradas
+    aqui, fora da medição; só a chamada medida fica dentro da função.
+    """
+    import modulos.processamento as proc
+    import modulos.grafico_importacoes_12meses as graf_12m
+    import modulos.visao_geral_pauta as visao_geral
+    from modulos.extracao_pdf import extrair_ncms
+    from modulos.fila_analises import GRAFICOS_DESEMPENHO, gerar_grafico_desempenho
+    from modulos.grafico_treemap_export import gerar_treemap_exportacoes_2024
+    from modulos.grafico_treemap_import import gerar_treemap_importacoes_2024
+    from modulos.resumo_tabelas import montar_resumos
+
+    casos = {}
+    anos = list(range(2004, ULTIMO_ANO + 1))
+    exp_anual, imp_anual = sint.registros_anuais(anos, 10), sint.registros_anuais(anos, 11)
+    casos["processamento.historico_anual"] = lambda: proc.processar_dados_export_import(exp_anual, imp_anual, ULTIMO_MES)
+
+    exp_parcial = sint.registros_mensais([ULTIMO_ANO], 12, ate_mes=ULTIMO_MES)
+    imp_parcial = sint.registros_mensais([ULTIMO_ANO], 13, ate_mes=ULTIMO_MES)
+    casos["processamento.parciais"] = lambda: proc._processar_dados_parciais(exp_parcial, imp_parcial, ULTIMO_ANO, ULTIMO_MES)
+
+    series = _series()
+    casos["resumo_tabelas.montar_resumos"] = lambda: montar_resumos(
+        series["df_hist_anual"], series["df_2024_parcial"], series["df_2025_parcial"], ULTIMO_MES)
+
+    for chave in GRAFICOS_DESEMPENHO:
+        casos[f"graficos.{chave}"] = (lambda chave=chave: gerar_grafico_desempenho(
+            chave, series, NCM_FORMATADO, ULTIMO_MES, ULTIMO_ANO))
+
+    por_pais = pd.DataFrame(sint.registros_por_pais(200, 14))
+    casos["graficos.treemap_import"] = lambda: gerar_treemap_importacoes_2024(por_pais, NCM, NCM_FORMATADO)
+    casos["graficos.treemap_export"] = lambda: gerar_treemap_exportacoes_2024(por_pais, NCM, NCM_FORMATADO)
+
+    # A busca mensal é substituída pelos dados sintéticos, conforme o início pedido
+    mensal = {inicio: sint.registros_mensais(list(range(int(inicio[:4]), ULTIMO_ANO + 1)), 15, metricas=("metricKG",))
+              for inicio in ("2019-01", "1997-01")}
+    graf_12m._obter_dados_mensais_comex = lambda ncm, flow, inicio="2019-01", **kwargs: mensal[inicio]
+    casos["graficos.importacoes_12meses"] = lambda: graf_12m.gerar_grafico_importacoes_12meses(NCM, NCM_FORMATADO)
+    casos["graficos.importacoes_12meses_desde_1997"] = lambda: graf_12m.gerar_grafico_importacoes_12meses(
+        NCM, NCM_FORMATADO, inicio="1997-01")
+
+    ncms = sint.ncms_sinteticos(num_ncms_pauta, 16)
+    lote_mensal = sint.registros_mensais([ULTIMO_ANO - 1, ULTIMO_ANO], 17, ncms=ncms, ate_mes=ULTIMO_MES)
+    lote_paises = sint.registros_por_pais(40, 18, ncms=ncms)
+
+    def _lote(ncms_lote, flow, periodo_de, periodo_ate, detalhes=None, metricas=None, mensal=False):
+        registros = lote_paises if detalhes else lote_mensal
+        return [r for r in registros if r["coNcm"] in ncms_lote], None
+
+    visao_geral.obter_dados_ncms_lote = _lote
+    casos["visao_geral_pauta.montar_visao_geral"] = lambda: visao_geral.montar_visao_geral(ncms, ULTIMO_ANO, ULTIMO_MES)
+
+    casos["processamento.carregar_dados_excel"] = lambda: proc.carregar_dados_excel(PLANILHA)
+
+    pdf_bytes, esperado = gerar_pdf_pauta(paginas_pdf, semente=paginas_pdf, fracao_paginas_sem_ncm=0.3)
+    ncms_esperados = sorted({ncm for ncms_pagina in esperado.values() for ncm in ncms_pagina})
+
+    def _extrair():
+        ncms_extraidos = extrair_ncms(pdf_bytes, processos=1)
+        if sorted(ncms_extraidos) != ncms_esperados:
+            raise AssertionError("NCMs extraídos diferentes dos inseridos no PDF")
+        return ncms_extraidos
+
+    casos["extracao_pdf.extrair_ncms"] = _extrair
+    return casos
+
+
+# ------------------------------------------------------------------------
+# Execução
+# ------------------------------------------------------------------------
+def _medir(funcao, repeticoes):
+    tempos, resultado = [], None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos, resultado
+
+
+def _ler_json(caminho):
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def _gravar_json(caminho, dados):
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, indent=2, sort_keys=True)
+        arquivo.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5, help="execuções medidas por caso (além do aquecimento)")
+    parser.add_argument("--casos", nargs="+", help="só os casos cujo nome começa com um destes prefixos")
+    parser.add_argument("--ncms-pauta", type=int, default=100, help="NCMs na visão geral da pauta")
+    parser.add_argument("--paginas-pdf", type=int, default=150, help="páginas da pauta em PDF")
+    parser.add_argument("--saida", help="grava os resultados neste arquivo JSON")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior, para comparar os tempos")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="aumento relativo aceito na comparação (0.25 = 25%%)")
+    parser.add_argument("--estrito", action="store_true", help="falha também se algum caso ficar mais lento que a tolerância")
+    parser.add_argument("--atualizar-gabarito", action="store_true", help="regrava as assinaturas dos casos executados")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    casos = montar_casos(args.ncms_pauta, args.paginas_pdf)
+    if args.casos:
+        casos = {nome: f for nome, f in casos.items() if nome.startswith(tuple(args.casos))}
+    gabarito = _ler_json(ARQUIVO_GABARITO)
+    anteriores = _ler_json(args.comparar).get("casos", {}) if args.comparar else {}
+    # O gabarito vale para os tamanhos padrão; com outros tamanhos as assinaturas não são conferidas
+    tamanho_padrao = args.ncms_pauta == 100 and args.paginas_pdf == 150
+
+    resultados, divergentes, regressoes = {}, [], []
+    cabecalho = f"{'caso':<44} {'melhor (ms)':>12} {'mediana (ms)':>13} {'anterior':>9}  gabarito"
+    print(cabecalho)
+    print("-" * len(cabecalho))
+    for nome, funcao in casos.items():
+        funcao()  # aquecimento: imports e caches internos do pandas/Plotly
+        tempos, resultado = _medir(funcao, args.repeticoes)
+        melhor, mediana = min(tempos), statistics.median(tempos)
+        hash_resultado = assinatura(resultado)
+        if args.atualizar_gabarito or not tamanho_padrao:
+            situacao = "atualizado" if args.atualizar_gabarito else "-"
+        elif nome not in gabarito:
+            situacao = "sem gabarito"
+        elif gabarito[nome] == hash_resultado:
+            situacao = "ok"
+        else:
+            situacao = "DIVERGENTE"
+            divergentes.append(nome)
+        comparacao = ""
+        if nome in anteriores:
+            razao = melhor / anteriores[nome]["melhor_s"]
+            comparacao = f"{razao:.2f}x"
+            if razao > 1 + args.tolerancia:
+                regressoes.append(nome)
+                comparacao += "!"
+        resultados[nome] = {"melhor_s": melhor, "mediana_s": mediana, "tempos_s": tempos, "assinatura": hash_resultado}
+        print(f"{nome:<44} {melhor * 1000:>12.2f} {mediana * 1000:>13.2f} {comparacao:>9}  {situacao}")
+
+    if args.atualizar_gabarito:
+        gabarito.update({nome: r["assinatura"] for nome, r in resultados.items()})
+        _gravar_json(ARQUIVO_GABARITO, gabarito)
+        print(f"\nGabarito atualizado em {os.path.relpath(ARQUIVO_GABARITO, RAIZ)} ({len(resultados)} casos).")
+    if args.saida:
+        _gravar_json(args.saida, {
+            "gerado_em": datetime.datetime.now().isoformat(timespec="seconds"),
+            "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(),
+                         "pandas": pd.__version__, "numpy": np.__version__,
+                         "plotly": sys.modules["plotly"].__version__},
+            "parametros": {"repeticoes": args.repeticoes, "ncms_pauta": args.ncms_pauta, "paginas_pdf": args.paginas_pdf},
+            "casos": resultados,
+        })
+        print(f"\nResultados gravados em {args.saida}.")
+
+    if regressoes:
+        print(f"\nMais lentos que a tolerância de {args.tolerancia:.0%}: {', '.join(regressoes)}")
+    if divergentes:
+        raise SystemExit(f"Resultados diferentes do gabarito: {', '.join(divergentes)}")
+    if args.estrito and regressoes:
+        raise SystemExit("Casos mais lentos que a execução anterior além da tolerância.")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,18 @@ import requests
 import time
 import logging
 
+from modulos.cache_persistente import memorizado_por_divulgacao, registrar_versao_api
+from modulos.config import API_COMEX_URL
+from modulos.instrumentacao import medido
+
+@medido
 def obter_data_ultima_atualizacao():
     """
     Obtém a data da última atualização da API do ComexStat.
     Returns:
         tuple: (data_atualizacao, ano_atualizacao, mes_atualizacao) ou ("Erro", "Erro", "Erro")
     """
-    url = "https://api-comexstat.mdic.gov.br/general/dates/updated"
+    url = f"{API_COMEX_URL}/general/dates/updated"
     try:
         response = requests.get(url, verify=False)
         response.raise_for_status()
@@ -16,6 +21,7 @@ def obter_data_ultima_atualizacao():
         last_updated_date = data.get('data', {}).get('updated', "Data não encontrada")
         last_updated_year = data.get('data', {}).get('year', "Ano não encontrado")
         last_updated_month = data.get('data', {}).get('monthNumber', "Mês não encontrado")
+        registrar_versao_api(last_updated_date)
         return last_updated_date, last_updated_year, last_updated_month
     except requests.exceptions.RequestException as e:
         print(f"Erro na requisição: {e}")
@@ -24,11 +30,13 @@ def obter_data_ultima_atualizacao():
         print(f"Erro inesperado: {e}")
         return "Erro", "Erro", "Erro"
 
+@medido
+@memorizado_por_divulgacao(lambda descricao: not str(descricao).startswith("Erro"))
 def obter_descricao_ncm(ncm_code):
     """
     Obtém a descrição do NCM informado.
     """
-    url = f"https://api-comexstat.mdic.gov.br/tables/ncm/{ncm_code}"
+    url = f"{API_COMEX_URL}/tables/ncm/{ncm_code}"
     try:
         response = requests.get(url, verify=False)
         response.raise_for_status()
@@ -42,6 +50,7 @@ def obter_descricao_ncm(ncm_code):
     except Exception as e:
         return f"Erro inesperado: {e}"
 
+@medido
 def _fazer_requisicao(url, payload=None, max_retries=5, initial_delay=1):
     """
     Função auxiliar para requisições com retry e backoff exponencial.
@@ -71,11 +80,13 @@ def _fazer_requisicao(url, payload=None, max_retries=5, initial_delay=1):
     print(f"Número máximo de tentativas excedido para a URL: {url}")
     return None
 
+@medido
+@memorizado_por_divulgacao(lambda retorno: retorno[1] is None)
 def obter_dados_comerciais(ncm_code, flow):
     """
     Obtém dados de importação ou exportação para um NCM específico (2004-01 até 2025-12).
     """
-    url = "https://api-comexstat.mdic.gov.br/general"
+    url = f"{API_COMEX_URL}/general"
     body = {
         "flow": flow,
         "monthDetail": False,
@@ -94,11 +105,13 @@ def obter_dados_comerciais(ncm_code, flow):
     else:
         return [], "Erro ao obter dados da API."
 
+@medido
+@memorizado_por_divulgacao(lambda retorno: retorno[1] is None)
 def obter_dados_comerciais_ano_anterior(ncm_code, flow, last_updated_month):
     """
     Obtém os dados acumulados de 2024 até o último mês disponível.
     """
-    url = "https://api-comexstat.mdic.gov.br/general"
+    url = f"{API_COMEX_URL}/general"
     payload = {
         "flow": flow,
         "monthDetail": False,
@@ -117,11 +130,13 @@ def obter_dados_comerciais_ano_anterior(ncm_code, flow, last_updated_month):
     else:
         return [], "Erro ao obter dados da API."
 
+@medido
+@memorizado_por_divulgacao(lambda retorno: retorno[1] is None)
 def obter_dados_comerciais_ano_atual(ncm_code, flow, last_updated_month):
     """
     Obtém os dados acumulados de 2025 até o último mês disponível.
     """
-    url = "https://api-comexstat.mdic.gov.br/general"
+    url = f"{API_COMEX_URL}/general"
     payload = {
         "flow": flow,
         "monthDetail": False,
@@ -140,6 +155,34 @@ def obter_dados_comerciais_ano_atual(ncm_code, flow, last_updated_month):
     else:
         return [], "Erro ao obter dados da API."
 
+@medido
+@memorizado_por_divulgacao(lambda retorno: retorno[1] is None)
+def obter_dados_ncms_lote(ncms, flow, periodo_de, periodo_ate, detalhes=None, metricas=None, mensal=False):
+    """
+    Obtém dados de vários NCMs numa única requisição, detalhados por NCM (e
+    pelos demais detalhes pedidos, ex.: ["country"]).
+    Returns:
+        tuple: (lista de registros, erro ou None). Cada registro traz 'coNcm'.
+    """
+    url = f"{API_COMEX_URL}/general"
+    body = {
+        "flow": flow,
+        "monthDetail": mensal,
+        "period": {
+            "from": periodo_de,
+            "to": periodo_ate
+        },
+        "filters": [{"filter": "ncm", "values": list(ncms)}],
+        "details": ["ncm"] + list(detalhes or []),
+        "metrics": list(metricas or ["metricFOB", "metricKG"])
+    }
+    response = _fazer_requisicao(url, payload=body)
+    if response:
+        data = response.json().get('data', {}).get('list', [])
+        return data, None
+    else:
+        return [], "Erro ao obter dados da API."
+
 def processar_dados(dados_export, dados_import, ano_ref):
     """
     Função desatualizada se você tiver outra. 
@@ -176,12 +219,14 @@ def processar_dados(dados_export, dados_import, ano_ref):
 
 # ================= Novas funções para dados de 2024 por país ================= #
 
+@medido
+@memorizado_por_divulgacao()
 def obter_dados_2024_por_pais(ncm_code, max_retries=5, delay=5):
     """
     Obtém dados de importação (US$ FOB) para 2024, detalhados por país.
     Retorna uma lista de dicionários contendo "country" e "metricFOB".
     """
-    url = "https://api-comexstat.mdic.gov.br/general"
+    url = f"{API_COMEX_URL}/general"
     body = {
         "flow": "import",
         "monthDetail": False,
@@ -205,12 +250,14 @@ def obter_dados_2024_por_pais(ncm_code, max_retries=5, delay=5):
             return []
     return []
 
+@medido
+@memorizado_por_divulgacao()
 def obter_dados_2024_por_pais_export(ncm_code, max_retries=5, delay=5):
     """
     Obtém dados de exportação (US$ FOB) para 2024, detalhados por país.
     Retorna uma lista de dicionários contendo "country" e "metricFOB".
     """
-    url = "https://api-comexstat.mdic.gov.br/general"
+    url = f"{API_COMEX_URL}/general"
     body = {
         "flow": "export",
         "monthDetail": False,
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Gravação atômica de arquivos de texto (caches em disco, checkpoints, saídas do lote).
+
+O conteúdo vai para um arquivo temporário na mesma pasta e só então substitui
+o destino com os.replace: quem lê, em outra thread ou processo, vê o arquivo
+anterior ou o novo inteiro, nunca um pela metade. Se a escrita falhar, o
+temporário é apagado.
+"""
+import os
+import tempfile
+
+
+def gravar_atomico(caminho, conteudo):
+    """Grava `conteudo` (str, UTF-8) em `caminho`, criando a pasta se preciso."""
+    diretorio = os.path.dirname(caminho) or "."
+    os.makedirs(diretorio, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, suffix=".tmp")
+    try:
+        with os.fdopen(descritor, "w", encoding="utf-8") as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
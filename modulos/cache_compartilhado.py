@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Cache em memória compartilhado por todas as sessões do processo.
+
+Guarda os objetos pesados (planilha CGIM estruturada, resultados das análises
+de NCM, figuras serializadas, visão geral da pauta) uma única vez por
+processo; as sessões guardam apenas as chaves. Cada item tem o tamanho
+estimado em bytes e, opcionalmente, um prazo de validade (TTL). Quando o
+total passa do teto global de memória, ou o de um espaço de nomes passa do
+seu limite próprio, os itens usados há mais tempo são descartados (LRU).
+
+Os espaços de nomes persistentes também são gravados no cache SQLite
+(cache_persistente), compartilhado entre os processos: uma falta em memória
+consulta o SQLite antes de recalcular, e o item encontrado lá volta para a
+memória. Assim uma réplica do app aproveita o que outra já calculou.
+"""
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from modulos.cache_persistente import cache_persistente
+from modulos.config import CACHE_MEMORIA_MB, CACHE_FIGURAS_MB
+
+_CONTADORES = ("acertos", "acertos_disco", "faltas", "descartes", "expirados")
+
+
+def tamanho_em_bytes(objeto):
+    """Estimativa do espaço ocupado por `objeto` (DataFrames pelo uso real de memória)."""
+    if isinstance(objeto, pd.DataFrame):
+        return int(objeto.memory_usage(deep=True).sum())
+    if isinstance(objeto, pd.Series):
+        return int(objeto.memory_usage(deep=True))
+    if isinstance(objeto, (str, bytes, bytearray)):
+        return sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        return sys.getsizeof(objeto) + sum(tamanho_em_bytes(k) + tamanho_em_bytes(v) for k, v in objeto.items())
+    if isinstance(objeto, (list, tuple, set, frozenset)):
+        return sys.getsizeof(objeto) + sum(tamanho_em_bytes(v) for v in objeto)
+    return sys.getsizeof(objeto)
+
+
+class _Item:
+    __slots__ = ("valor", "tamanho", "expira_em")
+
+    def __init__(self, valor, tamanho, expira_em):
+        self.valor = valor
+        self.tamanho = tamanho
+        self.expira_em = expira_em
+
+
+class CacheCompartilhado:
+    """
+    Cache LRU seguro entre threads, com TTL por item, contabilidade em bytes,
+    teto global e limites opcionais por espaço de nomes.
+
+    Args:
+        persistente (CacheSQLite | None): Segundo nível, compartilhado entre processos.
+        namespaces_persistentes (iterable): Espaços de nomes gravados também no segundo nível.
+    """
+
+    def __init__(self, teto_bytes, limites_namespace=None, persistente=None, namespaces_persistentes=()):
+        self.teto_bytes = int(teto_bytes)
+        self.limites_namespace = {ns: int(limite) for ns, limite in (limites_namespace or {}).items()}
+        self.persistente = persistente
+        self.namespaces_persistentes = frozenset(namespaces_persistentes) if persistente is not None else frozenset()
+        self._itens = OrderedDict()  # (namespace, chave) -> _Item
+        self._bytes_total = 0
+        self._bytes_ns = {}
+        self._contadores = {}  # namespace -> {"acertos", "acertos_disco", "faltas", "descartes", "expirados"}
+        self._lock = threading.RLock()
+        # Um lock por chave em cálculo: sessões que pedem o mesmo item esperam o primeiro cálculo
+        self._calculando = {}
+
+    def _contar(self, namespace, evento):
+        contadores = self._contadores.setdefault(namespace, dict.fromkeys(_CONTADORES, 0))
+        contadores[evento] += 1
+
+    def _remover(self, chave_completa, evento=None):
+        item = self._itens.pop(chave_completa)
+        namespace = chave_completa[0]
+        self._bytes_total -= item.tamanho
+        self._bytes_ns[namespace] -= item.tamanho
+        if evento:
+            self._contar(namespace, evento)
+
+    def obter(self, namespace, chave, padrao=None):
+        """Valor guardado em (namespace, chave), ou `padrao` se ausente ou expirado."""
+        chave_completa = (namespace, chave)
+        with self._lock:
+            item = self._itens.get(chave_completa)
+            if item is not None and item.expira_em is not None and item.expira_em <= time.time():
+                self._remover(chave_completa, "expirados")
+                item = None
+            if item is not None:
+                self._itens.move_to_end(chave_completa)
+                self._contar(namespace, "acertos")
+                return item.valor
+        # Falta em memória: o item pode ter sido calculado por outro processo
+        if namespace in self.namespaces_persistentes:
+            item_disco = self.persistente.obter_item(namespace, chave)
+            if item_disco is not None:
+                valor, expira_em = item_disco
+                ttl = max(expira_em - time.time(), 0.001) if expira_em is not None else None
+                self.gravar(namespace, chave, valor, ttl=ttl, persistir=False)
+                with self._lock:
+                    self._contar(namespace, "acertos_disco")
+                return valor
+        with self._lock:
+            self._contar(namespace, "faltas")
+        return padrao
+
+    def contem(self, namespace, chave):
+        """True se o item está em memória ou, nos espaços persistentes, no SQLite (sem carregá-lo)."""
+        with self._lock:
+            item = self._itens.get((namespace, chave))
+            if item is not None and (item.expira_em is None or item.expira_em > time.time()):
+                return True
+        return namespace in self.namespaces_persistentes and self.persistente.contem(namespace, chave)
+
+    def gravar(self, namespace, chave, valor, ttl=None, tamanho=None, persistir=True):
+        """
+        Guarda `valor`. Itens maiores que o limite aplicável não são guardados
+        em memória (nos espaços persistentes, ainda vão para o SQLite).
+
+        Args:
+            ttl (float | None): Validade em segundos (None = sem expiração).
+            tamanho (int | None): Tamanho em bytes, se já conhecido.
+            persistir (bool): Grava também no cache SQLite, se o espaço de nomes for persistente.
+
+        Returns:
+            bool: True se o item foi guardado em memória.
+        """
+        if persistir and namespace in self.namespaces_persistentes:
+            self.persistente.gravar(namespace, chave, valor, ttl=ttl)
+        tamanho = tamanho_em_bytes(valor) if tamanho is None else int(tamanho)
+        limite = min(self.teto_bytes, self.limites_namespace.get(namespace, self.teto_bytes))
+        if tamanho > limite:
+            logging.info(f"Item '{namespace}' de {tamanho} bytes excede o limite do cache ({limite}); não guardado.")
+            return False
+        chave_completa = (namespace, chave)
+        with self._lock:
+            if chave_completa in self._itens:
+                self._remover(chave_completa)
+            self._itens[chave_completa] = _Item(valor, tamanho, time.time() + ttl if ttl else None)
+            self._bytes_total += tamanho
+            self._bytes_ns[namespace] = self._bytes_ns.get(namespace, 0) + tamanho
+            self._descartar(namespace)
+        return True
+
+    def _descartar(self, namespace):
+        # Primeiro os itens do próprio espaço de nomes acima do seu limite, depois os
+        # menos usados de qualquer espaço até caber no teto global
+        limite_ns = self.limites_namespace.get(namespace)
+        if limite_ns is not None:
+            for chave_completa in [c for c in self._itens if c[0] == namespace]:
+                if self._bytes_ns[namespace] <= limite_ns:
+                    break
+                self._remover(chave_completa, "descartes")
+        while self._bytes_total > self.teto_bytes:
+            self._remover(next(iter(self._itens)), "descartes")
+
+    def obter_ou_calcular(self, namespace, chave, calcular, ttl=None, memorizar=None):
+        """
+        Retorna o valor guardado ou o calcula com `calcular()` e o guarda.
+        Chamadas simultâneas para a mesma chave calculam uma única vez.
+
+        Args:
+            memorizar (callable | None): Se informado, o valor só é guardado
+                quando memorizar(valor) for verdadeiro (ex.: resultados sem erro).
+        """
+        faltou = object()
+        valor = self.obter(namespace, chave, faltou)
+        if valor is not faltou:
+            return valor
+        with self._lock:
+            lock_chave = self._calculando.setdefault((namespace, chave), threading.Lock())
+        with lock_chave:
+            valor = self.obter(namespace, chave, faltou)
+            if valor is not faltou:
+                return valor
+            try:
+                valor = calcular()
+                if memorizar is None or memorizar(valor):
+                    self.gravar(namespace, chave, valor, ttl=ttl)
+                return valor
+            finally:
+                with self._lock:
+                    self._calculando.pop((namespace, chave), None)
+
+    def invalidar(self, namespace, chave=None):
+        """Remove um item, ou todo o espaço de nomes se `chave` for None (também do SQLite)."""
+        if namespace in self.namespaces_persistentes:
+            self.persistente.invalidar(namespace, chave)
+        with self._lock:
+            for chave_completa in [c for c in self._itens if c[0] == namespace and (chave is None or c[1] == chave)]:
+                self._remover(chave_completa)
+
+    def estatisticas(self):
+        """Ocupação total e, por espaço de nomes, itens, bytes, limite e contadores."""
+        with self._lock:
+            itens_ns = {}
+            for namespace, _ in self._itens:
+                itens_ns[namespace] = itens_ns.get(namespace, 0) + 1
+            namespaces = {}
+            for namespace in sorted(set(self._contadores) | set(itens_ns)):
+                namespaces[namespace] = {
+                    "itens": itens_ns.get(namespace, 0),
+                    "bytes": self._bytes_ns.get(namespace, 0),
+                    "limite_bytes": self.limites_namespace.get(namespace),
+                    **self._contadores.get(namespace, dict.fromkeys(_CONTADORES, 0)),
+                }
+            return {"itens": len(self._itens), "bytes": self._bytes_total, "teto_bytes": self.teto_bytes,
+                    "namespaces": namespaces}
+
+
+# Instância única do processo, compartilhada por todas as sessões do Streamlit
+cache_compartilhado = CacheCompartilhado(
+    CACHE_MEMORIA_MB * 1024 * 1024,
+    limites_namespace={"figura": CACHE_FIGURAS_MB * 1024 * 1024},
+    persistente=cache_persistente,
+    namespaces_persistentes=("analise", "figura", "planilha", "visao_geral", "servico"),
+)
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de figuras Plotly já montadas.
+
+A chave é (tipo de gráfico, NCM, versão dos dados, opções); a versão dos dados
+é a data de atualização da base ComexStat, então uma nova divulgação invalida
+naturalmente as figuras antigas. O valor guardado é o JSON da figura: um
+acerto de cache evita o preparo dos DataFrames e a montagem da figura pelas
+funções de gráfico. A figura é reconstruída do JSON sem a validação de cada
+propriedade (ela já foi validada ao ser montada), que é a maior parte do
+custo de pio.from_json; o st.plotly_chart ainda a serializa de novo. As figuras ficam no espaço 'figura' do cache compartilhado do
+processo (vale para todas as sessões), com descarte LRU limitado pela parte
+do teto de memória reservada a elas.
+"""
+import json
+import logging
+
+from modulos.cache_compartilhado import cache_compartilhado
+from modulos.instrumentacao import medido
+
+_NAMESPACE = "figura"
+
+
+class CacheFiguras:
+    """Figuras serializadas no cache compartilhado, no espaço de nomes 'figura'."""
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def obter(self, chave):
+        """Retorna a figura guardada em `chave` ou None."""
+        figura_json = self._cache.obter(_NAMESPACE, chave)
+        if figura_json is None:
+            return None
+        import plotly.graph_objects as go
+        # Sem revalidar: o JSON veio de uma go.Figure já validada
+        return go.Figure(json.loads(figura_json), _validate=False)
+
+    def gravar(self, chave, figura):
+        """Guarda a figura (as menos usadas são descartadas quando o limite é atingido)."""
+        figura_json = figura.to_json()
+        tamanho = len(figura_json.encode("utf-8"))
+        logging.info(f"Figura '{chave[0]}' do NCM {chave[1]}: {tamanho} bytes.")
+        self._cache.gravar(_NAMESPACE, chave, figura_json, tamanho=tamanho)
+
+    @medido
+    def obter_ou_gerar(self, tipo, ncm, versao_dados, gerar, **opcoes):
+        """
+        Retorna a figura do cache ou a gera com `gerar()` e guarda o resultado.
+
+        Args:
+            tipo (str): Identificador do gráfico (ex.: 'importacoes_kg').
+            ncm (str): NCM de 8 dígitos.
+            versao_dados (str): Versão da base de dados usada na figura.
+            gerar (callable): Função sem argumentos que prepara os dados e monta
+                a figura. Só é chamada em caso de falta.
+            **opcoes: Demais parâmetros que alteram a figura (entram na chave).
+
+        Returns:
+            go.Figure | None: None (não memorizado) se `gerar` não produzir uma figura.
+        """
+        chave = (tipo, ncm, versao_dados, tuple(sorted(opcoes.items())))
+        figura = self.obter(chave)
+        if figura is not None:
+            return figura
+        figura = gerar()
+        import plotly.graph_objects as go
+        if isinstance(figura, go.Figure):
+            self.gravar(chave, figura)
+        return figura
+
+    def estatisticas(self):
+        """Contadores do espaço de figuras: itens, bytes, limite, acertos, faltas e descartes."""
+        return self._cache.estatisticas()["namespaces"].get(_NAMESPACE, {})
+
+
+# Instância única do processo, compartilhada por todas as sessões do Streamlit
+cache_figuras = CacheFiguras(cache_compartilhado)
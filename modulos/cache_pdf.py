@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Cache em disco dos resultados de extração de NCMs de pautas em PDF.
+
+A chave é o SHA-256 do conteúdo do PDF (mais o extrator usado), então a mesma
+pauta enviada por analistas diferentes, em qualquer instância que aponte para o
+mesmo diretório, é lida uma única vez. Cada registro guarda o conjunto de NCMs
+e as páginas em que cada um aparece. A gravação é atômica (arquivo temporário +
+os.replace), de modo que leitores concorrentes nunca veem um registro parcial.
+Com o cache SQLite ativo (cache_persistente), os registros novos vão para ele;
+os arquivos JSON gravados antes continuam sendo lidos.
+"""
+import hashlib
+import json
+import logging
+import os
+
+from modulos.arquivos import gravar_atomico
+from modulos.cache_persistente import cache_persistente
+from modulos.config import DIR_CACHE, PDF_BACKEND
+from modulos.extracao_pdf import iterar_ncms_pdf
+
+_VERSAO_FORMATO = 1
+
+
+def sha256_pdf(pdf_bytes):
+    """SHA-256 (hexadecimal) do conteúdo do PDF."""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def _caminho_registro(sha256, backend):
+    return os.path.join(DIR_CACHE, "pdf", f"{sha256}_{backend}.json")
+
+
+def obter(sha256, backend=None):
+    """
+    Busca a extração de um PDF no cache.
+
+    Returns:
+        dict | None: {"sha256", "backend", "num_paginas", "ncms": [...],
+                      "paginas": {ncm: [páginas 1-based]}} ou None se ausente.
+    """
+    backend = backend or PDF_BACKEND
+    registro = cache_persistente.obter("pdf", (sha256, backend)) if cache_persistente is not None else None
+    try:
+        if registro is None:
+            with open(_caminho_registro(sha256, backend), encoding="utf-8") as f:
+                registro = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Registro de cache do PDF {sha256[:12]} ilegível, ignorando: {e}")
+        return None
+    if registro.get("versao") != _VERSAO_FORMATO:
+        return None
+    logging.info(f"Extração do PDF {sha256[:12]} encontrada no cache em disco ({len(registro['ncms'])} NCMs).")
+    return registro
+
+
+def gravar(sha256, num_paginas, por_pagina, backend=None, paginas_com_erro=()):
+    """
+    Grava no cache a extração de um PDF.
+
+    Args:
+        sha256 (str): Hash do PDF (ver sha256_pdf).
+        num_paginas (int): Total de páginas do documento.
+        por_pagina (dict): {indice_pagina (0-based): [ncms]}, como em
+            extracao_pdf.extrair_ncms_por_pagina.
+        paginas_com_erro (iterable): Índices das páginas cujo texto não pôde
+            ser extraído. Com alguma, o registro não é gravado: a próxima
+            leitura do mesmo PDF tenta essas páginas de novo.
+
+    Returns:
+        dict: O registro gravado (mesmo formato de `obter`).
+    """
+    backend = backend or PDF_BACKEND
+    paginas = {}
+    for indice in sorted(por_pagina):
+        for ncm in por_pagina[indice]:
+            ocorrencias = paginas.setdefault(ncm, [])
+            if not ocorrencias or ocorrencias[-1] != indice + 1:
+                ocorrencias.append(indice + 1)
+    registro = {
+        "versao": _VERSAO_FORMATO,
+        "sha256": sha256,
+        "backend": backend,
+        "num_paginas": num_paginas,
+        "ncms": sorted(paginas),
+        "paginas": dict(sorted(paginas.items())),
+    }
+    paginas_com_erro = sorted(paginas_com_erro)
+    if paginas_com_erro:
+        logging.warning(f"Extração do PDF {sha256[:12]} não gravada no cache: {len(paginas_com_erro)} página(s) "
+                        f"com erro de leitura ({[i + 1 for i in paginas_com_erro[:10]]}).")
+        return registro
+    if cache_persistente is not None and cache_persistente.gravar("pdf", (sha256, backend), registro):
+        logging.info(f"Extração do PDF {sha256[:12]} gravada no cache SQLite.")
+        return registro
+    caminho = _caminho_registro(sha256, backend)
+    try:
+        gravar_atomico(caminho, json.dumps(registro, ensure_ascii=False))
+        logging.info(f"Extração do PDF {sha256[:12]} gravada no cache em disco.")
+    except OSError as e:
+        # Cache é opcional: falha de escrita não impede o uso do resultado
+        logging.warning(f"Não foi possível gravar o cache do PDF {sha256[:12]}: {e}")
+    return registro
+
+
+def extrair_com_cache(pdf_bytes, processos=None, backend=None):
+    """
+    Retorna a extração do PDF a partir do cache ou, se ausente, extrai e grava.
+
+    Returns:
+        dict: Registro no formato de `obter`.
+    """
+    sha256 = sha256_pdf(pdf_bytes)
+    registro = obter(sha256, backend)
+    if registro is not None:
+        return registro
+    por_pagina, num_paginas, com_erro = {}, 0, []
+    for indice, num_paginas, matches in iterar_ncms_pdf(pdf_bytes, processos, backend):
+        if matches is None:
+            com_erro.append(indice)
+        elif matches:
+            por_pagina[indice] = matches
+    return gravar(sha256, num_paginas, por_pagina, backend, paginas_com_erro=com_erro)
@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Cache persistente em SQLite, compartilhado por todos os processos da máquina.
+
+O cache em memória (cache_compartilhado) vale só para o processo; com várias
+réplicas do Streamlit atrás de um balanceador, cada uma buscava de novo na
+API os mesmos dados e relia as mesmas pautas. Este cache guarda, num único
+arquivo SQLite (CACHE_SQLITE), os itens que valem entre processos e entre
+reinícios: respostas da API (por data de divulgação), análises de NCM,
+figuras, extrações de PDF e abas da planilha CGIM já estruturadas.
+
+- Concorrência: modo WAL (leitores não bloqueiam o escritor), busy_timeout
+  para esperar o lock de escrita e uma conexão por thread e por processo.
+- Atomicidade: cada gravação é uma transação; quem lê vê o item inteiro ou
+  nenhum. Os valores são serializados com pickle.
+- Validade e tamanho: cada item pode ter TTL; quando o banco passa do teto
+  (CACHE_SQLITE_MB), os itens usados há mais tempo são removidos.
+
+Falhas do SQLite (disco cheio, banco ilegível) são registradas no log e
+tratadas como falta de cache: o app continua funcionando sem ele.
+"""
+import functools
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from modulos.config import (
+    CACHE_SQLITE,
+    CACHE_SQLITE_MB,
+    CACHE_SQLITE_TTL_API,
+    CACHE_SQLITE_TTL_FALHA_VERSAO_API,
+    CACHE_SQLITE_TTL_VERSAO_API,
+)
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS itens (
+    namespace TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    valor BLOB NOT NULL,
+    tamanho INTEGER NOT NULL,
+    expira_em REAL,
+    usado_em REAL NOT NULL,
+    PRIMARY KEY (namespace, chave)
+);
+CREATE INDEX IF NOT EXISTS itens_usado_em ON itens (usado_em);
+"""
+
+# Leituras só atualizam o horário de uso de um item a cada tantos segundos,
+# para não transformar toda leitura em escrita
+_INTERVALO_ATUALIZAR_USO = 60.0
+# Espera (ms) pelo lock de escrita quando outro processo está gravando
+_BUSY_TIMEOUT_MS = 10000
+
+
+def _chave_texto(chave):
+    """Chave textual estável (hash do repr) para qualquer chave do cache em memória."""
+    return hashlib.sha256(repr(chave).encode("utf-8")).hexdigest()
+
+
+class CacheSQLite:
+    """
+    Cache chave-valor com TTL e descarte LRU num arquivo SQLite, seguro entre
+    threads e processos.
+
+    Args:
+        caminho (str): Arquivo do banco (criado se não existir).
+        teto_bytes (int): Tamanho máximo somado dos valores guardados.
+    """
+
+    def __init__(self, caminho, teto_bytes):
+        self.caminho = caminho
+        self.teto_bytes = int(teto_bytes)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._calculando = {}
+
+    def _conexao(self):
+        # Conexões não atravessam fork nem threads: uma por (processo, thread)
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is not None and self._local.pid == os.getpid():
+            return conexao
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        conexao = sqlite3.connect(self.caminho, timeout=_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        conexao.execute(f"PRAGMA busy_timeout = {_BUSY_TIMEOUT_MS}")
+        conexao.execute("PRAGMA journal_mode = WAL")
+        conexao.execute("PRAGMA synchronous = NORMAL")
+        conexao.executescript(_ESQUEMA)
+        self._local.conexao, self._local.pid = conexao, os.getpid()
+        return conexao
+
+    def obter_item(self, namespace, chave):
+        """(valor, expira_em) guardado em (namespace, chave), ou None se ausente ou expirado."""
+        chave_texto = _chave_texto(chave)
+        agora = time.time()
+        try:
+            conexao = self._conexao()
+            linha = conexao.execute("SELECT valor, expira_em, usado_em FROM itens WHERE namespace = ? AND chave = ?",
+                                    (namespace, chave_texto)).fetchone()
+            if linha is None:
+                return None
+            valor, expira_em, usado_em = linha
+            if expira_em is not None and expira_em <= agora:
+                conexao.execute("DELETE FROM itens WHERE namespace = ? AND chave = ? AND expira_em <= ?",
+                                (namespace, chave_texto, agora))
+                return None
+            if agora - usado_em > _INTERVALO_ATUALIZAR_USO:
+                conexao.execute("UPDATE itens SET usado_em = ? WHERE namespace = ? AND chave = ?",
+                                (agora, namespace, chave_texto))
+            return pickle.loads(valor), expira_em
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            logging.warning(f"Cache SQLite: falha ao ler '{namespace}' ({self.caminho}): {e}")
+            return None
+
+    def obter(self, namespace, chave, padrao=None):
+        """Valor guardado em (namespace, chave), ou `padrao` se ausente ou expirado."""
+        item = self.obter_item(namespace, chave)
+        return padrao if item is None else item[0]
+
+    def contem(self, namespace, chave):
+        """True se há um item válido em (namespace, chave), sem ler o valor."""
+        try:
+            linha = self._conexao().execute(
+                "SELECT 1 FROM itens WHERE namespace = ? AND chave = ? AND (expira_em IS NULL OR expira_em > ?)",
+                (namespace, _chave_texto(chave), time.time())).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Cache SQLite: falha ao ler '{namespace}' ({self.caminho}): {e}")
+            return False
+        return linha is not None
+
+    def gravar(self, namespace, chave, valor, ttl=None):
+        """
+        Guarda `valor` numa única transação.
+
+        Returns:
+            bool: True se o item foi guardado.
+        """
+        try:
+            dados = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logging.warning(f"Cache SQLite: item '{namespace}' não serializável; não guardado: {e}")
+            return False
+        if len(dados) > self.teto_bytes:
+            logging.info(f"Item '{namespace}' de {len(dados)} bytes excede o teto do cache SQLite; não guardado.")
+            return False
+        agora = time.time()
+        try:
+            conexao = self._conexao()
+            conexao.execute("BEGIN IMMEDIATE")
+            try:
+                conexao.execute("INSERT OR REPLACE INTO itens (namespace, chave, valor, tamanho, expira_em, usado_em) "
+                                "VALUES (?, ?, ?, ?, ?, ?)",
+                                (namespace, _chave_texto(chave), dados, len(dados), agora + ttl if ttl else None, agora))
+                self._descartar(conexao, agora)
+                conexao.execute("COMMIT")
+            except BaseException:
+                conexao.execute("ROLLBACK")
+                raise
+            return True
+        except sqlite3.Error as e:
+            logging.warning(f"Cache SQLite: falha ao gravar '{namespace}' ({self.caminho}): {e}")
+            return False
+
+    def _descartar(self, conexao, agora):
+        """Remove os expirados e, acima do teto, os itens usados há mais tempo (na transação aberta)."""
+        conexao.execute("DELETE FROM itens WHERE expira_em IS NOT NULL AND expira_em <= ?", (agora,))
+        total = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM itens").fetchone()[0]
+        if total <= self.teto_bytes:
+            return
+        excedente, removidos = total - self.teto_bytes, 0
+        for namespace, chave, tamanho in conexao.execute(
+                "SELECT namespace, chave, tamanho FROM itens ORDER BY usado_em").fetchall():
+            if excedente <= 0:
+                break
+            conexao.execute("DELETE FROM itens WHERE namespace = ? AND chave = ?", (namespace, chave))
+            excedente -= tamanho
+            removidos += 1
+        logging.info(f"Cache SQLite acima do teto: {removidos} itens menos usados removidos.")
+
+    def obter_ou_calcular(self, namespace, chave, calcular, ttl=None, memorizar=None):
+        """
+        Retorna o valor guardado ou o calcula com `calcular()` e o guarda.
+        Chamadas simultâneas no mesmo processo calculam uma única vez.
+
+        Args:
+            memorizar (callable | None): Se informado, o valor só é guardado
+                quando memorizar(valor) for verdadeiro (ex.: respostas sem erro).
+        """
+        item = self.obter_item(namespace, chave)
+        if item is not None:
+            return item[0]
+        with self._lock:
+            lock_chave = self._calculando.setdefault((namespace, chave), threading.Lock())
+        with lock_chave:
+            item = self.obter_item(namespace, chave)
+            if item is not None:
+                return item[0]
+            try:
+                valor = calcular()
+                if memorizar is None or memorizar(valor):
+                    self.gravar(namespace, chave, valor, ttl=ttl)
+                return valor
+            finally:
+                with self._lock:
+                    self._calculando.pop((namespace, chave), None)
+
+    def invalidar(self, namespace, chave=None):
+        """Remove um item, ou todo o espaço de nomes se `chave` for None."""
+        try:
+            if chave is None:
+                self._conexao().execute("DELETE FROM itens WHERE namespace = ?", (namespace,))
+            else:
+                self._conexao().execute("DELETE FROM itens WHERE namespace = ? AND chave = ?",
+                                        (namespace, _chave_texto(chave)))
+        except sqlite3.Error as e:
+            logging.warning(f"Cache SQLite: falha ao invalidar '{namespace}': {e}")
+
+    def estatisticas(self):
+        """Itens e bytes por espaço de nomes e o total."""
+        try:
+            linhas = self._conexao().execute(
+                "SELECT namespace, COUNT(*), SUM(tamanho) FROM itens GROUP BY namespace").fetchall()
+        except sqlite3.Error as e:
+            logging.warning(f"Cache SQLite: falha ao ler estatísticas: {e}")
+            linhas = []
+        return {"arquivo": self.caminho, "teto_bytes": self.teto_bytes,
+                "itens": sum(n for _, n, _ in linhas), "bytes": sum(b for _, _, b in linhas),
+                "namespaces": {ns: {"itens": n, "bytes": b} for ns, n, b in linhas}}
+
+
+def registrar_versao_api(updated):
+    """Publica para todos os processos a data da divulgação mais recente vista na API."""
+    if cache_persistente is not None and updated and updated != "Erro":
+        cache_persistente.gravar("api_versao", "updated", updated, ttl=CACHE_SQLITE_TTL_VERSAO_API)
+        # Sem validade: referência quando a consulta da data falhar
+        cache_persistente.gravar("api_versao", "ultima_conhecida", updated)
+
+
+def versao_api():
+    """
+    Data da última divulgação do ComexStat, consultada no máximo a cada
+    CACHE_SQLITE_TTL_VERSAO_API s. Se a consulta falhar, vale a última
+    divulgação conhecida, e a consulta só é repetida depois de
+    CACHE_SQLITE_TTL_FALHA_VERSAO_API s (uma queda da API não dobra as
+    requisições). None se a data nunca foi obtida.
+    """
+    updated = cache_persistente.obter("api_versao", "updated")
+    if updated is None and cache_persistente.obter("api_versao", "falha") is None:
+        from modulos.api_comex import obter_data_ultima_atualizacao
+        updated = obter_data_ultima_atualizacao()[0]  # publica a data via registrar_versao_api
+        if updated == "Erro":
+            cache_persistente.gravar("api_versao", "falha", True, ttl=CACHE_SQLITE_TTL_FALHA_VERSAO_API)
+    if updated is None or updated == "Erro":
+        updated = cache_persistente.obter("api_versao", "ultima_conhecida")
+    return updated
+
+
+def memorizado_por_divulgacao(memorizar=bool):
+    """
+    Guarda no cache persistente o retorno de uma consulta à API, separado pela
+    data da divulgação do ComexStat: uma divulgação nova faz todas as
+    consultas irem de novo à API. Só guarda quando memorizar(retorno) for
+    verdadeiro (ex.: sem erro). Sem cache persistente, chama a função direto.
+    """
+    def decorador(funcao):
+        nome = f"{funcao.__module__}.{funcao.__qualname__}"
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            if cache_persistente is None:
+                return funcao(*args, **kwargs)
+            versao = versao_api()
+            if versao is None:
+                return funcao(*args, **kwargs)
+            return cache_persistente.obter_ou_calcular(
+                "api", (nome, versao, args, tuple(sorted(kwargs.items()))),
+                lambda: funcao(*args, **kwargs), ttl=CACHE_SQLITE_TTL_API, memorizar=memorizar,
+            )
+        return envoltorio
+    return decorador
+
+
+# Instância única do processo (None com FICHA_NCM_CACHE_SQLITE vazio); o
+# arquivo é compartilhado com os demais processos que apontam para ele
+cache_persistente = CacheSQLite(CACHE_SQLITE, CACHE_SQLITE_MB * 1024 * 1024) if CACHE_SQLITE else None
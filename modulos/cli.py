@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Processamento em lote de pautas, sem interface: nenhum módulo importado aqui
+depende do Streamlit, então roda em servidores e agendamentos noturnos.
+
+Uso (na raiz do repositório):
+    python -m modulos.cli pauta.pdf --out saida/
+    python -m modulos.cli pauta1.pdf pauta2.pdf --out saida/ --processos 8 --sem-html
+
+Os NCMs são extraídos dos PDFs (com o cache de extração em disco) e, salvo
+com --todos, filtrados pelos NCMs da CGIM na planilha. Cada NCM é analisado
+(descrição, séries da API ComexStat, processamento e dados por país) num pool
+de processos; cada processo recebe a planilha uma única vez, ao iniciar, e
+monta a ficha HTML do NCM que analisou. O processo principal grava os
+resultados à medida que chegam, na ordem dos NCMs:
+
+    <out>/json/<NCM>.json   séries anual e parciais e dados por país
+    <out>/html/<NCM>.html   ficha HTML (plotly.js compartilhado na mesma pasta)
+    <out>/fichas.xlsx       aba "Resumo" e uma aba por NCM
+    <out>/indice.json       versão dos dados e situação de cada NCM
+
+Sai com código 1 se algum NCM terminou com erro.
+"""
+import argparse
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from modulos.api_comex import obter_data_ultima_atualizacao
+from modulos.arquivos import gravar_atomico
+import modulos.cache_pdf as cache_pdf
+from modulos.config import CLI_PROCESSOS, PLANILHA_CGIM_LOCAL
+from modulos.fila_analises import analisar, tem_erros_api, versao_dados
+from modulos.historico_pautas import ncms_8digitos
+import modulos.processamento as proc
+
+_FORMATO_LOG = "%(asctime)s - %(levelname)s - %(processName)s - %(message)s"
+
+# Estado de cada processo do pool, preenchido por _inicializar_processo
+_contexto_processo = {}
+
+
+def _registros(df):
+    """Linhas do DataFrame como lista de dicionários (None se a série não existe)."""
+    if not isinstance(df, pd.DataFrame):
+        return None
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+
+def resultado_para_json(ncm_code, resultado, last_updated_month, last_updated_year):
+    """Resultado da análise de um NCM como objeto serializável em JSON."""
+    series = resultado["series"]
+    return {
+        "ncm": ncm_code,
+        "descricao": resultado["descricao"],
+        "versao_dados": versao_dados(last_updated_year, last_updated_month),
+        "historico_anual": _registros(series["df_hist_anual"]),
+        "parcial_ano_anterior": _registros(series["df_2024_parcial"]),
+        "parcial_ano_atual": _registros(series["df_2025_parcial"]),
+        "erros": {chave: series[chave] for chave in ("error_hist", "error_2024_parcial", "error_2025_parcial", "erro_processamento")
+                  if series.get(chave)},
+        "por_pais": {fluxo: resultado["dados_pais"].get(fluxo) or [] for fluxo in ("import", "export")},
+    }
+
+
+def _inicializar_processo(dados_excel, last_updated_month, last_updated_year, dir_html, plotly_js, nivel_log):
+    """Guarda a planilha e os parâmetros do lote uma vez por processo do pool."""
+    logging.basicConfig(level=nivel_log, format=_FORMATO_LOG)
+    _contexto_processo.update(dados_excel=dados_excel, mes=last_updated_month, ano=last_updated_year,
+                              dir_html=dir_html, plotly_js=plotly_js)
+
+
+def _analisar_processo(ncm_code):
+    """
+    Analisa um NCM (e grava a ficha HTML, se pedida) no processo atual.
+
+    Returns:
+        tuple: (NCM, resultado ou None, erro ou None)
+    """
+    contexto = _contexto_processo
+    try:
+        resultado = analisar(ncm_code, contexto["mes"], contexto["ano"])
+    except Exception as e:
+        logging.error(f"Falha na análise do NCM {ncm_code}: {e}", exc_info=True)
+        return ncm_code, None, str(e)
+    if contexto["dir_html"]:
+        from modulos.fichas_html import montar_ficha_html
+        try:
+            gravar_atomico(os.path.join(contexto["dir_html"], f"{ncm_code}.html"),
+                            montar_ficha_html(ncm_code, resultado, contexto["dados_excel"],
+                                              contexto["mes"], contexto["ano"], contexto["plotly_js"]))
+        except Exception as e:
+            logging.warning(f"Ficha HTML do NCM {ncm_code} não gerada: {e}", exc_info=True)
+    return ncm_code, resultado, None
+
+
+def processar_ncms(ncms, destino, last_updated_month, last_updated_year, dados_excel=None,
+                   processos=None, gerar_html=True, gerar_xlsx=True, progresso=None):
+    """
+    Analisa os NCMs e grava os resultados em `destino` (ver o cabeçalho do módulo).
+
+    Args:
+        ncms (list): NCMs de 8 dígitos, na ordem de saída.
+        dados_excel (dict | None): Planilha CGIM estruturada (seção da planilha nas fichas HTML).
+        processos (int | None): Tamanho do pool (None usa CLI_PROCESSOS; 1 analisa no próprio processo).
+        progresso (callable | None): Chamado com (NCMs concluídos, total).
+
+    Returns:
+        dict: Índice gravado em <destino>/indice.json.
+    """
+    processos = max(1, processos or CLI_PROCESSOS)
+    dir_json = os.path.join(destino, "json")
+    dir_html = os.path.join(destino, "html") if gerar_html else None
+    os.makedirs(dir_json, exist_ok=True)
+    plotly_js = None
+    if dir_html:
+        from modulos.fichas_html import garantir_plotly_js
+        os.makedirs(dir_html, exist_ok=True)
+        plotly_js = garantir_plotly_js(dir_html)
+    indice = {
+        "versao_dados": versao_dados(last_updated_year, last_updated_month),
+        "gerado_em": datetime.datetime.now().isoformat(timespec="seconds"),
+        "ncms": {},
+    }
+    initargs = (dados_excel, last_updated_month, last_updated_year, dir_html, plotly_js, logging.getLogger().level)
+
+    def registrar(resultados):
+        """Grava o JSON de cada NCM e anota o índice, repassando os resultados ao Excel."""
+        for i, (ncm, resultado, erro) in enumerate(resultados):
+            item = {"descricao": None, "situacao": f"Erro: {erro or 'análise indisponível'}"}
+            if resultado is not None:
+                gravar_atomico(os.path.join(dir_json, f"{ncm}.json"),
+                                json.dumps(resultado_para_json(ncm, resultado, last_updated_month, last_updated_year),
+                                           ensure_ascii=False))
+                item = {"descricao": resultado["descricao"],
+                        "situacao": "Erro: consulta à API com erro" if tem_erros_api(resultado) else "OK",
+                        "json": f"json/{ncm}.json"}
+                if dir_html and os.path.exists(os.path.join(dir_html, f"{ncm}.html")):
+                    item["html"] = f"html/{ncm}.html"
+            indice["ncms"][ncm] = item
+            if progresso:
+                progresso(i + 1, len(ncms))
+            yield ncm, resultado, erro
+
+    def consumir(resultados):
+        if gerar_xlsx:
+            from modulos.exportacao_xlsx import exportar_pauta_xlsx
+            exportar_pauta_xlsx(ncms, last_updated_month, last_updated_year, os.path.join(destino, "fichas.xlsx"),
+                                resultados=registrar(resultados))
+        else:
+            for _ in registrar(resultados):
+                pass
+
+    if processos == 1:
+        _inicializar_processo(*initargs)
+        consumir(map(_analisar_processo, ncms))
+    else:
+        # 'spawn', como na extração do PDF: os processos não herdam o estado do principal
+        with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_inicializar_processo, initargs=initargs) as pool:
+            consumir(pool.map(_analisar_processo, ncms))
+    gravar_atomico(os.path.join(destino, "indice.json"), json.dumps(indice, ensure_ascii=False, indent=1))
+    com_erro = sum(item["situacao"] != "OK" for item in indice["ncms"].values())
+    logging.info(f"Lote de {len(ncms)} NCMs gravado em {destino} ({com_erro} com erro).")
+    return indice
+
+
+def ncms_das_pautas(caminhos_pdf):
+    """NCMs de 8 dígitos presentes em qualquer um dos PDFs, em ordem crescente."""
+    ncms = set()
+    for caminho in caminhos_pdf:
+        with open(caminho, "rb") as arquivo:
+            registro = cache_pdf.extrair_com_cache(arquivo.read())
+        logging.info(f"{caminho}: {len(registro['ncms'])} NCMs em {registro['num_paginas']} páginas.")
+        ncms |= ncms_8digitos(registro["ncms"])
+    return sorted(ncms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+", help="pautas em PDF")
+    parser.add_argument("--out", required=True, help="pasta de saída")
+    parser.add_argument("--planilha", default=PLANILHA_CGIM_LOCAL or "20241011_NCMs-CGIM-DINTE.xlsx",
+                        help="planilha CGIM (.xlsx)")
+    parser.add_argument("--processos", type=int, default=CLI_PROCESSOS,
+                        help=f"processos que analisam os NCMs (padrão: {CLI_PROCESSOS}; 1 = sem pool)")
+    parser.add_argument("--todos", action="store_true", help="analisa todos os NCMs das pautas, não só os da CGIM")
+    parser.add_argument("--sem-html", action="store_true", help="não gera as fichas HTML")
+    parser.add_argument("--sem-xlsx", action="store_true", help="não gera o arquivo Excel")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format=_FORMATO_LOG)
+
+    _, ano, mes = obter_data_ultima_atualizacao()
+    if ano == "Erro" or mes == "Erro" or not ano or not mes:
+        raise SystemExit("Não foi possível obter a data de atualização da API Comex.")
+    dados_excel = None
+    try:
+        with open(args.planilha, "rb") as arquivo:
+            dados_excel = proc.carregar_dados_excel(arquivo)
+    except OSError as e:
+        logging.warning(f"Planilha CGIM não lida ({args.planilha}): {e}")
+    if not dados_excel and not args.todos:
+        raise SystemExit(f"Não foi possível ler a planilha CGIM em {args.planilha} (use --todos para não filtrar).")
+
+    ncms = ncms_das_pautas(args.pdfs)
+    if not args.todos:
+        ncms_cgim = set(dados_excel["NCMs-CGIM-DINTE"]["NCM"].dropna())
+        ncms = [ncm for ncm in ncms if ncm in ncms_cgim]
+    if not ncms:
+        raise SystemExit("Nenhum NCM a analisar nas pautas informadas.")
+    print(f"{len(ncms)} NCMs a analisar (dados até {int(mes):02d}/{ano}).")
+    os.makedirs(args.out, exist_ok=True)
+    indice = processar_ncms(ncms, args.out, int(mes), int(ano), dados_excel, args.processos,
+                            gerar_html=not args.sem_html, gerar_xlsx=not args.sem_xlsx,
+                            progresso=lambda feitos, total: print(f"\r{feitos}/{total}", end="", flush=True))
+    com_erro = sum(item["situacao"] != "OK" for item in indice["ncms"].values())
+    print(f"\n{len(ncms)} NCMs gravados em {args.out}; {com_erro} com erro.")
+    if com_erro:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Configurações do painel, lidas de variáveis de ambiente.
+
+Todas as opções têm valores padrão que reproduzem o comportamento original
+(planilha baixada do GitHub a cada execução), então nada precisa ser definido
+para rodar o app localmente.
+"""
+import os
+
+
+def _env_int(nome, padrao):
+    """Lê uma variável de ambiente inteira, usando o padrão se ausente ou inválida."""
+    valor = os.environ.get(nome)
+    if not valor:
+        return padrao
+    try:
+        return int(valor)
+    except ValueError:
+        return padrao
+
+
+def _env_float(nome, padrao):
+    """Lê uma variável de ambiente numérica, usando o padrão se ausente ou inválida."""
+    valor = os.environ.get(nome)
+    if not valor:
+        return padrao
+    try:
+        return float(valor)
+    except ValueError:
+        return padrao
+
+
+# --- Armazenamento local ---
+# Diretório dos caches em disco. Aponte todas as instâncias para o mesmo
+# diretório (volume compartilhado) para que o cache valha entre elas.
+DIR_CACHE = os.environ.get("FICHA_NCM_DIR_CACHE", os.path.join(os.getcwd(), ".cache_ficha_ncm"))
+
+# --- Planilha CGIM ---
+# Caminho de uma cópia local da planilha. Se definido, o app passa a monitorar
+# o arquivo e recarregar apenas as abas alteradas, em vez de baixar do GitHub.
+PLANILHA_CGIM_LOCAL = os.environ.get("FICHA_NCM_PLANILHA_LOCAL", "")
+# Intervalo (em segundos) entre verificações de alteração do arquivo local.
+INTERVALO_MONITOR_PLANILHA = _env_float("FICHA_NCM_INTERVALO_MONITOR", 5.0)
+
+# --- API ComexStat ---
+# Endereço base da API. Aponte para um servidor local (ex.: o simulador em
+# benchmarks/comex_simulado.py) para testes de carga sem acessar o MDIC.
+API_COMEX_URL = os.environ.get("FICHA_NCM_API_URL", "https://api-comexstat.mdic.gov.br").rstrip("/")
+
+# --- Extração de NCMs da pauta (PDF) ---
+# Extrator de texto: 'pypdf2', 'pdfplumber' ou 'prevarredura' (PyPDF2 pulando
+# páginas sem candidatos a NCM). Use benchmarks/bench_backends_pdf.py para
+# escolher o mais rápido que atinge o recall desejado nas pautas reais.
+PDF_BACKEND = os.environ.get("FICHA_NCM_PDF_BACKEND", "pypdf2")
+# Número de processos usados na extração (0 = um por núcleo de CPU). Nunca
+# passa do número de núcleos; com um núcleo só a extração é sempre sequencial.
+PDF_PROCESSOS = _env_int("FICHA_NCM_PDF_PROCESSOS", 0)
+# Abaixo deste número de páginas a extração é sequencial: o custo de iniciar
+# os processos supera o ganho em documentos pequenos. O padrão vem de
+# `python -m benchmarks.bench_extracao_pdf --limiar` (PyPDF2, ~2,8 ms por
+# página; ~0,4 s para iniciar um pool de 2 processos); rode-o no servidor e
+# nas pautas reais para ajustar.
+PDF_PAGINAS_MINIMAS_PARALELO = _env_int("FICHA_NCM_PDF_PAGINAS_MINIMAS_PARALELO", 250)
+
+# --- Cache em memória compartilhado ---
+# Teto (em MB) de tudo o que o processo guarda em memória para as sessões:
+# planilha, análises de NCM, figuras e visão geral. Os itens menos usados saem
+# primeiro quando o teto é atingido.
+CACHE_MEMORIA_MB = _env_float("FICHA_NCM_CACHE_MEMORIA_MB", 512.0)
+# Parte do teto reservada às figuras Plotly serializadas.
+CACHE_FIGURAS_MB = _env_float("FICHA_NCM_CACHE_FIGURAS_MB", 64.0)
+# Validade (em segundos) da planilha baixada do GitHub e da visão geral da pauta.
+TTL_PLANILHA_GITHUB = _env_float("FICHA_NCM_TTL_PLANILHA_GITHUB", 3600.0)
+TTL_VISAO_GERAL = _env_float("FICHA_NCM_TTL_VISAO_GERAL", 3600.0)
+
+# --- Fila de análises de NCM ---
+# Threads que executam em segundo plano a busca, o processamento e o preparo
+# dos gráficos de cada NCM (o trabalho é dominado pela espera da API).
+FILA_WORKERS = _env_int("FICHA_NCM_FILA_WORKERS", 4)
+# Quantas análises concluídas ficam guardadas para reuso entre sessões.
+FILA_TAREFAS_MAXIMAS = _env_int("FICHA_NCM_FILA_TAREFAS_MAXIMAS", 256)
+
+# --- Cache persistente (SQLite) ---
+# Banco SQLite em modo WAL compartilhado por todos os processos da máquina
+# (réplicas do app, CLI, serviço JSON, pré-aquecimento): respostas da API,
+# análises, figuras, extrações de PDF e abas da planilha. Vazio = desativado.
+# O modo WAL exige que os processos estejam na mesma máquina: não aponte
+# réplicas em máquinas diferentes para o mesmo arquivo num volume de rede.
+CACHE_SQLITE = os.environ.get("FICHA_NCM_CACHE_SQLITE", os.path.join(DIR_CACHE, "cache.sqlite3"))
+# Teto (em MB) do banco; os itens usados há mais tempo saem primeiro.
+CACHE_SQLITE_MB = _env_float("FICHA_NCM_CACHE_SQLITE_MB", 1024.0)
+# Validade (s) das respostas da API guardadas. Elas já são separadas pela
+# data da divulgação do ComexStat; a validade só limpa as de versões antigas.
+CACHE_SQLITE_TTL_API = _env_float("FICHA_NCM_CACHE_SQLITE_TTL_API", 7 * 24 * 3600.0)
+# Por quanto tempo (s) a data da última divulgação vale sem nova consulta.
+# Qualquer processo que consulte a data e encontre uma divulgação nova a
+# atualiza para todos.
+CACHE_SQLITE_TTL_VERSAO_API = _env_float("FICHA_NCM_CACHE_SQLITE_TTL_VERSAO_API", 600.0)
+# Depois de uma falha ao consultar a data, por quanto tempo (s) as consultas
+# guardadas usam a última divulgação conhecida sem tentar a data de novo.
+CACHE_SQLITE_TTL_FALHA_VERSAO_API = _env_float("FICHA_NCM_CACHE_SQLITE_TTL_FALHA_VERSAO_API", 60.0)
+
+# --- Processamento em lote (CLI) ---
+# Processos que analisam os NCMs em `python -m modulos.cli` (cada um busca na
+# API, processa as séries e monta a ficha HTML de um NCM por vez).
+CLI_PROCESSOS = _env_int("FICHA_NCM_CLI_PROCESSOS", 4)
+
+# --- Serviço JSON ---
+# Endereço em que `python -m modulos.servico_json` atende.
+SERVICO_HOST = os.environ.get("FICHA_NCM_SERVICO_HOST", "127.0.0.1")
+SERVICO_PORTA = _env_int("FICHA_NCM_SERVICO_PORTA", 8600)
+# Quanto tempo (s) uma requisição espera a análise do NCM antes de responder 504.
+SERVICO_TIMEOUT_ANALISE = _env_float("FICHA_NCM_SERVICO_TIMEOUT_ANALISE", 120.0)
+# Tamanho máximo (em MB) do PDF aceito em POST /pauta.
+SERVICO_PDF_MAXIMO_MB = _env_float("FICHA_NCM_SERVICO_PDF_MAXIMO_MB", 50.0)
+# Por quanto tempo (s) a data da última atualização da API é reaproveitada
+# antes de ser consultada de novo (uma nova divulgação muda a versão dos dados).
+SERVICO_TTL_VERSAO = _env_float("FICHA_NCM_SERVICO_TTL_VERSAO", 300.0)
+
+# --- Pré-aquecimento após divulgações ---
+# Com "1", o app mantém uma thread que, a cada nova divulgação do ComexStat,
+# analisa todos os NCMs da planilha CGIM e deixa séries, dados por país e
+# figuras no cache compartilhado (ver modulos/preaquecimento.py).
+PREAQUECIMENTO_ATIVO = os.environ.get("FICHA_NCM_PREAQUECIMENTO", "") == "1"
+# Intervalo (s) entre consultas à data de atualização da API.
+PREAQUECIMENTO_INTERVALO = _env_float("FICHA_NCM_PREAQUECIMENTO_INTERVALO", 1800.0)
+# Pausa (s) entre as análises de dois NCMs (cerca de 10 requisições cada),
+# para ficar dentro do limite de requisições da API e não disputar a fila
+# com os analistas.
+PREAQUECIMENTO_PAUSA_NCM = _env_float("FICHA_NCM_PREAQUECIMENTO_PAUSA_NCM", 5.0)
+# Checkpoint da rodada em andamento, para retomar após uma interrupção.
+ARQUIVO_PREAQUECIMENTO = os.environ.get("FICHA_NCM_ARQUIVO_PREAQUECIMENTO",
+                                        os.path.join(DIR_CACHE, "preaquecimento.json"))
+
+# --- Visão geral da pauta ---
+# NCMs por requisição nas consultas em lote à API e quantas requisições
+# correm ao mesmo tempo ao montar a tabela da pauta inteira.
+VISAO_GERAL_NCMS_POR_LOTE = _env_int("FICHA_NCM_VISAO_GERAL_NCMS_POR_LOTE", 25)
+VISAO_GERAL_REQUISICOES_PARALELAS = _env_int("FICHA_NCM_VISAO_GERAL_REQUISICOES_PARALELAS", 4)
+
+# --- Gráficos de séries longas ---
+# Acima deste número de pontos (somando todas as séries) os gráficos mensais
+# deixam de usar barras SVG e passam a usar traços WebGL (Scattergl). O gráfico
+# de 12 meses padrão (desde 2019) tem menos de 100 meses; a série completa
+# (desde 1997) tem ~340, acima de 20 anos de barras (240).
+GRAFICO_PONTOS_SVG = _env_int("FICHA_NCM_GRAFICO_PONTOS_SVG", 240)
+# Máximo de pontos enviados ao navegador por gráfico; séries maiores são
+# reduzidas no servidor (LTTB), preservando máximos e mínimos. Cerca de um
+# ponto a cada 2 px num gráfico de meia página.
+GRAFICO_PONTOS_MAXIMOS = _env_int("FICHA_NCM_GRAFICO_PONTOS_MAXIMOS", 300)
+
+# --- Fichas estáticas (HTML) ---
+# Pasta das fichas pré-geradas em lote: uma subpasta por versão dos dados da
+# API e uma única cópia do plotly.js, compartilhada por todas as fichas.
+DIR_FICHAS_HTML = os.environ.get("FICHA_NCM_DIR_FICHAS_HTML", os.path.join(DIR_CACHE, "fichas_html"))
+# Altura (em pixels) do quadro em que o app exibe uma ficha pré-gerada.
+FICHA_HTML_ALTURA = _env_int("FICHA_NCM_FICHA_HTML_ALTURA", 4200)
+
+# --- Instrumentação ---
+# Com "1", toda execução do script e toda análise da fila registra quanto
+# tempo passou em cada trecho (API, processamento, gráficos, exibição). Uma
+# sessão também pode ativar o registro só para si abrindo o app com ?debug=1,
+# o que mostra a cascata de tempos num expander ao final da página.
+RASTRO_ATIVO = os.environ.get("FICHA_NCM_RASTRO", "") == "1"
+# Arquivo JSONL em que cada rastro concluído é acrescentado (vazio = não grava)
+# e tamanho (em MB) a partir do qual o arquivo é rotacionado.
+ARQUIVO_RASTRO = os.environ.get("FICHA_NCM_ARQUIVO_RASTRO", os.path.join(DIR_CACHE, "rastros.jsonl"))
+RASTRO_ARQUIVO_MB = _env_float("FICHA_NCM_RASTRO_ARQUIVO_MB", 50.0)
+
+# --- Perfilamento sob demanda ---
+# Com "1", toda execução do script e toda análise da fila é perfilada (use só
+# para diagnóstico: o tracemalloc deixa o processo bem mais lento). Uma sessão
+# também pode pedir o perfil só para si abrindo o app com ?perfil=1.
+PERFIL_ATIVO = os.environ.get("FICHA_NCM_PERFIL", "") == "1"
+# Pasta dos perfis gravados (um arquivo por execução) e quantos são mantidos.
+DIR_PERFIS = os.environ.get("FICHA_NCM_DIR_PERFIS", os.path.join(DIR_CACHE, "perfis"))
+PERFIS_MAXIMOS = _env_int("FICHA_NCM_PERFIS_MAXIMOS", 200)
+# Intervalo de amostragem do pyinstrument (ms) e se o tracemalloc registra o
+# pico de memória e as maiores alocações de cada execução perfilada.
+PERFIL_INTERVALO_MS = _env_float("FICHA_NCM_PERFIL_INTERVALO_MS", 1.0)
+PERFIL_TRACEMALLOC = os.environ.get("FICHA_NCM_PERFIL_TRACEMALLOC", "1") == "1"
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Exportação das fichas de uma pauta inteira para um único arquivo Excel.
+
+O arquivo tem uma aba "Resumo" com uma linha por NCM e uma aba por NCM com a
+série anual, o comparativo do ano corrente com o mesmo período do ano
+anterior, os quadros-resumo de importações e exportações e a distribuição
+por país. Por padrão os dados vêm da fila de análises: todos os NCMs são
+submetidos de uma vez e processados em paralelo pelos workers da fila (o que
+também deixa as páginas dos NCMs prontas no cache); a CLI (modulos/cli.py)
+passa os resultados do seu próprio pool de processos. Cada aba é escrita
+assim que o seu NCM termina. O xlsxwriter trabalha em modo constant_memory, gravando cada
+linha em disco ao passar para a seguinte, então a memória usada não cresce
+com o tamanho da pauta.
+"""
+import logging
+import math
+import os
+import tempfile
+
+import pandas as pd
+
+from modulos.config import DIR_CACHE
+from modulos.fila_analises import fila_analises
+from modulos.resumo_tabelas import montar_resumos
+
+_MESES = ["jan", "fev", "mar", "abr", "mai", "jun", "jul", "ago", "set", "out", "nov", "dez"]
+
+# Colunas da aba "Resumo": (título, formato)
+_COLUNAS_RESUMO = [
+    ("NCM", None), ("Descrição", None),
+    ("Importações {ano} (US$ FOB)", "inteiro"), ("Importações {ano} (KG)", "inteiro"),
+    ("Exportações {ano} (US$ FOB)", "inteiro"), ("Exportações {ano} (KG)", "inteiro"),
+    ("Importações {periodo} {ano} (US$ FOB)", "inteiro"), ("Importações {periodo} {ano_atual} (US$ FOB)", "inteiro"),
+    ("Var. Importações {periodo} (%)", "percentual"),
+    ("Principal Origem 2024", None), ("Part. Origem (%)", "percentual"),
+    ("Situação", None),
+]
+
+
+def _ncm_formatado(ncm_code):
+    return f"{ncm_code[:4]}.{ncm_code[4:6]}.{ncm_code[6:]}"
+
+
+def _numero(valor):
+    """float do valor, ou None se ausente/não numérico (célula em branco)."""
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(numero) or math.isinf(numero) else numero
+
+
+def _por_pais(registros):
+    """DataFrame [País, US$ FOB, Part. (%)] ordenado pelo valor, a partir da lista da API."""
+    df = pd.DataFrame(registros or [], columns=["country", "metricFOB"])
+    df["metricFOB"] = pd.to_numeric(df["metricFOB"], errors="coerce").fillna(0)
+    df = df.groupby("country", as_index=False)["metricFOB"].sum().sort_values("metricFOB", ascending=False)
+    total = df["metricFOB"].sum()
+    df["Part. (%)"] = df["metricFOB"] / total * 100 if total else float("nan")
+    return df.rename(columns={"country": "País", "metricFOB": "US$ FOB"})
+
+
+def montar_ficha(ncm_code, resultado, last_updated_month):
+    """
+    Tabelas da ficha de um NCM a partir do resultado da fila de análises.
+
+    Returns:
+        dict: {"descricao", "series", "tabelas": [(título, DataFrame)], "por_pais": {fluxo: DataFrame}}
+    """
+    series = resultado["series"]
+    df_hist = series["df_hist_anual"]
+    df_24, df_25 = series["df_2024_parcial"], series["df_2025_parcial"]
+    rotulo_mes = _MESES[last_updated_month - 1]
+    tabelas = []
+    if isinstance(df_hist, pd.DataFrame) and not df_hist.empty:
+        df_anual = df_hist.rename(columns={"year": "Ano"})
+        df_anual = df_anual.assign(Ano=df_anual["Ano"].astype(str)).sort_values("Ano")
+        tabelas.append(("Série Temporal (Anual)", df_anual))
+    parciais = [df for df in (df_24, df_25) if isinstance(df, pd.DataFrame) and not df.empty]
+    if parciais:
+        df_comp = pd.concat(parciais, ignore_index=True)
+        df_comp["Ano"] = df_comp["Ano"].astype(str)
+        df_comp = df_comp[["Ano"] + [c for c in df_comp.columns if c != "Ano"]]
+        tabelas.append((f"Comparativo jan-{rotulo_mes} (Ano Atual vs Ano Anterior)", df_comp.sort_values("Ano")))
+    if len(parciais) == 2:
+        resumos = montar_resumos(df_hist, df_24, df_25, last_updated_month)
+        if resumos is not None:
+            tabelas.append(("Quadro Resumo das Importações", resumos[0]))
+            tabelas.append(("Quadro Resumo das Exportações", resumos[1]))
+    por_pais = {fluxo: _por_pais(resultado["dados_pais"].get(fluxo)) for fluxo in ("import", "export")}
+    tabelas.append(("Importações 2024 por País (US$ FOB)", por_pais["import"]))
+    tabelas.append(("Exportações 2024 por País (US$ FOB)", por_pais["export"]))
+    return {"descricao": resultado["descricao"], "series": series, "tabelas": tabelas, "por_pais": por_pais}
+
+
+def _linha_resumo(ncm_code, ficha, last_updated_year):
+    """Valores da linha do NCM na aba "Resumo" (na ordem de _COLUNAS_RESUMO, sem a situação)."""
+    series = ficha["series"]
+    df_hist = series["df_hist_anual"]
+    anterior = {}
+    if isinstance(df_hist, pd.DataFrame) and not df_hist.empty:
+        linhas = df_hist[df_hist["year"].astype(str) == str(last_updated_year - 1)]
+        if not linhas.empty:
+            anterior = linhas.iloc[0]
+
+    def soma_parcial(df):
+        if not isinstance(df, pd.DataFrame) or df.empty or "Importações (FOB)" not in df.columns:
+            return None
+        return _numero(pd.to_numeric(df["Importações (FOB)"], errors="coerce").sum())
+
+    parcial_24, parcial_25 = soma_parcial(series["df_2024_parcial"]), soma_parcial(series["df_2025_parcial"])
+    variacao = (parcial_25 - parcial_24) / parcial_24 * 100 if parcial_24 and parcial_25 is not None else None
+    df_origens = ficha["por_pais"]["import"]
+    origem, participacao = (None, None) if df_origens.empty else (df_origens.iloc[0]["País"], df_origens.iloc[0]["Part. (%)"])
+    return [
+        _ncm_formatado(ncm_code), ficha["descricao"],
+        *(_numero(anterior.get(coluna)) if len(anterior) else None
+          for coluna in ("Importações (FOB)", "Importações (KG)", "Exportações (FOB)", "Exportações (KG)")),
+        parcial_24, parcial_25, variacao, origem, _numero(participacao),
+    ]
+
+
+def _situacao(erro, ficha):
+    if ficha is None:
+        return f"Erro: {erro or 'análise indisponível'}"
+    series = ficha["series"]
+    erros = [series[c] for c in ("error_hist", "error_2024_parcial", "error_2025_parcial") if series[c]]
+    return f"Erro: {erros[0]}" if erros else "OK"
+
+
+class _Planilha:
+    """Escrita sequencial (linha a linha, como exige o modo constant_memory) de uma aba."""
+
+    def __init__(self, aba, formatos):
+        self.aba = aba
+        self.formatos = formatos
+        self.linha = 0
+
+    def escrever_linha(self, valores, formatos=None, formato_linha=None):
+        for coluna, valor in enumerate(valores):
+            formato = formato_linha or (self.formatos.get(formatos[coluna]) if formatos else None)
+            if valor is None or (isinstance(valor, float) and (math.isnan(valor) or math.isinf(valor))):
+                self.aba.write_blank(self.linha, coluna, None, formato)
+            elif isinstance(valor, str):
+                self.aba.write_string(self.linha, coluna, valor, formato)
+            else:
+                self.aba.write_number(self.linha, coluna, valor / 100 if formatos and formatos[coluna] == "percentual" else valor, formato)
+        self.linha += 1
+
+    def pular(self, linhas=1):
+        self.linha += linhas
+
+    def escrever_tabela(self, titulo, df):
+        """Título, cabeçalho e linhas do DataFrame; formato numérico escolhido pelo nome da coluna."""
+        formatos = [_formato_coluna(coluna, df[coluna]) for coluna in df.columns]
+        self.escrever_linha([titulo], formato_linha=self.formatos["titulo"])
+        self.escrever_linha([str(c) for c in df.columns], formato_linha=self.formatos["cabecalho"])
+        for valores in df.itertuples(index=False, name=None):
+            self.escrever_linha([v if isinstance(v, str) else _numero(v) for v in valores], formatos)
+        if df.empty:
+            self.escrever_linha(["Sem dados."])
+        self.pular()
+
+
+def _formato_coluna(nome, serie):
+    if "(%)" in nome:
+        return "percentual"
+    if "Preço Médio" in nome:
+        return "decimal"
+    return "inteiro" if pd.api.types.is_numeric_dtype(serie) else None
+
+
+def _criar_formatos(workbook):
+    return {
+        "titulo": workbook.add_format({"bold": True, "font_size": 12}),
+        "cabecalho": workbook.add_format({"bold": True, "bg_color": "#DCE6F1", "text_wrap": True, "valign": "top"}),
+        "inteiro": workbook.add_format({"num_format": "#,##0"}),
+        "decimal": workbook.add_format({"num_format": "#,##0.00"}),
+        "percentual": workbook.add_format({"num_format": "0.00%"}),
+    }
+
+
+def _resultados_da_fila(ncms, last_updated_month, last_updated_year):
+    """(NCM, resultado, erro) de cada NCM, na ordem de `ncms`, a partir da fila de análises."""
+    # Todos os NCMs entram na fila antes de escrever a primeira aba
+    tarefas = [fila_analises.submeter(ncm, last_updated_month, last_updated_year, preparar_graficos=False) for ncm in ncms]
+    for ncm, tarefa in zip(ncms, tarefas):
+        tarefa.aguardar()
+        resultado = tarefa.resultado
+        if resultado is None and tarefa.status == "concluida":
+            # Resultado já saiu do cache compartilhado: refaz a análise deste NCM
+            resultado = fila_analises.resultado(ncm, last_updated_month, last_updated_year)
+        yield ncm, resultado, tarefa.erro
+
+
+def exportar_pauta_xlsx(ncms, last_updated_month, last_updated_year, destino=None, progresso=None, resultados=None):
+    """
+    Gera o arquivo Excel com as fichas de todos os NCMs da pauta.
+
+    Args:
+        ncms (list): NCMs (8 dígitos), na ordem das abas.
+        last_updated_month, last_updated_year (int): Última atualização da base ComexStat.
+        destino (str | None): Caminho do arquivo; se None, um arquivo temporário em DIR_CACHE.
+        progresso (callable | None): Chamado com (NCMs concluídos, total) a cada aba escrita.
+        resultados (iterable | None): (NCM, resultado da análise ou None, erro) na
+            ordem de `ncms`; se None, as análises são pedidas à fila.
+
+    Returns:
+        tuple: (caminho do arquivo, número de NCMs com erro)
+    """
+    import xlsxwriter
+
+    if destino is None:
+        os.makedirs(DIR_CACHE, exist_ok=True)
+        descritor, destino = tempfile.mkstemp(prefix="fichas_", suffix=".xlsx", dir=DIR_CACHE)
+        os.close(descritor)
+    if resultados is None:
+        resultados = _resultados_da_fila(ncms, last_updated_month, last_updated_year)
+
+    workbook = xlsxwriter.Workbook(destino, {"constant_memory": True})
+    formatos = _criar_formatos(workbook)
+    periodo = f"jan-{_MESES[last_updated_month - 1]}"
+    titulos = [titulo.format(ano=last_updated_year - 1, ano_atual=last_updated_year, periodo=periodo)
+               for titulo, _ in _COLUNAS_RESUMO]
+    formatos_resumo = [formato for _, formato in _COLUNAS_RESUMO]
+    resumo = _Planilha(workbook.add_worksheet("Resumo"), formatos)
+    resumo.aba.set_column(0, 0, 12)
+    resumo.aba.set_column(1, 1, 50)
+    resumo.aba.set_column(2, len(titulos) - 1, 18)
+    resumo.escrever_linha([f"Fichas NCM da pauta ({len(ncms)} NCMs) - dados até {last_updated_month:02d}/{last_updated_year}. "
+                           "Fonte: Comex Stat/MDIC."], formato_linha=formatos["titulo"])
+    resumo.escrever_linha(titulos, formato_linha=formatos["cabecalho"])
+    resumo.aba.freeze_panes(2, 1)
+
+    com_erro = 0
+    for i, (ncm, resultado, erro) in enumerate(resultados):
+        ficha = montar_ficha(ncm, resultado, last_updated_month) if resultado else None
+        situacao = _situacao(erro, ficha)
+        com_erro += situacao != "OK"
+        if ficha is None:
+            resumo.escrever_linha([_ncm_formatado(ncm)] + [None] * (len(titulos) - 2) + [situacao], formatos_resumo)
+        else:
+            resumo.escrever_linha(_linha_resumo(ncm, ficha, last_updated_year) + [situacao], formatos_resumo)
+            aba = _Planilha(workbook.add_worksheet(_ncm_formatado(ncm)), formatos)
+            aba.aba.set_column(0, 0, 16)
+            aba.aba.set_column(1, 10, 18)
+            aba.escrever_linha([f"NCM {_ncm_formatado(ncm)} - {ficha['descricao']}"], formato_linha=formatos["titulo"])
+            aba.pular()
+            for titulo, df in ficha["tabelas"]:
+                aba.escrever_tabela(titulo, df)
+        if progresso:
+            progresso(i + 1, len(ncms))
+    workbook.close()
+    logging.info(f"Fichas de {len(ncms)} NCMs exportadas para {destino} ({com_erro} com erro).")
+    return destino, com_erro
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Extração de NCMs (formato xxxx.xx.xx) do texto de pautas em PDF.
+
+Documentos grandes são divididos em intervalos de páginas processados em
+paralelo por um pool de processos. Cada processo recebe os bytes do PDF uma
+única vez (no inicializador) e abre o próprio leitor; os conjuntos de NCMs de
+cada página são depois combinados, de modo que o resultado é idêntico ao da
+leitura sequencial. `iterar_ncms_pdf` expõe o mesmo processo como gerador,
+página a página, para quem quer exibir resultados parciais.
+
+O texto das páginas vem de um extrator plugável (ver EXTRATORES), escolhido
+pela configuração FICHA_NCM_PDF_BACKEND. O benchmark
+`benchmarks/bench_backends_pdf.py` compara velocidade e recall de cada um.
+"""
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import multiprocessing
+
+from modulos.config import PDF_BACKEND, PDF_PROCESSOS, PDF_PAGINAS_MINIMAS_PARALELO
+
+PADRAO_NCM = re.compile(r'\b(\d{4}\.\d{2}\.\d{2})\b')
+# Pré-varredura no fluxo de conteúdo bruto: propositalmente frouxa, porque o
+# texto pode vir quebrado em pedaços (operadores TJ) no meio do código
+PADRAO_PRE_VARREDURA = re.compile(rb'\d\.\d\d')
+
+# Estado de cada processo do pool (definido pelo inicializador)
+_leitor_processo = None
+
+
+# --- Extratores de texto ---
+
+class ExtratorPyPDF2:
+    """Texto das páginas via PyPDF2 (padrão)."""
+
+    def __init__(self, pdf_bytes):
+        from PyPDF2 import PdfReader
+        self.reader = PdfReader(BytesIO(pdf_bytes))
+        self.num_paginas = len(self.reader.pages)
+
+    def texto_pagina(self, indice):
+        return self.reader.pages[indice].extract_text()
+
+    def fechar(self):
+        pass
+
+
+class ExtratorPdfplumber:
+    """Texto das páginas via pdfplumber (pdfminer.six): mais lento, layout mais fiel."""
+
+    def __init__(self, pdf_bytes):
+        import pdfplumber
+        self.pdf = pdfplumber.open(BytesIO(pdf_bytes))
+        self.num_paginas = len(self.pdf.pages)
+
+    def texto_pagina(self, indice):
+        pagina = self.pdf.pages[indice]
+        try:
+            return pagina.extract_text()
+        finally:
+            pagina.flush_cache()  # evita acumular objetos de layout de todas as páginas
+
+    def fechar(self):
+        self.pdf.close()
+
+
+class ExtratorPreVarredura(ExtratorPyPDF2):
+    """
+    PyPDF2 com pré-varredura: antes de extrair o texto, procura no fluxo de
+    conteúdo bruto da página algo parecido com um NCM e pula as páginas sem
+    nenhum candidato. Pode perder NCMs em PDFs com texto codificado (fontes
+    CID, strings hexadecimais); o benchmark mede esse efeito no recall.
+    """
+
+    def texto_pagina(self, indice):
+        pagina = self.reader.pages[indice]
+        conteudo = pagina.get_contents()
+        if conteudo is None or not PADRAO_PRE_VARREDURA.search(conteudo.get_data()):
+            return None
+        return pagina.extract_text()
+
+
+EXTRATORES = {
+    "pypdf2": ExtratorPyPDF2,
+    "pdfplumber": ExtratorPdfplumber,
+    "prevarredura": ExtratorPreVarredura,
+}
+
+
+def abrir_extrator(pdf_bytes, backend=None):
+    """Abre o PDF com o extrator indicado (ou o da configuração)."""
+    backend = backend or PDF_BACKEND
+    if backend not in EXTRATORES:
+        logging.warning(f"Extrator de PDF '{backend}' desconhecido. Usando 'pypdf2'.")
+        backend = "pypdf2"
+    return EXTRATORES[backend](pdf_bytes)
+
+
+def _extrair_paginas(extrator, inicio, fim):
+    """
+    Extrai os NCMs das páginas [inicio, fim) de um extrator já aberto.
+
+    Retorna:
+        list: [(indice_pagina, [ncms])] para todas as páginas do intervalo
+              (lista vazia nas páginas sem NCM; None nas páginas com erro de leitura).
+    """
+    resultado = []
+    for i in range(inicio, fim):
+        matches = []
+        try:
+            text = extrator.texto_pagina(i)
+            if text:
+                matches = PADRAO_NCM.findall(text)
+        except Exception as e_page:
+            logging.warning(f"Erro ao extrair texto da página {i+1} do PDF: {e_page}")
+            matches = None
+        resultado.append((i, matches))
+    return resultado
+
+
+def _inicializar_processo(pdf_bytes, backend):
+    """Abre o PDF uma vez por processo a partir dos bytes compartilhados."""
+    global _leitor_processo
+    _leitor_processo = abrir_extrator(pdf_bytes, backend)
+
+
+def _extrair_intervalo_processo(intervalo):
+    inicio, fim = intervalo
+    return _extrair_paginas(_leitor_processo, inicio, fim)
+
+
+def _dividir_paginas(num_paginas, partes):
+    """Divide [0, num_paginas) em até `partes` intervalos contíguos de tamanho parecido."""
+    partes = max(1, min(partes, num_paginas))
+    tamanho, resto = divmod(num_paginas, partes)
+    intervalos, inicio = [], 0
+    for p in range(partes):
+        fim = inicio + tamanho + (1 if p < resto else 0)
+        intervalos.append((inicio, fim))
+        inicio = fim
+    return intervalos
+
+
+def numero_processos(processos):
+    """Processos da extração, limitados aos núcleos de CPU: sem núcleos livres o pool só acrescenta custo."""
+    if processos is None:
+        processos = PDF_PROCESSOS
+    nucleos = os.cpu_count() or 1
+    return min(processos, nucleos) if processos and processos > 0 else nucleos
+
+
+def iterar_ncms_pdf(pdf_bytes, processos=None, backend=None):
+    """
+    Gera os NCMs do PDF página a página, na ordem do documento.
+
+    Na extração paralela os intervalos de páginas são processados ao mesmo
+    tempo, mas entregues em ordem assim que cada um termina, de modo que quem
+    consome o gerador recebe resultados parciais desde o início.
+
+    Args:
+        pdf_bytes (bytes): Conteúdo do arquivo PDF.
+        processos (int | None): Número de processos. None usa a configuração;
+            1 força a extração sequencial.
+        backend (str | None): Chave de EXTRATORES. None usa a configuração.
+
+    Yields:
+        tuple: (indice_pagina (0-based), num_paginas, [ncms da página] ou
+               None se o texto da página não pôde ser extraído).
+    """
+    backend = backend or PDF_BACKEND
+    extrator = abrir_extrator(pdf_bytes, backend)
+    num_paginas = extrator.num_paginas
+    processos = numero_processos(processos)
+    logging.info(f"Lendo PDF com {num_paginas} páginas (extrator '{backend}').")
+
+    if processos == 1 or num_paginas < PDF_PAGINAS_MINIMAS_PARALELO:
+        try:
+            for i in range(num_paginas):
+                for indice, matches in _extrair_paginas(extrator, i, i + 1):
+                    yield indice, num_paginas, matches
+        finally:
+            extrator.fechar()
+        return
+    extrator.fechar()
+
+    # Intervalos pequenos: equilibram páginas de custo desigual e mantêm o
+    # fluxo de resultados parciais frequente
+    intervalos = _dividir_paginas(num_paginas, processos * 4)
+    logging.info(f"Extração paralela: {len(intervalos)} intervalos de páginas em {processos} processos.")
+    # 'spawn' evita herdar, via fork, o estado das threads do servidor Streamlit
+    with ProcessPoolExecutor(max_workers=processos,
+                             mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_inicializar_processo,
+                             initargs=(pdf_bytes, backend)) as pool:
+        for parcial in pool.map(_extrair_intervalo_processo, intervalos):
+            for indice, matches in parcial:
+                yield indice, num_paginas, matches
+
+
+def extrair_ncms_por_pagina(pdf_bytes, processos=None, backend=None):
+    """
+    Extrai os NCMs de cada página do PDF.
+
+    Returns:
+        dict: {indice_pagina (0-based): [ncms na ordem em que aparecem]},
+              apenas para as páginas com algum NCM.
+    """
+    return {indice: matches for indice, _, matches in iterar_ncms_pdf(pdf_bytes, processos, backend) if matches}
+
+
+def extrair_ncms(pdf_bytes, processos=None, backend=None):
+    """
+    Extrai o conjunto de NCMs (com pontos) de um PDF.
+
+    Returns:
+        list: NCMs únicos, em ordem crescente.
+    """
+    ncms_encontradas = set()
+    for matches in extrair_ncms_por_pagina(pdf_bytes, processos, backend).values():
+        ncms_encontradas.update(matches)
+    logging.info(f"Extração de NCMs do PDF concluída. {len(ncms_encontradas)} NCMs únicos (com pontos) encontrados.")
+    return sorted(ncms_encontradas)
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Fichas estáticas em HTML, geradas em lote para os NCMs de uma pauta.
+
+Cada ficha é um arquivo HTML autocontido com os dados da planilha CGIM, as
+tabelas e os gráficos interativos da página do NCM. As fichas ficam em
+DIR_FICHAS_HTML/<versão dos dados>/<NCM>.html; o plotly.js (cerca de 4,8 MB)
+é gravado uma única vez em DIR_FICHAS_HTML e referenciado por todas, então
+uma pasta com a pauta inteira pode ser copiada ou publicada como está.
+
+A geração usa a fila de análises: todos os NCMs são submetidos de uma vez e
+processados em paralelo pelos seus workers, e as figuras vêm do cache de
+figuras (as mesmas da página ao vivo). Como a subpasta é a versão dos dados
+da API, uma nova divulgação do ComexStat torna as fichas antigas obsoletas
+naturalmente; o app só exibe uma ficha pré-gerada se ela for da versão atual.
+
+Uso (na raiz do repositório), de preferência logo após cada divulgação:
+    python -m modulos.fichas_html                 # NCMs da CGIM na última pauta do histórico
+    python -m modulos.fichas_html --ncms 84102030 84109000 --forcar
+"""
+import argparse
+import datetime
+import html
+import json
+import logging
+import os
+import re
+import shutil
+
+import pandas as pd
+
+from modulos.arquivos import gravar_atomico
+from modulos.config import DIR_FICHAS_HTML
+from modulos.cache_figuras import cache_figuras
+from modulos.fila_analises import fila_analises, versao_dados, GRAFICOS_DESEMPENHO, gerar_grafico_desempenho, gerar_treemap
+from modulos.formatacao import formatar_decimal
+from modulos.resumo_tabelas import montar_resumos, formatar_resumo
+import modulos.processamento as proc
+
+_ESTILO = """
+body { font-family: "Source Sans Pro", Arial, sans-serif; margin: 24px; color: #262730; }
+h1 { font-size: 1.6em; margin-bottom: 0; } h2 { font-size: 1.3em; margin-top: 32px; border-bottom: 2px solid #002f6c; }
+h3 { font-size: 1.05em; } .rodape { color: #777; font-size: 0.85em; margin-top: 32px; }
+.quadro { border: 1px solid #ddd; border-radius: 6px; padding: 8px 16px; margin: 12px 0; font-size: 0.95em; line-height: 1.5; }
+.graficos { display: grid; grid-template-columns: repeat(auto-fit, minmax(480px, 1fr)); gap: 16px; }
+table.tabela { border-collapse: collapse; font-size: 0.85em; margin: 8px 0 16px; }
+table.tabela th, table.tabela td { border: 1px solid #ddd; padding: 4px 8px; text-align: right; }
+table.tabela th { background: #dce6f1; }
+"""
+
+
+def _nome_plotly_js():
+    from plotly.offline import get_plotlyjs_version
+    return f"plotly-{get_plotlyjs_version()}.min.js"
+
+
+def garantir_plotly_js(diretorio=None):
+    """
+    Grava o plotly.js compartilhado em `diretorio` (padrão: DIR_FICHAS_HTML),
+    uma vez por versão do Plotly; retorna o nome do arquivo.
+    """
+    nome = _nome_plotly_js()
+    caminho = os.path.join(diretorio or DIR_FICHAS_HTML, nome)
+    if not os.path.exists(caminho):
+        from plotly.offline import get_plotlyjs
+        gravar_atomico(caminho, get_plotlyjs())
+        logging.info(f"plotly.js compartilhado gravado em {caminho}.")
+    return nome
+
+
+def caminho_ficha(ncm_code, versao):
+    return os.path.join(DIR_FICHAS_HTML, versao, f"{ncm_code}.html")
+
+
+def ficha_atual(ncm_code, last_updated_month, last_updated_year):
+    """Caminho da ficha pré-gerada do NCM na versão atual dos dados, ou None."""
+    caminho = caminho_ficha(ncm_code, versao_dados(last_updated_year, last_updated_month))
+    return caminho if os.path.exists(caminho) else None
+
+
+def html_para_exibicao(caminho):
+    """
+    Conteúdo da ficha com o plotly.js apontando para a CDN do Plotly, para
+    exibição dentro do app (o navegador baixa o arquivo uma vez e o reutiliza
+    em todas as fichas).
+    """
+    with open(caminho, encoding="utf-8") as arquivo:
+        conteudo = arquivo.read()
+    nome = _nome_plotly_js()
+    return conteudo.replace(f'src="../{nome}"', f'src="https://cdn.plot.ly/{nome}"')
+
+
+# ---- Montagem do HTML ----
+
+def _tabela_html(df):
+    return df.to_html(index=False, border=0, classes="tabela", na_rep="", escape=True)
+
+
+def _formatar_serie_anual(df):
+    """Tabela anual/comparativa com 'Ano' primeiro e números no padrão brasileiro."""
+    df = df.rename(columns={"year": "Ano"})
+    df = df.assign(Ano=df["Ano"].astype(str)).sort_values("Ano")
+    df = df[["Ano"] + [c for c in df.columns if c != "Ano"]]
+    numericas = [c for c in df.columns if c != "Ano" and pd.api.types.is_numeric_dtype(df[c])]
+    df[numericas] = df[numericas].apply(formatar_decimal)
+    return df
+
+
+def _secao_planilha(dados_excel, ncm_code):
+    """Departamento responsável e entidades associadas, da planilha CGIM."""
+    if not isinstance(dados_excel, dict) or not dados_excel:
+        return "<p>Planilha CGIM não disponível na geração desta ficha.</p>"
+    resultado_ncm, resultado_entidades = proc.buscar_informacoes_ncm_completo(dados_excel, ncm_code)
+    partes = ['<div class="quadro"><h3>Departamento Responsável</h3>']
+    if isinstance(resultado_ncm, pd.DataFrame) and not resultado_ncm.empty:
+        linha = resultado_ncm.iloc[0]
+        for rotulo, coluna in (("Departamento", "Departamento Responsável"), ("Coordenação-Geral", "Coordenação-Geral Responsável"),
+                               ("Agrupamento", "Agrupamento"), ("Setores", "Setores"),
+                               ("Subsetores", "Subsetores"), ("Produtos", "Produtos")):
+            partes.append(f"<strong>{rotulo}:</strong> {html.escape(str(linha.get(coluna, 'N/D')))}<br>")
+    else:
+        partes.append("<p>Informações do departamento não encontradas na planilha.</p>")
+    partes.append('</div><div class="quadro"><h3>Entidades Associadas</h3>')
+    if isinstance(resultado_entidades, pd.DataFrame) and not resultado_entidades.empty:
+        for _, linha in resultado_entidades.iterrows():
+            valor = lambda coluna: html.escape(str(linha.get(coluna, "N/D")))
+            nome = html.escape(str(linha.get("Entidade", linha.get("NomeAbaEntidade", "Nome não disponível"))))
+            partes.append(
+                f"<p><strong>{valor('Sigla Entidade')} - {nome}</strong><br>"
+                f"Dirigente: {valor('Nome do Dirigente')} ({valor('Cargo')}) | {valor('E-mail')} | Tel: {valor('Telefone')}<br>"
+                f"Contato Importante: {valor('Contato Importante')} ({valor('Cargo (Contato Importante)')}) | "
+                f"{valor('E-mail (Contato Importante)')} | Tel: {valor('Telefone (Contato Importante)')}</p>"
+            )
+    else:
+        partes.append("<p>Não há entidades associadas ao NCM na planilha.</p>")
+    partes.append("</div>")
+    return "".join(partes)
+
+
+def _figuras(resultado, ncm_code, last_updated_month, last_updated_year):
+    """[(título, figura)] da página do NCM, lidas do cache de figuras (ou geradas e guardadas nele)."""
+    from modulos.grafico_importacoes_12meses import gerar_grafico_importacoes_12meses
+    ncm_formatado = f"{ncm_code[:4]}.{ncm_code[4:6]}.{ncm_code[6:]}"
+    versao = versao_dados(last_updated_year, last_updated_month)
+    series = resultado["series"]
+    figuras = []
+    if isinstance(series["df_hist_anual"], pd.DataFrame) and not series["df_hist_anual"].empty:
+        for chave, (titulo, *_) in GRAFICOS_DESEMPENHO.items():
+            figuras.append((titulo, cache_figuras.obter_ou_gerar(
+                chave, ncm_code, versao,
+                lambda: gerar_grafico_desempenho(chave, series, ncm_formatado, last_updated_month, last_updated_year))))
+        figuras.append(("Importações Acumuladas (12 Meses - KG)", cache_figuras.obter_ou_gerar(
+            "importacoes_12meses", ncm_code, versao,
+            lambda: gerar_grafico_importacoes_12meses(ncm_code, ncm_formatado, fim=versao))))
+    for tipo_flow, titulo in (("import", "Origem das Importações 2024 (US$ FOB)"), ("export", "Destino das Exportações 2024 (US$ FOB)")):
+        figuras.append((titulo, cache_figuras.obter_ou_gerar(
+            f"treemap_{tipo_flow}", ncm_code, versao,
+            lambda: gerar_treemap(resultado, ncm_code, ncm_formatado, tipo_flow))))
+    return [(titulo, fig) for titulo, fig in figuras if fig is not None]
+
+
+def montar_ficha_html(ncm_code, resultado, dados_excel, last_updated_month, last_updated_year, plotly_js):
+    """
+    HTML completo da ficha de um NCM.
+
+    Args:
+        resultado (dict): Resultado da fila de análises para o NCM.
+        dados_excel (dict | None): Planilha CGIM estruturada (carregar_dados_excel).
+        plotly_js (str): Caminho do plotly.js relativo à ficha.
+    """
+    ncm_formatado = f"{ncm_code[:4]}.{ncm_code[4:6]}.{ncm_code[6:]}"
+    series = resultado["series"]
+    partes = [
+        f"<h1>NCM {ncm_formatado}</h1>",
+        f"<p><strong>{html.escape(str(resultado['descricao'] or ''))}</strong></p>",
+        f"<p>Dados da API Comex Stat até {last_updated_month:02d}/{last_updated_year}.</p>",
+        "<h2>Dados da Planilha CGIM</h2>", _secao_planilha(dados_excel, ncm_code),
+        "<h2>Dados da API Comex</h2>",
+    ]
+    df_hist, df_24, df_25 = series["df_hist_anual"], series["df_2024_parcial"], series["df_2025_parcial"]
+    for titulo, erro, df in (("Série Temporal (Anual)", series["error_hist"], df_hist),
+                             ("Comparativo Ano Atual vs Ano Anterior (Mesmo Período)", series["error_2024_parcial"] or series["error_2025_parcial"],
+                              pd.concat([d for d in (df_24, df_25) if isinstance(d, pd.DataFrame) and not d.empty] or [pd.DataFrame()]))):
+        partes.append(f"<h3>{titulo}</h3>")
+        if erro:
+            partes.append(f"<p>Erro ao obter os dados: {html.escape(str(erro))}</p>")
+        if isinstance(df, pd.DataFrame) and not df.empty:
+            partes.append(_tabela_html(_formatar_serie_anual(df)))
+    resumos = None
+    if all(isinstance(d, pd.DataFrame) and not d.empty for d in (df_24, df_25)):
+        resumos = montar_resumos(df_hist, df_24, df_25, last_updated_month)
+    if resumos is not None:
+        for titulo, df in zip(("Quadro Resumo das Importações", "Quadro Resumo das Exportações"), resumos):
+            partes.append(f"<h3>{titulo}</h3>{_tabela_html(formatar_resumo(df))}")
+    partes.append('<h2>Gráficos</h2><div class="graficos">')
+    for titulo, fig in _figuras(resultado, ncm_code, last_updated_month, last_updated_year):
+        div = fig.to_html(full_html=False, include_plotlyjs=False, config={"responsive": True})
+        partes.append(f"<div><h3>{html.escape(titulo)}</h3>{div}</div>")
+    partes.append("</div>")
+    gerada_em = datetime.datetime.now().strftime("%d/%m/%Y %H:%M")
+    partes.append(f'<p class="rodape">Fonte: Comex Stat/MDIC. Ficha gerada em {gerada_em}. CGIM/DINTE/SDIC.</p>')
+    return (f'<!DOCTYPE html><html lang="pt-BR"><head><meta charset="utf-8"><title>Ficha NCM {ncm_formatado}</title>'
+            f'<style>{_ESTILO}</style><script charset="utf-8" src="{plotly_js}"></script></head>'
+            f'<body>{"".join(partes)}</body></html>')
+
+
+def _gravar_indice(diretorio, novas, last_updated_month, last_updated_year):
+    """Atualiza o índice da versão (indice.json e index.html) com as fichas recém-geradas."""
+    caminho_json = os.path.join(diretorio, "indice.json")
+    try:
+        with open(caminho_json, encoding="utf-8") as arquivo:
+            fichas = json.load(arquivo)
+    except (OSError, ValueError):
+        fichas = {}
+    fichas.update(novas)
+    gravar_atomico(caminho_json, json.dumps(fichas, ensure_ascii=False, indent=1))
+    itens = "".join(f'<li><a href="{ncm}.html">{ncm[:4]}.{ncm[4:6]}.{ncm[6:]}</a> - {html.escape(str(descricao or ""))}</li>'
+                    for ncm, descricao in sorted(fichas.items()))
+    gravar_atomico(os.path.join(diretorio, "index.html"),
+                    f'<!DOCTYPE html><html lang="pt-BR"><head><meta charset="utf-8"><title>Fichas NCM</title>'
+                    f'<style>{_ESTILO}</style></head><body><h1>Fichas NCM - dados até {last_updated_month:02d}/{last_updated_year}</h1>'
+                    f'<ul>{itens}</ul></body></html>')
+
+
+def remover_versoes_antigas(versao_atual):
+    """Apaga as subpastas de versões dos dados anteriores à atual."""
+    if not os.path.isdir(DIR_FICHAS_HTML):
+        return
+    for nome in os.listdir(DIR_FICHAS_HTML):
+        caminho = os.path.join(DIR_FICHAS_HTML, nome)
+        if os.path.isdir(caminho) and re.fullmatch(r"\d{4}-\d{2}", nome) and nome < versao_atual:
+            shutil.rmtree(caminho, ignore_errors=True)
+            logging.info(f"Fichas estáticas da versão {nome} removidas.")
+
+
+def gerar_fichas(ncms, last_updated_month, last_updated_year, dados_excel=None, forcar=False, progresso=None):
+    """
+    Gera as fichas HTML dos NCMs na versão atual dos dados.
+
+    Args:
+        ncms (list): NCMs de 8 dígitos.
+        dados_excel (dict | None): Planilha CGIM estruturada.
+        forcar (bool): Regera também as fichas que já existem nesta versão.
+        progresso (callable | None): Chamado com (NCMs concluídos, total).
+
+    Returns:
+        tuple: (fichas geradas, NCMs com erro)
+    """
+    versao = versao_dados(last_updated_year, last_updated_month)
+    diretorio = os.path.join(DIR_FICHAS_HTML, versao)
+    plotly_js = f"../{garantir_plotly_js()}"
+    pendentes = [ncm for ncm in ncms if forcar or not os.path.exists(caminho_ficha(ncm, versao))]
+    # Todos os NCMs entram na fila antes de montar a primeira ficha
+    tarefas = [fila_analises.submeter(ncm, last_updated_month, last_updated_year) for ncm in pendentes]
+    geradas, com_erro, descricoes = 0, 0, {}
+    for i, (ncm, tarefa) in enumerate(zip(pendentes, tarefas)):
+        tarefa.aguardar()
+        resultado = tarefa.resultado
+        try:
+            if resultado is None or tarefa.com_erros:
+                # Ficha com erro de API não é gravada: ficaria "atual" até a próxima divulgação
+                raise RuntimeError(tarefa.erro or "consulta à API com erro")
+            gravar_atomico(caminho_ficha(ncm, versao),
+                            montar_ficha_html(ncm, resultado, dados_excel, last_updated_month, last_updated_year, plotly_js))
+            descricoes[ncm] = resultado["descricao"]
+            geradas += 1
+        except Exception as e:
+            com_erro += 1
+            logging.warning(f"Ficha estática do NCM {ncm} não gerada: {e}")
+        if progresso:
+            progresso(i + 1, len(pendentes))
+    if descricoes:
+        _gravar_indice(diretorio, descricoes, last_updated_month, last_updated_year)
+    logging.info(f"Fichas estáticas ({versao}): {geradas} geradas, {len(ncms) - len(pendentes)} já atuais, {com_erro} com erro.")
+    return geradas, com_erro
+
+
+def _ncms_ultima_pauta(dados_excel):
+    """NCMs da CGIM na pauta processada mais recentemente (histórico de pautas)."""
+    import modulos.historico_pautas as historico_pautas
+    historico = historico_pautas.carregar_historico()
+    if not historico:
+        raise SystemExit("Nenhuma pauta no histórico; informe os NCMs com --ncms.")
+    return historico_pautas.filtrar_cgim(historico[-1], set(dados_excel["NCMs-CGIM-DINTE"]["NCM"].dropna()))
+
+
+def main():
+    from modulos.api_comex import obter_data_ultima_atualizacao
+    from modulos.config import PLANILHA_CGIM_LOCAL
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ncms", nargs="+", help="NCMs de 8 dígitos (padrão: CGIM na última pauta do histórico)")
+    parser.add_argument("--planilha", default=PLANILHA_CGIM_LOCAL or "20241011_NCMs-CGIM-DINTE.xlsx",
+                        help="planilha CGIM (.xlsx)")
+    parser.add_argument("--forcar", action="store_true", help="regera as fichas já existentes nesta versão dos dados")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    _, ano, mes = obter_data_ultima_atualizacao()
+    if ano == "Erro" or mes == "Erro" or not ano or not mes:
+        raise SystemExit("Não foi possível obter a data de atualização da API Comex.")
+    with open(args.planilha, "rb") as arquivo:
+        dados_excel = proc.carregar_dados_excel(arquivo)
+    if not dados_excel:
+        raise SystemExit(f"Não foi possível ler a planilha CGIM em {args.planilha}.")
+    ncms = args.ncms or _ncms_ultima_pauta(dados_excel)
+    geradas, com_erro = gerar_fichas(ncms, int(mes), int(ano), dados_excel, forcar=args.forcar,
+                                     progresso=lambda feitos, total: print(f"\r{feitos}/{total}", end="", flush=True))
+    remover_versoes_antigas(versao_dados(int(ano), int(mes)))
+    print(f"\n{geradas} fichas geradas em {os.path.join(DIR_FICHAS_HTML, versao_dados(int(ano), int(mes)))}; {com_erro} com erro.")
+    if com_erro:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
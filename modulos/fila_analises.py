@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""
+Fila de análises de NCM executadas em segundo plano.
+
+A análise de um NCM (descrição, séries da API ComexStat, processamento,
+dados por país e preparo dos gráficos) roda num pool de threads, fora da
+execução do script do Streamlit. As tarefas ficam num armazenamento único do
+processo, identificadas por (NCM, versão dos dados): a sessão que pede um NCM
+já em andamento apenas acompanha a tarefa existente, e o resultado concluído
+(guardado no cache compartilhado, espaço 'analise') é reaproveitado por
+qualquer sessão. Sair da página não descarta o trabalho, que continua até o
+fim e fica disponível na próxima visita; se o resultado for descartado do
+cache por falta de memória, a análise é refeita no próximo pedido.
+"""
+import importlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from modulos.api_comex import (
+    obter_descricao_ncm,
+    obter_dados_comerciais,
+    obter_dados_comerciais_ano_anterior,
+    obter_dados_comerciais_ano_atual,
+    obter_dados_2024_por_pais,
+    obter_dados_2024_por_pais_export
+)
+import modulos.processamento as proc
+from modulos.cache_figuras import cache_figuras
+from modulos.cache_compartilhado import cache_compartilhado
+from modulos.config import FILA_WORKERS, FILA_TAREFAS_MAXIMAS, PERFIL_ATIVO, RASTRO_ATIVO
+from modulos.instrumentacao import medido, rastreando, trecho
+from modulos.perfilamento import perfilando
+
+# Por quanto tempo (s) uma análise com erro de API é reaproveitada antes de ser
+# refeita: evita repetir a chamada a cada execução do script com a API fora do ar.
+_VALIDADE_RESULTADO_COM_ERRO = 60
+
+# Gráficos de desempenho anuais: chave -> (título, módulo, função, recebe o ano de atualização).
+# Os módulos (e o Plotly) só são importados quando o primeiro gráfico é montado.
+GRAFICOS_DESEMPENHO = {
+    "import_kg": ("Importações (KG)", "modulos.grafico_importacoes_kg", "gerar_grafico_importacoes", True),
+    "import_fob": ("Importações (US$ FOB)", "modulos.grafico_importacoes_fob", "gerar_grafico_importacoes_fob", True),
+    "preco_medio": ("Preço Médio (US$ FOB/KG)", "modulos.grafico_preco_medio_fob", "gerar_grafico_preco_medio", False),
+    "export_kg": ("Exportações (KG)", "modulos.grafico_exportacoes_kg", "gerar_grafico_exportacoes", True),
+    "export_fob": ("Exportações (US$ FOB)", "modulos.grafico_exportacoes_fob", "gerar_grafico_exportacoes_fob", True),
+}
+
+
+def versao_dados(last_updated_year, last_updated_month):
+    """Versão da base ComexStat (ano-mês da última atualização)."""
+    return f"{last_updated_year}-{int(last_updated_month):02d}"
+
+
+@medido
+def obter_dados_tuple(ncm_code, tipo, last_updated_month):
+    """
+    Busca dados de exportação e importação da API Comex.
+    Retorna (dados_export, dados_import, erro_exp, erro_imp).
+    """
+    logging.info(f"Obtendo dados tipo '{tipo}' para NCM {ncm_code}, mês {last_updated_month}...")
+    dados_export, dados_import = [], []
+    erro_exp, erro_imp = None, None
+    try:
+        if tipo == "historico_anual":
+            dados_export, erro_exp = obter_dados_comerciais(ncm_code, "export")
+            dados_import, erro_imp = obter_dados_comerciais(ncm_code, "import")
+        elif tipo == "2024_parcial":
+            dados_export, erro_exp = obter_dados_comerciais_ano_anterior(ncm_code, "export", last_updated_month)
+            dados_import, erro_imp = obter_dados_comerciais_ano_anterior(ncm_code, "import", last_updated_month)
+        elif tipo == "2025_parcial":
+            dados_export, erro_exp = obter_dados_comerciais_ano_atual(ncm_code, "export", last_updated_month)
+            dados_import, erro_imp = obter_dados_comerciais_ano_atual(ncm_code, "import", last_updated_month)
+        else:
+            erro_msg = f"Tipo de dados '{tipo}' inválido solicitado."
+            erro_exp, erro_imp = erro_msg, erro_msg
+            logging.error(erro_msg)
+        log_msg = f"Busca tipo '{tipo}' para NCM {ncm_code}: "
+        log_msg += f"Exp: {len(dados_export) if isinstance(dados_export, list) else 'Erro/Inválido'} regs (Erro: {erro_exp}), "
+        log_msg += f"Imp: {len(dados_import) if isinstance(dados_import, list) else 'Erro/Inválido'} regs (Erro: {erro_imp})"
+        logging.info(log_msg)
+    except Exception as e:
+        logging.error(f"Erro inesperado em obter_dados_tuple para tipo '{tipo}', NCM {ncm_code}: {e}", exc_info=True)
+        erro_exp = erro_exp or f"Erro inesperado na busca: {e}"
+        erro_imp = erro_imp or f"Erro inesperado na busca: {e}"
+    dados_export = dados_export if isinstance(dados_export, list) else []
+    dados_import = dados_import if isinstance(dados_import, list) else []
+    return dados_export, dados_import, erro_exp, erro_imp
+
+
+@medido
+def _processar_series(resultado, last_updated_month):
+    """Processa as séries anual, 2024 parcial e 2025 parcial já buscadas em `resultado`."""
+    brutos = resultado.pop("_brutos")
+    series = {
+        "df_hist_anual": None, "df_2024_parcial": None, "df_2025_parcial": None,
+        "error_hist": None, "error_2024_parcial": None, "error_2025_parcial": None,
+        "erro_processamento": None,
+    }
+    dados_export_hist, dados_import_hist, err_exp_hist, err_imp_hist = brutos["historico_anual"]
+    dados_export_24p, dados_import_24p, err_exp_24p, err_imp_24p = brutos["2024_parcial"]
+    dados_export_25p, dados_import_25p, err_exp_25p, err_imp_25p = brutos["2025_parcial"]
+    try:
+        series["df_hist_anual"], error_hist_proc = proc.processar_dados_export_import(dados_export_hist, dados_import_hist, last_updated_month)
+        series["error_hist"] = error_hist_proc or err_exp_hist or err_imp_hist
+        series["df_2024_parcial"], error_2024_proc = proc.processar_dados_ano_anterior(dados_export_24p, dados_import_24p, last_updated_month)
+        series["error_2024_parcial"] = error_2024_proc or err_exp_24p or err_imp_24p
+        series["df_2025_parcial"], error_2025_proc = proc.processar_dados_ano_atual(dados_export_25p, dados_import_25p, last_updated_month)
+        series["error_2025_parcial"] = error_2025_proc or err_exp_25p or err_imp_25p
+    except AttributeError as e:
+         series["erro_processamento"] = f"Erro: Uma função de processamento não foi encontrada no módulo 'processamento': {e}."
+         logging.error(f"Erro de atributo no módulo 'proc' durante processamento API: {e}", exc_info=True)
+    except Exception as e:
+         series["erro_processamento"] = f"Erro inesperado durante o processamento dos dados da API: {e}"
+         logging.error(f"Erro inesperado no processamento dos dados da API: {e}", exc_info=True)
+    if series["erro_processamento"]:
+        for chave in ("error_hist", "error_2024_parcial", "error_2025_parcial"):
+            series[chave] = series[chave] or series["erro_processamento"]
+    resultado["series"] = series
+
+
+def gerar_grafico_desempenho(chave, series, ncm_formatado, last_updated_month, last_updated_year):
+    """Monta um dos gráficos de GRAFICOS_DESEMPENHO a partir das séries processadas."""
+    _, modulo, nome_funcao, recebe_ano = GRAFICOS_DESEMPENHO[chave]
+    args = [series["df_hist_anual"], series["df_2024_parcial"], ncm_formatado, last_updated_month]
+    if recebe_ano:
+        args.append(last_updated_year)
+    return getattr(importlib.import_module(modulo), nome_funcao)(*args)
+
+
+def gerar_treemap(resultado, ncm_code, ncm_formatado, tipo_flow):
+    """Treemap de 2024 por país ('import' ou 'export'); None sem dados."""
+    dados = resultado["dados_pais"].get(tipo_flow)
+    if not isinstance(dados, list) or not dados:
+        return None
+    df = pd.DataFrame(dados)
+    if not {"country", "metricFOB"} <= set(df.columns):
+        return None
+    df["metricFOB"] = pd.to_numeric(df["metricFOB"], errors="coerce").fillna(0)
+    if df["metricFOB"].sum() <= 0:
+        return None
+    if tipo_flow == "import":
+        from modulos.grafico_treemap_import import gerar_treemap_importacoes_2024 as gerar
+    else:
+        from modulos.grafico_treemap_export import gerar_treemap_exportacoes_2024 as gerar
+    return gerar(df, ncm_code, ncm_formatado)
+
+
+def _preparar_graficos(resultado, ncm_code, last_updated_month, last_updated_year):
+    """Monta os gráficos anuais, o de 12 meses e os treemaps por país no cache de figuras."""
+    from modulos.grafico_importacoes_12meses import gerar_grafico_importacoes_12meses
+    series = resultado["series"]
+    ncm_formatado = f"{ncm_code[:4]}.{ncm_code[4:6]}.{ncm_code[6:]}"
+    versao = versao_dados(last_updated_year, last_updated_month)
+    for tipo_flow in ("import", "export"):
+        try:
+            cache_figuras.obter_ou_gerar(f"treemap_{tipo_flow}", ncm_code, versao,
+                                         lambda: gerar_treemap(resultado, ncm_code, ncm_formatado, tipo_flow))
+        except Exception as e:
+            logging.warning(f"Falha ao preparar o treemap '{tipo_flow}' do NCM {ncm_code} em segundo plano: {e}")
+    df_hist_anual = series["df_hist_anual"]
+    if not isinstance(df_hist_anual, pd.DataFrame) or df_hist_anual.empty:
+        return
+    for chave in GRAFICOS_DESEMPENHO:
+        try:
+            cache_figuras.obter_ou_gerar(
+                chave, ncm_code, versao,
+                lambda: gerar_grafico_desempenho(chave, series, ncm_formatado, last_updated_month, last_updated_year)
+            )
+        except Exception as e:
+            # A página tenta de novo ao exibir e mostra o erro no lugar do gráfico
+            logging.warning(f"Falha ao preparar o gráfico '{chave}' do NCM {ncm_code} em segundo plano: {e}")
+    try:
+        cache_figuras.obter_ou_gerar(
+            "importacoes_12meses", ncm_code, versao,
+            # A versão dos dados (ano-mês da última atualização) é o último mês da série
+            lambda: gerar_grafico_importacoes_12meses(ncm_code, ncm_formatado, fim=versao)
+        )
+    except Exception as e:
+        logging.warning(f"Falha ao preparar o gráfico 'importacoes_12meses' do NCM {ncm_code} em segundo plano: {e}")
+
+
+def _etapas_analise(ncm_code, last_updated_month, last_updated_year, preparar_graficos=True):
+    """Etapas da análise de um NCM: (descrição para a barra de progresso, função(resultado))."""
+    def buscar(tipo):
+        def etapa(resultado):
+            resultado["_brutos"][tipo] = obter_dados_tuple(ncm_code, tipo, last_updated_month)
+        return etapa
+
+    def descricao(resultado):
+        resultado["descricao"] = obter_descricao_ncm(ncm_code)
+
+    def por_pais(tipo_flow, funcao):
+        def etapa(resultado):
+            resultado["dados_pais"][tipo_flow] = funcao(ncm_code)
+        return etapa
+
+    etapas = [
+        ("Buscando descrição do NCM", descricao),
+        ("Buscando série histórica anual", buscar("historico_anual")),
+        ("Buscando acumulado de 2024", buscar("2024_parcial")),
+        ("Buscando acumulado de 2025", buscar("2025_parcial")),
+        ("Processando séries", lambda resultado: _processar_series(resultado, last_updated_month)),
+        ("Buscando importações por país", por_pais("import", obter_dados_2024_por_pais)),
+        ("Buscando exportações por país", por_pais("export", obter_dados_2024_por_pais_export)),
+    ]
+    if preparar_graficos:
+        etapas.append(("Preparando gráficos",
+                       lambda resultado: _preparar_graficos(resultado, ncm_code, last_updated_month, last_updated_year)))
+    return etapas
+
+
+def tem_erros_api(resultado):
+    """True se alguma busca na API da análise retornou erro (séries ou descrição)."""
+    series = resultado["series"]
+    return bool(series["error_hist"] or series["error_2024_parcial"] or series["error_2025_parcial"]
+                or not resultado["descricao"] or "Erro" in resultado["descricao"])
+
+
+def analisar(ncm_code, last_updated_month, last_updated_year, preparar_graficos=False):
+    """
+    Executa a análise do NCM na thread atual, sem passar pela fila nem pelo
+    cache compartilhado (processamento em lote, ex.: modulos/cli.py).
+
+    Returns:
+        dict: O mesmo resultado de Tarefa.resultado
+              ({"descricao", "series", "dados_pais"}).
+    """
+    resultado = {"descricao": None, "_brutos": {}, "series": None, "dados_pais": {}}
+    for etapa, funcao in _etapas_analise(ncm_code, last_updated_month, last_updated_year, preparar_graficos):
+        with trecho(etapa):
+            funcao(resultado)
+    return resultado
+
+
+class Tarefa:
+    """Estado de uma análise de NCM na fila (lido pelas sessões, escrito pelo worker)."""
+
+    def __init__(self, ncm_code, last_updated_month, last_updated_year, preparar_graficos=True, perfilar=False):
+        self.ncm_code = ncm_code
+        self.last_updated_month = last_updated_month
+        self.last_updated_year = last_updated_year
+        self.preparar_graficos = preparar_graficos
+        self.perfilar = perfilar or PERFIL_ATIVO
+        self.status = "pendente"  # pendente | executando | concluida | falhou
+        self.etapa = "Aguardando na fila"
+        self.progresso = 0.0
+        self.erro = None
+        self._com_erros_api = False
+        self._resultado_local = None  # só usado se o resultado não couber no cache
+        self.criada_em = time.time()
+        self.concluida_em = None
+        self.rastro = None  # tempos de cada etapa da última execução
+        self.perfil = None  # Perfil da execução, se perfilada
+        self._fim = threading.Event()
+
+    @classmethod
+    def do_cache(cls, ncm_code, last_updated_month, last_updated_year, resultado):
+        """Tarefa já concluída para um resultado encontrado no cache (ex.: deixado pelo pré-aquecimento)."""
+        tarefa = cls(ncm_code, last_updated_month, last_updated_year)
+        tarefa._com_erros_api = tem_erros_api(resultado)
+        tarefa.status = "concluida"
+        tarefa.progresso = 1.0
+        tarefa.concluida_em = time.time()
+        tarefa._fim.set()
+        return tarefa
+
+    @property
+    def concluida(self):
+        return self._fim.is_set()
+
+    @property
+    def chave(self):
+        return (self.ncm_code, versao_dados(self.last_updated_year, self.last_updated_month))
+
+    @property
+    def resultado(self):
+        """Resultado da análise concluída (None se ainda em andamento, falhou ou foi descartado)."""
+        if self.status != "concluida":
+            return None
+        return self._resultado_local or cache_compartilhado.obter("analise", self.chave)
+
+    @property
+    def descartada(self):
+        """True se a tarefa concluiu mas o resultado já saiu do cache."""
+        return self.status == "concluida" and self.resultado is None
+
+    @property
+    def com_erros(self):
+        """True se a tarefa falhou ou se alguma busca na API retornou erro."""
+        return self.status == "falhou" or (self.status == "concluida" and self._com_erros_api)
+
+    def aguardar(self, timeout=None):
+        """Bloqueia até a tarefa terminar; retorna True se terminou."""
+        return self._fim.wait(timeout)
+
+    def executar(self):
+        self.status = "executando"
+        resultado = {"descricao": None, "_brutos": {}, "series": None, "dados_pais": {}}
+        etapas = _etapas_analise(self.ncm_code, self.last_updated_month, self.last_updated_year, self.preparar_graficos)
+        # O rastro da análise é sempre medido (custo desprezível) para a cascata de
+        # depuração da página; só vai para o arquivo JSONL com RASTRO_ATIVO
+        try:
+            with perfilando(f"analise NCM {self.ncm_code}", ativo=self.perfilar) as perfil, \
+                    rastreando(f"análise do NCM {self.ncm_code}", gravar=RASTRO_ATIVO) as rastro:
+                self.perfil = perfil
+                self.rastro = rastro
+                rastro.atributos["ncm"] = self.ncm_code
+                self._executar_etapas(etapas, resultado)
+        finally:
+            self.concluida_em = time.time()
+            self._fim.set()
+
+    def _executar_etapas(self, etapas, resultado):
+        try:
+            for i, (etapa, funcao) in enumerate(etapas):
+                self.etapa = etapa
+                with trecho(etapa):
+                    funcao(resultado)
+                self.progresso = (i + 1) / len(etapas)
+            self._com_erros_api = tem_erros_api(resultado)
+            # Resultado com erro de API fica só em memória: as demais réplicas tentam de novo
+            if not cache_compartilhado.gravar("analise", self.chave, resultado, persistir=not self._com_erros_api):
+                self._resultado_local = resultado
+            self.status = "concluida"
+            logging.info(f"Análise do NCM {self.ncm_code} concluída em {time.time() - self.criada_em:.1f}s.")
+        except Exception as e:
+            self.erro = str(e)
+            self.status = "falhou"
+            logging.error(f"Falha na análise do NCM {self.ncm_code} (etapa '{self.etapa}'): {e}", exc_info=True)
+
+
+class FilaAnalises:
+    """Pool de workers e armazenamento das tarefas, compartilhados por todas as sessões."""
+
+    def __init__(self, num_workers, tarefas_maximas):
+        self._executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="analise_ncm")
+        self._tarefas = OrderedDict()  # (ncm, versão dos dados) -> Tarefa
+        self._tarefas_maximas = tarefas_maximas
+        self._lock = threading.Lock()
+
+    def obter(self, ncm_code, last_updated_month, last_updated_year):
+        """Retorna a tarefa existente para o NCM nesta versão dos dados, ou None."""
+        with self._lock:
+            return self._tarefas.get((ncm_code, versao_dados(last_updated_year, last_updated_month)))
+
+    def submeter(self, ncm_code, last_updated_month, last_updated_year, preparar_graficos=True, perfilar=False):
+        """
+        Retorna a tarefa do NCM, criando-a se não existir ou se o resultado
+        tiver saído do cache; um resultado ainda no cache vira uma tarefa já
+        concluída, sem nova análise. Uma tarefa concluída com erro de API é refeita
+        depois de _VALIDADE_RESULTADO_COM_ERRO segundos. Com
+        preparar_graficos=False (exportações), a tarefa nova não monta as
+        figuras; a página as gera ao exibir, se preciso. Com perfilar=True, a
+        tarefa nova é perfilada (ver modulos/perfilamento.py).
+        """
+        chave = (ncm_code, versao_dados(last_updated_year, last_updated_month))
+        with self._lock:
+            tarefa = self._tarefas.get(chave)
+            expirada = tarefa is not None and (
+                tarefa.descartada
+                or (tarefa.com_erros and time.time() - tarefa.concluida_em > _VALIDADE_RESULTADO_COM_ERRO)
+            )
+            if tarefa is not None and not expirada:
+                self._tarefas.move_to_end(chave)
+                return tarefa
+            if tarefa is None:
+                # A tarefa pode ter saído do armazenamento com o resultado ainda no cache
+                resultado = cache_compartilhado.obter("analise", chave)
+                if resultado is not None:
+                    tarefa = Tarefa.do_cache(ncm_code, last_updated_month, last_updated_year, resultado)
+                    self._tarefas[chave] = tarefa
+                    self._descartar_antigas()
+                    return tarefa
+            tarefa = Tarefa(ncm_code, last_updated_month, last_updated_year, preparar_graficos, perfilar)
+            self._tarefas[chave] = tarefa
+            self._descartar_antigas()
+        logging.info(f"Análise do NCM {ncm_code} (dados {chave[1]}) enviada para a fila.")
+        self._executor.submit(tarefa.executar)
+        return tarefa
+
+    def resultado(self, ncm_code, last_updated_month, last_updated_year):
+        """Resultado da análise, aguardando a tarefa (e submetendo-a, se preciso)."""
+        tarefa = self.submeter(ncm_code, last_updated_month, last_updated_year)
+        tarefa.aguardar()
+        return tarefa.resultado
+
+    def _descartar_antigas(self):
+        # Só tarefas concluídas saem; as em andamento ainda têm quem as acompanhe
+        excedente = len(self._tarefas) - self._tarefas_maximas
+        for chave in [c for c, t in self._tarefas.items() if t.concluida][:max(excedente, 0)]:
+            del self._tarefas[chave]
+
+    def resumo(self):
+        """Quantidade de tarefas por status."""
+        with self._lock:
+            contagem = {}
+            for tarefa in self._tarefas.values():
+                contagem[tarefa.status] = contagem.get(tarefa.status, 0) + 1
+            return contagem
+
+
+# Instância única do processo, compartilhada por todas as sessões do Streamlit
+fila_analises = FilaAnalises(FILA_WORKERS, FILA_TAREFAS_MAXIMAS)
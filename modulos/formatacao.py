@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Formatação numérica no padrão brasileiro (pt_BR), por coluna inteira.
+
+As funções recebem uma Series, array ou lista e formatam todos os valores de
+uma vez com operações do NumPy (arredondamento, separação dos grupos de
+milhar e montagem das strings), em vez de chamar o babel célula a célula. O
+resultado é idêntico ao de `babel.numbers.format_decimal(valor, padrão,
+locale="pt_BR")`: ponto como separador de milhar, vírgula decimal,
+arredondamento "half-even" sobre a representação decimal do float e sinal
+preservado em valores negativos arredondados para zero ("-0"). Os poucos
+valores exatamente no meio entre dois arredondamentos, infinitos ou grandes
+demais para inteiros de 64 bits são formatados individualmente com Decimal.
+`benchmarks/bench_formatacao.py` confere a equivalência com o babel.
+"""
+import decimal
+
+import numpy as np
+import pandas as pd
+
+_MAIOR_EXATO = 2.0 ** 53
+
+
+def _agrupar_milhares(inteiros):
+    """Strings dos inteiros não negativos (int64) com '.' a cada três dígitos."""
+    texto = inteiros.astype(str)
+    num_grupos = (np.char.str_len(texto) - 1) // 3 + 1
+    resultado = (inteiros // np.power(1000, num_grupos - 1, dtype=np.int64)).astype(str)
+    for grupo in range(int(num_grupos.max(initial=1)) - 1, 0, -1):
+        trecho = np.char.zfill(((inteiros // 1000 ** (grupo - 1)) % 1000).astype(str), 3)
+        resultado = np.where(num_grupos > grupo, np.char.add(np.char.add(resultado, "."), trecho), resultado)
+    return resultado
+
+
+def _parte_decimal(fracoes, casas_min, casas_max):
+    """',ddd' com `casas_max` dígitos, sem os zeros à direita além de `casas_min`."""
+    resultado = np.full(fracoes.shape, "", dtype=f"<U{casas_max + 1}")
+    # Do maior para o menor número de casas: cada valor fica com a menor quantidade
+    # de casas (>= casas_min) que o representa sem perda
+    for casas in range(casas_max, casas_min - 1, -1):
+        divisor = 10 ** (casas_max - casas)
+        cabe = (fracoes % divisor) == 0
+        if casas == 0:
+            resultado = np.where(cabe, "", resultado)
+            continue
+        digitos = np.char.zfill((fracoes // divisor).astype(str), casas)
+        resultado = np.where(cabe, np.char.add(",", digitos), resultado)
+    return resultado
+
+
+def _formatar_exato(valor, casas_min, casas_max):
+    """Formatação de um único valor via Decimal (mesmo algoritmo do babel)."""
+    if np.isinf(valor):
+        return "-∞" if valor < 0 else "∞"
+    numero = decimal.Decimal(str(valor))
+    negativo = numero.is_signed()
+    arredondado = abs(numero).quantize(decimal.Decimal(1).scaleb(-casas_max), rounding=decimal.ROUND_HALF_EVEN)
+    inteiro, _, fracao = f"{arredondado:f}".partition(".")
+    fracao = fracao.rstrip("0").ljust(casas_min, "0")
+    texto = f"{int(inteiro):,}".replace(",", ".") + ("," + fracao if fracao else "")
+    return ("-" if negativo else "") + texto
+
+
+def formatar_decimal(valores, casas_min=0, casas_max=2):
+    """
+    Formata os valores com separador de milhar e entre `casas_min` e `casas_max`
+    casas decimais. Equivale a format_decimal(v, "#,##0.##", locale="pt_BR")
+    com os padrões (0, 2); (2, 2) corresponde a "#,##0.00" e (0, 0) a "#,##0".
+
+    Valores ausentes viram ""; valores não numéricos são devolvidos como str.
+
+    Returns:
+        pd.Series (mesmo índice) se `valores` for uma Series; senão, np.ndarray de str.
+    """
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores, dtype=object if isinstance(valores, list) else None)
+    numeros = pd.to_numeric(serie, errors="coerce")
+    ausentes = numeros.isna().to_numpy()
+    nao_numericos = ausentes & serie.notna().to_numpy()
+    resultado = np.full(len(serie), "", dtype=object)
+
+    inteiro = pd.api.types.is_integer_dtype(numeros) or pd.api.types.is_bool_dtype(numeros)
+    if inteiro and not ausentes.any():
+        inteiros = numeros.to_numpy(dtype=np.int64)
+        texto = _agrupar_milhares(np.abs(inteiros))
+        if casas_min:
+            texto = np.char.add(texto, "," + "0" * casas_min)
+        resultado[:] = np.where(inteiros < 0, np.char.add("-", texto), texto)
+    else:
+        x = numeros.to_numpy(dtype=float, na_value=np.nan)
+        validos = ~np.isnan(x)
+        escala = 10 ** casas_max
+        with np.errstate(invalid="ignore", over="ignore"):
+            escalado = np.abs(x) * escala
+            arredondado = np.rint(escalado)
+            # Valores quase no meio entre dois arredondamentos dependem da representação
+            # decimal exata (ex.: 2.675 -> 2,68): ficam para o caminho com Decimal
+            distancia_meio = np.abs(escalado - np.floor(escalado) - 0.5)
+            exato = validos & ((distancia_meio <= 1e-9 + escalado * 1e-13) | ~np.isfinite(x) | (escalado >= _MAIOR_EXATO))
+        rapido = validos & ~exato
+        if rapido.any():
+            unidades = arredondado[rapido].astype(np.int64)
+            texto = np.char.add(_agrupar_milhares(unidades // escala),
+                                _parte_decimal(unidades % escala, casas_min, casas_max))
+            resultado[rapido] = np.where(np.signbit(x[rapido]), np.char.add("-", texto), texto)
+        for i in np.flatnonzero(exato):
+            resultado[i] = _formatar_exato(x[i], casas_min, casas_max)
+
+    if nao_numericos.any():
+        resultado[nao_numericos] = serie[nao_numericos].astype(str).to_numpy()
+    if isinstance(valores, pd.Series):
+        return pd.Series(resultado, index=valores.index, name=valores.name, dtype=object)
+    return resultado
+
+
+def formatar_percentual(valores, casas=2):
+    """Valores já em pontos percentuais (12.5 -> "12,50%"); ausentes viram ""."""
+    texto = formatar_decimal(valores, casas, casas)
+    com_valor = texto != ""
+    if isinstance(texto, pd.Series):
+        return texto.where(~com_valor, texto + "%")
+    return np.where(com_valor, np.char.add(texto.astype(str), "%"), texto).astype(object)
+
+
+def formatar_numero(valor):
+    """Um único valor no padrão "#,##0.##" (atalho para formatar_decimal)."""
+    return formatar_decimal([valor])[0]
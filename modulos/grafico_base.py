@@ -1,7 +1,9 @@
-import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
 import numpy as np  # <--- IMPORTE O NUMPY!
-from babel.numbers import format_decimal
+
+from modulos.formatacao import formatar_decimal
+from modulos.tema_graficos import aplicar_tema, CORES
 
 def _calcular_ticks_eixo_y(max_valor):
     """
@@ -21,7 +23,7 @@ def _calcular_ticks_eixo_y(max_valor):
 
     espacamento_arredondado = max(espacamento_arredondado, 1)
     tickvals = list(range(0, int(max_valor) + int(espacamento_arredondado), int(espacamento_arredondado)))
-    ticktext = [format_decimal(val, locale='pt_BR') for val in tickvals]
+    ticktext = list(formatar_decimal(tickvals, casas_max=3))
 
     return tickvals, ticktext, espacamento_arredondado
 
@@ -30,7 +32,7 @@ def _gerar_grafico_base(df, df_2024_parcial, tipo_dado, ncm_formatado, last_upda
     Gera um gráfico de barras, agora com escala dinâmica do eixo Y.
     """
     if df.empty:
-        return px.bar()
+        return aplicar_tema(go.Figure())
 
     df_plot = df.copy()
     # Remover espaços em branco dos nomes das colunas (para evitar KeyErrors)
@@ -51,18 +53,18 @@ def _gerar_grafico_base(df, df_2024_parcial, tipo_dado, ncm_formatado, last_upda
         df_plot = pd.concat([df_plot, df_2024_parcial])
 
     # --- Configuração do gráfico ---
-    df_plot['Cor'] = df_plot['year'].apply(
-        lambda x: 'midnightblue' if x.startswith('2025') else
-        ('darkorange' if x.startswith('2024 (Até') else 'steelblue')
-    )
+    # Um único traço, com a cor de cada barra (ano fechado, ano corrente ou parcial)
+    anos = df_plot['year'].astype(str)
+    cores = np.where(anos.str.startswith('2025'), CORES['ano_atual'],
+                     np.where(anos.str.startswith('2024 (Até'), CORES['parcial'], CORES['ano']))
 
-    fig = px.bar(df_plot, x='year', y=coluna_valor,
-                 color='Cor',
-                 color_discrete_map={'steelblue': 'steelblue', 'midnightblue': 'midnightblue', 'darkorange': 'darkorange'},
-                 title=f'{tipo_dado} ({tipo_valor}) da NCM {ncm_formatado}, 2010-2025',
-                 labels={'year': 'Ano', coluna_valor: f'{tipo_dado} ({tipo_valor})'})
+    fig = go.Figure(go.Bar(
+        x=anos, y=df_plot[coluna_valor], marker_color=cores,
+        hovertemplate=f'Ano=%{{x}}<br>{coluna_valor}=%{{y}}<extra></extra>'
+    ))
 
     fig.update_layout(
+        title=f'{tipo_dado} ({tipo_valor}) da NCM {ncm_formatado}, 2010-2025',
         bargap=0.15,
         xaxis_title='Ano',
         yaxis_title=f'{tipo_dado} ({tipo_valor})',
@@ -86,7 +88,7 @@ def _gerar_grafico_base(df, df_2024_parcial, tipo_dado, ncm_formatado, last_upda
         dtick=dtick
     )
 
-    return fig
+    return aplicar_tema(fig)
 
 
 
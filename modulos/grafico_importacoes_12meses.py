@@ -1,13 +1,18 @@
 # modulos/grafico_importacoes_12meses.py (COMPLETO - VERSÃO PLOTLY COM NOME ORIGINAL)
 
+import datetime
 import requests
 import time
 import logging
 import pandas as pd
 import numpy as np
-import plotly.express as px # Importar Plotly Express em vez de Matplotlib
 import plotly.graph_objects as go # Necessário para type hinting e verificações
-import streamlit as st # Para exibir mensagens de aviso/info diretamente
+
+from modulos.api_comex import obter_data_ultima_atualizacao
+from modulos.cache_persistente import memorizado_por_divulgacao
+from modulos.config import API_COMEX_URL, GRAFICO_PONTOS_SVG
+from modulos.grafico_series_longas import figura_series_mensais
+from modulos.instrumentacao import medido
 
 # Configuração do logging (pode herdar do app principal, mas é bom garantir)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [GRAFICO_12M] - %(message)s')
@@ -18,28 +23,37 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 # --- Funções Auxiliares (com melhorias de robustez e logging) ---
 
-def _obter_dados_mensais_comex(ncm_code: str, flow: str, max_retries: int = 5, delay: int = 11) -> list:
+@medido
+@memorizado_por_divulgacao()
+def _obter_dados_mensais_comex(ncm_code: str, flow: str, max_retries: int = 5, delay: int = 11, inicio: str = "2019-01",
+                               fim: str | None = None) -> list:
     """
     Faz requisições à API do ComexStat para obter dados mensais (monthDetail = True)
-    de 2019-01 até 2025-12, retornando a lista de dicionários com os resultados.
+    de `inicio` até `fim`, retornando a lista de dicionários com os resultados.
 
     Args:
         ncm_code (str): Código NCM a ser consultado.
         flow (str): 'import' ou 'export'.
+        inicio (str): Primeiro mês da consulta ('AAAA-MM'; a base começa em 1997-01).
+        fim (str | None): Último mês da consulta ('AAAA-MM'). None usa o mês da
+            última atualização da base (ou dezembro do ano corrente, se ela não
+            puder ser obtida).
         max_retries (int): Número máximo de tentativas de requisição.
         delay (int): Tempo de espera em segundos entre tentativas em caso de erro 429.
 
     Returns:
         list: Lista de dicionários com os dados ou lista vazia em caso de erro/sem dados.
     """
-    url = "https://api-comexstat.mdic.gov.br/general"
+    if fim is None:
+        _, ano, mes = obter_data_ultima_atualizacao()
+        fim = f"{int(ano)}-{int(mes):02d}" if ano != "Erro" and mes != "Erro" else f"{datetime.date.today().year}-12"
+    url = f"{API_COMEX_URL}/general"
     body = {
         "flow": flow,
         "monthDetail": True,
         "period": {
-            "from": "2019-01",
-            # Busca um período amplo; o processamento focará nos últimos anos
-            "to": "2025-12"
+            "from": inicio,
+            "to": fim
         },
         "filters": [
             {"filter": "ncm", "values": [ncm_code]}
@@ -128,14 +142,19 @@ def _calcular_soma_movel(df: pd.DataFrame, column: str, window: int = 12) -> pd.
 
 # --- Função Principal (Nome Original, Corpo Atualizado para Plotly) ---
 
-def gerar_grafico_importacoes_12meses(ncm_code: str, ncm_str: str) -> go.Figure | None:
+@medido
+def gerar_grafico_importacoes_12meses(ncm_code: str, ncm_str: str, inicio: str = "2019-01",
+                                      fim: str | None = None) -> go.Figure | None:
     """
     Gera o gráfico de Importações Acumuladas nos Últimos 12 Meses (em KG) usando Plotly.
-    Busca dados mensais, calcula a soma móvel de 12 meses e plota um gráfico de barras.
+    Busca dados mensais, calcula a soma móvel de 12 meses e plota um gráfico de barras
+    (ou, em séries com mais de GRAFICO_PONTOS_SVG meses, uma linha WebGL reduzida).
 
     Args:
         ncm_code (str): Código NCM numérico (ex: "39269090").
         ncm_str (str): Representação formatada do NCM para o título (ex: "3926.90.90").
+        inicio (str): Primeiro mês buscado na API ('AAAA-MM'; padrão 2019-01).
+        fim (str | None): Último mês buscado ('AAAA-MM'; padrão: última atualização da base).
 
     Returns:
         plotly.graph_objects.Figure or None: Objeto Figure do Plotly se sucesso, None caso contrário.
@@ -143,12 +162,12 @@ def gerar_grafico_importacoes_12meses(ncm_code: str, ncm_str: str) -> go.Figure
     logging.info(f"Iniciando geração do gráfico de importações acumuladas 12m para NCM {ncm_code}")
 
     # 1. Obter dados mensais de importação
-    dados_import = _obter_dados_mensais_comex(ncm_code, 'import')
+    dados_import = _obter_dados_mensais_comex(ncm_code, 'import', inicio=inicio, fim=fim)
 
     # Retorna None cedo se não houver dados ou erro na API
     if not dados_import:
         logging.warning(f"Nenhum dado de importação retornado pela API para NCM {ncm_code}.")
-        # Não mostra st.warning aqui, deixa o app.py tratar o None retornado
+        # Sem mensagem na interface aqui: quem chama trata o None retornado
         return None
 
     try:
@@ -209,8 +228,9 @@ def gerar_grafico_importacoes_12meses(ncm_code: str, ncm_str: str) -> go.Figure
             return None
 
         all_months = pd.date_range(start=start_date, end=end_date, freq='MS') # 'MS' = Month Start frequency
-        # Reindexa usando o índice de data, preenchendo meses ausentes com 0
-        df_import = df_import.reindex(all_months, fill_value=0)
+        # Reindexa usando o índice de data, preenchendo meses ausentes com 0. Só a
+        # métrica é reindexada: colunas de texto da API (ex.: 'coNcm') não aceitam 0
+        df_import = df_import[['metricKG']].reindex(all_months, fill_value=0)
         logging.debug(f"DataFrame reindexado para todos os meses ({len(df_import)} linhas).")
 
 
@@ -231,22 +251,15 @@ def gerar_grafico_importacoes_12meses(ncm_code: str, ncm_str: str) -> go.Figure
         # Verifica se há dados para plotar após calcular e filtrar a soma móvel
         if df_plot.empty:
             logging.warning(f"Nenhum dado para plotar após cálculo da soma móvel de 12m (NCM {ncm_code}). Pode indicar período de dados < 12 meses.")
-            # Informa o usuário via Streamlit se nenhum dado de 12m está disponível
-            st.info(f"Não há dados suficientes (mínimo 12 meses consecutivos) para calcular a importação acumulada para o NCM {ncm_str}.")
             return None
         logging.debug(f"DataFrame final para plotagem ({len(df_plot)} barras).")
 
-        # 7. Plotar o gráfico com Plotly Express
-        fig = px.bar(
-            df_plot,
-            x='date',
-            y='soma_movel_12m',
-            title=f'Importações Acumuladas (12 Meses Móveis) em KG - NCM {ncm_str}',
-            labels={ # Rótulos mais descritivos
-                'date': 'Mês de Referência (Fim do Período de 12m)',
-                'soma_movel_12m': 'Quantidade Acumulada (KG)'
-            },
-            color_discrete_sequence=['steelblue'] # Cor similar ao Matplotlib original
+        # 7. Plotar o gráfico: barras, ou linha WebGL com pontos reduzidos no servidor
+        # quando a série passa de GRAFICO_PONTOS_SVG meses
+        fig = figura_series_mensais(
+            {ncm_str: (df_plot['date'].to_numpy(), df_plot['soma_movel_12m'].to_numpy())},
+            f'Importações Acumuladas (12 Meses Móveis) em KG - NCM {ncm_str}',
+            'Quantidade Acumulada (KG)', cor='steelblue', pontos_svg=GRAFICO_PONTOS_SVG
         )
 
         # 8. Ajustar Layout e Eixos (equivalente às formatações do matplotlib)
@@ -277,8 +290,6 @@ def gerar_grafico_importacoes_12meses(ncm_code: str, ncm_str: str) -> go.Figure
     # Captura exceções gerais durante o processamento do DataFrame ou Plotly
     except Exception as e:
         logging.error(f"Erro inesperado ao gerar gráfico de importações acumuladas 12m para NCM {ncm_code}: {e}", exc_info=True)
-        # Informa o usuário sobre o erro via Streamlit
-        st.error(f"Ocorreu um erro inesperado ao gerar o gráfico de importações acumuladas para {ncm_str}. Verifique os logs para detalhes.")
         return None
 
 
@@ -2,6 +2,9 @@ import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 
+from modulos.instrumentacao import medido
+from modulos.tema_graficos import aplicar_tema
+
 def _calcular_ticks_eixo_y(max_value):
     """Calcula intervalos seguros para diferentes faixas de valores do eixo Y."""
     if max_value == 0:
@@ -10,6 +13,7 @@ def _calcular_ticks_eixo_y(max_value):
     ticks = [i * step for i in range(6)]
     return ticks, [f"{tick:.4f}" for tick in ticks]
 
+@medido
 def gerar_grafico_preco_medio(df_2025, df_2024_parcial, ncm_formatado, last_updated_month):
     """
     Gera o gráfico de Preço Médio (US$ FOB/KG) para os anos de 2025 e dados parciais de 2024.
@@ -87,7 +91,7 @@ def gerar_grafico_preco_medio(df_2025, df_2024_parcial, ncm_formatado, last_upda
             legend=dict(orientation="h", y=1.1),
             height=500
         )
-        return fig
+        return aplicar_tema(fig)
 
     except Exception as e:
         print(f"Erro na geração do gráfico: {str(e)}")
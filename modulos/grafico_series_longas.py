@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Gráficos de séries mensais longas com tamanho limitado.
+
+Séries curtas continuam como barras (SVG). Quando o total de pontos passa de
+GRAFICO_PONTOS_SVG, as séries viram traços WebGL (Scattergl), que o navegador
+desenha sem criar um elemento por ponto; e cada série com mais pontos que a
+sua parte de GRAFICO_PONTOS_MAXIMOS é reduzida no servidor pelo algoritmo
+LTTB (Largest-Triangle-Three-Buckets), mantendo ainda o máximo e o mínimo de
+cada série. Assim o JSON da figura e o tempo de desenho ficam limitados,
+qualquer que seja o período (ex.: 1997 até hoje) ou o número de NCMs
+sobrepostos. Na página do NCM, a opção "série completa" do gráfico de 12
+meses (desde 1997, ~340 meses) passa dos dois limites padrão.
+"""
+import logging
+
+import numpy as np
+
+from modulos.config import GRAFICO_PONTOS_SVG, GRAFICO_PONTOS_MAXIMOS
+from modulos.instrumentacao import medido
+from modulos.tema_graficos import aplicar_tema
+
+
+def lttb_indices(x, y, n_saida):
+    """
+    Índices dos pontos escolhidos pelo LTTB, mais os de máximo e mínimo de `y`.
+    Pontos com `y` ausente (NaN) são descartados antes da redução.
+
+    Args:
+        x, y (array-like): Coordenadas (x crescente; datas são aceitas).
+        n_saida (int): Número aproximado de pontos desejado (mínimo 3).
+
+    Returns:
+        np.ndarray: Índices em ordem crescente (todos os válidos, se a série já for curta).
+    """
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").astype(np.int64)
+    x = x.astype(float)
+    y = np.asarray(y, dtype=float)
+    validos = ~np.isnan(y)
+    if not validos.all():
+        # Um NaN nas áreas dos triângulos seria escolhido pelo argmax
+        indices_validos = np.flatnonzero(validos)
+        return indices_validos[lttb_indices(x[indices_validos], y[indices_validos], n_saida)]
+    n = len(y)
+    if n == 0:
+        return np.arange(0)
+    if n_saida >= n or n_saida < 3:
+        return np.arange(n)
+    # Primeiro e último pontos fixos; os demais divididos em n_saida - 2 baldes
+    limites = np.linspace(1, n - 1, n_saida - 1).astype(int)
+    escolhidos = np.empty(n_saida, dtype=int)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    anterior = 0
+    for b in range(n_saida - 2):
+        inicio, fim = limites[b], limites[b + 1]
+        # Vértice seguinte do triângulo: média do próximo balde (ou o último ponto)
+        prox_inicio, prox_fim = fim, limites[b + 2] if b + 2 < len(limites) else n
+        media_x = x[prox_inicio:prox_fim].mean() if prox_fim > prox_inicio else x[-1]
+        media_y = y[prox_inicio:prox_fim].mean() if prox_fim > prox_inicio else y[-1]
+        areas = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(np.argmax(areas))
+        escolhidos[b + 1] = anterior
+    return np.union1d(escolhidos, [int(np.argmax(y)), int(np.argmin(y))])
+
+
+def reduzir_serie(datas, valores, n_saida):
+    """(datas, valores) reduzidos a cerca de `n_saida` pontos pelo LTTB."""
+    datas, valores = np.asarray(datas), np.asarray(valores, dtype=float)
+    indices = lttb_indices(datas, valores, n_saida)
+    return datas[indices], valores[indices]
+
+
+@medido
+def figura_series_mensais(series, titulo, titulo_eixo_y, cor="steelblue", pontos_svg=None, pontos_maximos=None):
+    """
+    Monta a figura de uma ou mais séries mensais, em barras ou em WebGL conforme o tamanho.
+
+    Args:
+        series (dict): {nome: (datas, valores)}; com mais de uma série, cada uma
+            vira um traço com legenda (ex.: NCMs sobrepostos).
+        titulo (str), titulo_eixo_y (str): Textos do gráfico.
+        cor (str): Cor usada quando há uma única série.
+        pontos_svg (int | None), pontos_maximos (int | None): Limites (padrão: configuração).
+
+    Returns:
+        go.Figure
+    """
+    import plotly.graph_objects as go
+
+    pontos_svg = GRAFICO_PONTOS_SVG if pontos_svg is None else pontos_svg
+    pontos_maximos = GRAFICO_PONTOS_MAXIMOS if pontos_maximos is None else pontos_maximos
+    total = sum(len(valores) for _, valores in series.values())
+    webgl = total > pontos_svg
+    uma_serie = len(series) == 1
+    fig = go.Figure()
+    for nome, (datas, valores) in series.items():
+        if webgl:
+            limite = max(pontos_maximos // len(series), 3)
+            if len(valores) > limite:
+                datas, valores = reduzir_serie(datas, valores, limite)
+            fig.add_trace(go.Scattergl(
+                x=datas, y=valores, name=nome, mode="lines",
+                line=dict(color=cor, width=1.5) if uma_serie else dict(width=1.5),
+                fill="tozeroy" if uma_serie else None,
+            ))
+        else:
+            fig.add_trace(go.Bar(x=datas, y=valores, name=nome, marker_color=cor if uma_serie else None))
+    if webgl:
+        logging.info(f"Gráfico '{titulo}': {total} pontos em WebGL, "
+                     f"{sum(len(t.x) for t in fig.data)} enviados ao navegador.")
+    fig.update_layout(
+        title=titulo, title_x=0.5, xaxis_title=None, yaxis_title=titulo_eixo_y,
+        showlegend=not uma_serie, hovermode="x unified", bargap=0.2,
+        margin=dict(l=60, r=30, t=50, b=100),
+    )
+    return aplicar_tema(fig)
@@ -1,6 +1,10 @@
-import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
 
+from modulos.instrumentacao import medido
+from modulos.tema_graficos import aplicar_tema
+
+@medido
 def gerar_treemap_exportacoes_2024(df_export_2024_country, ncm_code, ncm_str):
     """
     Gera o Treemap de Exportações 2024 (US$ FOB), retornando um objeto Figure.
@@ -25,13 +29,14 @@ def gerar_treemap_exportacoes_2024(df_export_2024_country, ncm_code, ncm_str):
     df_agg['Representatividade (%)'] = (df_agg['metricFOB'] / total_export_fob) * 100
 
     # 4. Gerar o treemap
-    fig_export = px.treemap(
-        df_agg,
-        path=['country'],
-        values='metricFOB',
-        custom_data=['Representatividade (%)'],
-        title=f'Destino das Exportações 2024 (US$ FOB) - {ncm_str}'
-    )
+    fig_export = go.Figure(go.Treemap(
+        labels=df_agg['country'],
+        parents=[''] * len(df_agg),
+        values=df_agg['metricFOB'],
+        customdata=df_agg[['Representatividade (%)']].to_numpy(),
+        branchvalues='total'
+    ))
+    fig_export.update_layout(title=f'Destino das Exportações 2024 (US$ FOB) - {ncm_str}')
     
     # 5. Ajustar dimensões (exemplo: 700×600 para forma mais quadrada)
     fig_export.update_layout(
@@ -53,5 +58,5 @@ def gerar_treemap_exportacoes_2024(df_export_2024_country, ncm_code, ncm_str):
         )
     )
     
-    return fig_export
+    return aplicar_tema(fig_export)
 
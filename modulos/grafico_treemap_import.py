@@ -1,6 +1,10 @@
-import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
 
+from modulos.instrumentacao import medido
+from modulos.tema_graficos import aplicar_tema
+
+@medido
 def gerar_treemap_importacoes_2024(df_import_2024_country, ncm_code, ncm_str):
     """
     Gera o Treemap de Importações 2024 (US$ FOB), retornando um objeto Figure.
@@ -24,13 +28,14 @@ def gerar_treemap_importacoes_2024(df_import_2024_country, ncm_code, ncm_str):
     df_agg['Representatividade (%)'] = (df_agg['metricFOB'] / total_import_fob) * 100
 
     # Gerar treemap
-    fig_import = px.treemap(
-        df_agg, 
-        path=['country'], 
-        values='metricFOB',
-        custom_data=['Representatividade (%)'],
-        title=f'Origem das Importações 2024 (US$ FOB) - {ncm_str}'
-    )
+    fig_import = go.Figure(go.Treemap(
+        labels=df_agg['country'],
+        parents=[''] * len(df_agg),
+        values=df_agg['metricFOB'],
+        customdata=df_agg[['Representatividade (%)']].to_numpy(),
+        branchvalues='total'
+    ))
+    fig_import.update_layout(title=f'Origem das Importações 2024 (US$ FOB) - {ncm_str}')
     
     # Ajustar dimensões (exemplo de forma quadrada)
     fig_import.update_layout(
@@ -57,7 +62,7 @@ def gerar_treemap_importacoes_2024(df_import_2024_country, ncm_code, ncm_str):
         )
     )
     
-    return fig_import
+    return aplicar_tema(fig_import)
 
 
 
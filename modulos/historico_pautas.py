@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Histórico de pautas processadas e comparação entre pautas.
+
+Cada pauta processada vira um registro em disco (um arquivo JSON por pauta,
+identificado pelo SHA-256 do PDF) com todos os NCMs de 8 dígitos encontrados.
+A interseção com a planilha CGIM é feita na hora da consulta, então uma
+atualização da planilha vale também para pautas antigas, que nunca precisam
+ser relidas. Várias pautas enviadas juntas são extraídas em paralelo, uma por
+processo.
+"""
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from modulos.arquivos import gravar_atomico
+from modulos.config import DIR_CACHE
+import modulos.cache_pdf as cache_pdf
+from modulos.extracao_pdf import numero_processos
+from modulos.processamento import formatar_ncm_8digitos
+
+
+def _dir_historico():
+    return os.path.join(DIR_CACHE, "historico_pautas")
+
+
+def ncms_8digitos(ncms_pontuados):
+    """Converte NCMs no formato xxxx.xx.xx para um conjunto de códigos de 8 dígitos."""
+    return {ncm for ncm in map(formatar_ncm_8digitos, ncms_pontuados) if ncm}
+
+
+def registrar_pauta(sha256, nome, ncms_pontuados):
+    """
+    Registra (ou atualiza o nome de) uma pauta no histórico.
+
+    Returns:
+        dict: {"sha256", "nome", "data_processamento", "ncms": [8 dígitos]}
+    """
+    caminho = os.path.join(_dir_historico(), f"{sha256}.json")
+    anterior = _ler_registro(caminho)
+    registro = {
+        "sha256": sha256,
+        "nome": nome,
+        "data_processamento": anterior["data_processamento"] if anterior else datetime.datetime.now().isoformat(timespec="seconds"),
+        "ncms": sorted(ncms_8digitos(ncms_pontuados)),
+    }
+    try:
+        gravar_atomico(caminho, json.dumps(registro, ensure_ascii=False))
+    except OSError as e:
+        logging.warning(f"Não foi possível gravar a pauta '{nome}' no histórico: {e}")
+    return registro
+
+
+def _ler_registro(caminho):
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Registro de histórico ilegível '{caminho}', ignorando: {e}")
+        return None
+
+
+def carregar_historico():
+    """Lista as pautas do histórico, da mais antiga para a mais recente."""
+    if not os.path.isdir(_dir_historico()):
+        return []
+    registros = [_ler_registro(os.path.join(_dir_historico(), nome))
+                 for nome in os.listdir(_dir_historico()) if nome.endswith(".json")]
+    return sorted((r for r in registros if r), key=lambda r: (r["data_processamento"], r["nome"]))
+
+
+def filtrar_cgim(registro, ncms_cgim):
+    """NCMs da pauta presentes na planilha CGIM, em ordem crescente."""
+    return sorted(set(registro["ncms"]) & ncms_cgim)
+
+
+def comparar_pautas(anterior, atual, ncms_cgim=None):
+    """
+    Compara duas pautas do histórico.
+
+    Args:
+        anterior (dict), atual (dict): Registros do histórico.
+        ncms_cgim (set | None): Se informado, restringe a comparação aos NCMs da CGIM.
+
+    Returns:
+        dict: {"novas": [...], "repetidas": [...], "retiradas": [...]}, listas ordenadas.
+    """
+    a, b = set(anterior["ncms"]), set(atual["ncms"])
+    if ncms_cgim is not None:
+        a, b = a & ncms_cgim, b & ncms_cgim
+    return {"novas": sorted(b - a), "repetidas": sorted(a & b), "retiradas": sorted(a - b)}
+
+
+def _extrair_arquivo(pdf_bytes):
+    # Cada processo lê uma pauta inteira de forma sequencial (o paralelismo é entre pautas)
+    return cache_pdf.extrair_com_cache(pdf_bytes, processos=1)
+
+
+def processar_pautas(arquivos, processos=None):
+    """
+    Extrai várias pautas em paralelo (reaproveitando o cache em disco) e as
+    registra no histórico. Cada pauta é lida à parte: um PDF ilegível não
+    impede o registro das demais. Arquivos idênticos (mesmo SHA-256) são lidos
+    e registrados uma única vez, com o nome do primeiro.
+
+    Args:
+        arquivos (list): [(nome_arquivo, pdf_bytes)].
+
+    Returns:
+        tuple: (registros do histórico, na ordem de `arquivos`;
+                {nome_arquivo: mensagem de erro} das pautas que não puderam ser lidas)
+    """
+    unicos = {}  # sha256 -> (nome, pdf_bytes), na ordem de chegada
+    for nome, pdf_bytes in arquivos:
+        unicos.setdefault(cache_pdf.sha256_pdf(pdf_bytes), (nome, pdf_bytes))
+    extracoes = {sha: cache_pdf.obter(sha) for sha in unicos}
+    pendentes = [sha for sha, extracao in extracoes.items() if extracao is None]
+    logging.info(f"{len(arquivos)} pauta(s) recebida(s), {len(unicos)} distinta(s); {len(pendentes)} precisam ser lidas.")
+
+    erros = {}
+    processos = min(numero_processos(processos), len(pendentes))
+    if processos > 1:
+        with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futuros = {sha: pool.submit(_extrair_arquivo, unicos[sha][1]) for sha in pendentes}
+            for sha, futuro in futuros.items():
+                try:
+                    extracoes[sha] = futuro.result()
+                except Exception as e:
+                    erros[sha] = e
+    else:
+        for sha in pendentes:
+            try:
+                extracoes[sha] = _extrair_arquivo(unicos[sha][1])
+            except Exception as e:
+                erros[sha] = e
+
+    falhas = {}
+    for sha, e in erros.items():
+        nome = unicos[sha][0]
+        logging.warning(f"Não foi possível ler a pauta '{nome}': {e}", exc_info=e)
+        falhas[nome] = str(e) or type(e).__name__
+    registros = [registrar_pauta(sha, nome, extracoes[sha]["ncms"])
+                 for sha, (nome, _) in unicos.items() if sha not in erros]
+    return registros, falhas
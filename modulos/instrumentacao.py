@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Medição leve do tempo gasto em cada trecho de uma execução.
+
+Um "rastro" reúne os trechos medidos durante uma execução do script do
+Streamlit (ou durante a análise de um NCM na fila): nome, início relativo,
+duração e profundidade (trechos aninhados). As funções dos caminhos quentes
+(busca na API, processamento, gráficos, exibição) são decoradas com
+@medido; fora de um rastro ativo o decorador só consulta uma ContextVar e
+chama a função, então o custo com a medição desligada é desprezível.
+
+Os rastros concluídos são acrescentados, um por linha, ao arquivo JSONL
+ARQUIVO_RASTRO, para análise posterior (ex.: pandas.read_json(..., lines=True)).
+"""
+import contextlib
+import contextvars
+import datetime
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+from modulos.config import ARQUIVO_RASTRO, RASTRO_ARQUIVO_MB
+
+_rastro_atual = contextvars.ContextVar("rastro_atual", default=None)
+_lock_arquivo = threading.Lock()
+
+
+class Rastro:
+    """Trechos medidos numa execução, com tempos relativos ao seu início (ms)."""
+
+    def __init__(self, rotulo):
+        self.rotulo = rotulo
+        self.iniciado_em = datetime.datetime.now().isoformat(timespec="milliseconds")
+        self.atributos = {}
+        self.trechos = []
+        self.duracao_ms = None
+        self._t0 = time.perf_counter()
+        self._profundidade = 0
+
+    def agora_ms(self):
+        return (time.perf_counter() - self._t0) * 1000
+
+    def como_dict(self):
+        return {
+            "rotulo": self.rotulo, "iniciado_em": self.iniciado_em, "duracao_ms": self.duracao_ms,
+            "thread": threading.current_thread().name, "atributos": self.atributos, "trechos": self.trechos,
+        }
+
+
+def rastro_atual():
+    """Rastro ativo neste contexto (thread), ou None."""
+    return _rastro_atual.get()
+
+
+@contextlib.contextmanager
+def trecho(nome):
+    """Mede o bloco como um trecho do rastro ativo (sem rastro, não faz nada)."""
+    rastro = _rastro_atual.get()
+    if rastro is None:
+        yield
+        return
+    registro = {"nome": nome, "inicio_ms": round(rastro.agora_ms(), 3), "duracao_ms": None,
+                "profundidade": rastro._profundidade}
+    rastro.trechos.append(registro)
+    rastro._profundidade += 1
+    try:
+        yield
+    except BaseException as e:
+        registro["erro"] = type(e).__name__
+        raise
+    finally:
+        rastro._profundidade -= 1
+        registro["duracao_ms"] = round(rastro.agora_ms() - registro["inicio_ms"], 3)
+
+
+def medido(funcao=None, *, nome=None):
+    """
+    Decorador que mede cada chamada da função como um trecho.
+
+    O nome padrão é "<módulo>.<função>" (ex.: "api_comex.obter_dados_comerciais").
+    Pode ser usado como @medido ou @medido(nome="...").
+    """
+    def decorar(funcao):
+        modulo = funcao.__module__.rsplit(".", 1)[-1]
+        rotulo = nome or f"{'app' if modulo == '__main__' else modulo}.{funcao.__name__}"
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            if _rastro_atual.get() is None:
+                return funcao(*args, **kwargs)
+            with trecho(rotulo):
+                return funcao(*args, **kwargs)
+        return medida
+    return decorar(funcao) if funcao is not None else decorar
+
+
+def _gravar(rastro):
+    """Acrescenta o rastro ao arquivo JSONL (o anterior vira .1 ao passar do tamanho máximo)."""
+    if not ARQUIVO_RASTRO:
+        return
+    linha = json.dumps(rastro.como_dict(), ensure_ascii=False, default=str) + "\n"
+    try:
+        with _lock_arquivo:
+            os.makedirs(os.path.dirname(os.path.abspath(ARQUIVO_RASTRO)), exist_ok=True)
+            if os.path.exists(ARQUIVO_RASTRO) and os.path.getsize(ARQUIVO_RASTRO) > RASTRO_ARQUIVO_MB * 1024 * 1024:
+                os.replace(ARQUIVO_RASTRO, ARQUIVO_RASTRO + ".1")
+            with open(ARQUIVO_RASTRO, "a", encoding="utf-8") as arquivo:
+                arquivo.write(linha)
+    except OSError as e:
+        logging.warning(f"Não foi possível gravar o rastro em {ARQUIVO_RASTRO}: {e}")
+
+
+@contextlib.contextmanager
+def rastreando(rotulo, ativo=True, gravar=True):
+    """
+    Ativa um rastro durante o bloco e, ao final, o grava no arquivo JSONL.
+
+    Yields:
+        Rastro | None: O rastro (None se `ativo` for falso).
+    """
+    if not ativo:
+        yield None
+        return
+    rastro = Rastro(rotulo)
+    token = _rastro_atual.set(rastro)
+    try:
+        yield rastro
+    finally:
+        rastro.duracao_ms = round(rastro.agora_ms(), 3)
+        _rastro_atual.reset(token)
+        if gravar:
+            _gravar(rastro)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Perfilamento sob demanda de uma execução, sem alterar o código medido.
+
+Ativado por FICHA_NCM_PERFIL=1 (toda execução do script e toda análise da
+fila) ou, para uma única sessão, abrindo o app com ?perfil=1. Cada execução
+perfilada gera um arquivo em DIR_PERFIS:
+
+- com o pyinstrument (requirements.txt; amostragem, baixo custo), um .speedscope.json,
+  que abre como flame graph em https://www.speedscope.app;
+- sem ele, um .prof do cProfile (determinístico, mais caro), para
+  `python -m pstats` ou visualizadores como o snakeviz.
+
+O tracemalloc acompanha as alocações durante o trecho: o pico de memória e as
+linhas com mais memória alocada ao final vão para o log. O tracemalloc vale
+para o processo inteiro; com várias execuções perfiladas ao mesmo tempo, o pico
+de uma inclui as alocações das outras. O pyinstrument e o cProfile só medem a
+thread que abriu o perfil (o script da sessão ou o worker da fila).
+"""
+import contextlib
+import datetime
+import logging
+import os
+import re
+import threading
+import time
+import tracemalloc
+
+from modulos.config import DIR_PERFIS, PERFIL_INTERVALO_MS, PERFIL_TRACEMALLOC, PERFIS_MAXIMOS
+
+_lock = threading.Lock()
+_usuarios_tracemalloc = 0  # perfis abertos que dependem do tracemalloc iniciado aqui
+_tracemalloc_externo = False  # já estava ativo (ex.: PYTHONTRACEMALLOC) antes do primeiro perfil
+
+
+class Perfil:
+    """Resultado de uma execução perfilada (preenchido ao fim do trecho)."""
+
+    def __init__(self, rotulo):
+        self.rotulo = rotulo
+        self.ferramenta = None  # 'pyinstrument' | 'cProfile'
+        self.caminho = None
+        self.duracao_s = None
+        self.pico_memoria_bytes = None
+        self.maiores_alocacoes = []  # [(arquivo:linha, bytes)]
+
+
+def _novo_amostrador():
+    """(ferramenta, iniciar, parar, gravar(caminho_base) -> caminho)."""
+    try:
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import SpeedscopeRenderer
+    except ImportError:
+        import cProfile
+        perfil = cProfile.Profile()
+
+        def gravar(base):
+            perfil.dump_stats(base + ".prof")
+            return base + ".prof"
+        return "cProfile", perfil.enable, perfil.disable, gravar
+
+    perfil = Profiler(interval=PERFIL_INTERVALO_MS / 1000)
+
+    def gravar(base):
+        with open(base + ".speedscope.json", "w", encoding="utf-8") as arquivo:
+            arquivo.write(perfil.output(renderer=SpeedscopeRenderer()))
+        return base + ".speedscope.json"
+    return "pyinstrument", perfil.start, perfil.stop, gravar
+
+
+def _iniciar_tracemalloc():
+    global _usuarios_tracemalloc, _tracemalloc_externo
+    with _lock:
+        if _usuarios_tracemalloc == 0:
+            _tracemalloc_externo = tracemalloc.is_tracing()
+            if not _tracemalloc_externo:
+                tracemalloc.start(10)
+            tracemalloc.reset_peak()
+        _usuarios_tracemalloc += 1
+
+
+def _parar_tracemalloc(perfil, memoria_inicio):
+    """Registra o pico e as maiores alocações; desliga o tracemalloc com o último perfil."""
+    global _usuarios_tracemalloc
+    with _lock:
+        _, pico = tracemalloc.get_traced_memory()
+        perfil.pico_memoria_bytes = max(pico - memoria_inicio, 0)
+        foto = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        perfil.maiores_alocacoes = [(f"{e.traceback[0].filename}:{e.traceback[0].lineno}", e.size)
+                                    for e in foto.statistics("lineno")[:10]]
+        _usuarios_tracemalloc -= 1
+        if _usuarios_tracemalloc == 0 and not _tracemalloc_externo:
+            tracemalloc.stop()
+
+
+def _caminho_base(rotulo):
+    nome = re.sub(r"[^0-9A-Za-z]+", "-", rotulo).strip("-").lower() or "perfil"
+    carimbo = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    return os.path.join(DIR_PERFIS, f"{carimbo}_{nome}")
+
+
+def _remover_antigos():
+    """Mantém só os PERFIS_MAXIMOS arquivos mais recentes."""
+    try:
+        arquivos = sorted((os.path.join(DIR_PERFIS, n) for n in os.listdir(DIR_PERFIS)), key=os.path.getmtime)
+        for caminho in arquivos[:max(len(arquivos) - PERFIS_MAXIMOS, 0)]:
+            os.remove(caminho)
+    except OSError as e:
+        logging.warning(f"Não foi possível remover perfis antigos de {DIR_PERFIS}: {e}")
+
+
+@contextlib.contextmanager
+def perfilando(rotulo, ativo=True):
+    """
+    Perfila o bloco e grava o resultado em DIR_PERFIS.
+
+    Se outro perfilador já estiver ativo, o bloco roda sem amostragem (sem
+    arquivo; ferramenta None), só com a duração e o tracemalloc.
+
+    Yields:
+        Perfil | None: Preenchido ao final do bloco (None se `ativo` for falso).
+    """
+    if not ativo:
+        yield None
+        return
+    perfil = Perfil(rotulo)
+    if PERFIL_TRACEMALLOC:
+        _iniciar_tracemalloc()
+        memoria_inicio = tracemalloc.get_traced_memory()[0]
+    ferramenta, iniciar, parar, gravar = _novo_amostrador()
+    inicio = time.perf_counter()
+    try:
+        try:
+            iniciar()
+            perfil.ferramenta = ferramenta
+        except (ValueError, RuntimeError) as e:
+            # Outro perfilador já ativo (ex.: cProfile no Python >= 3.12, ou um
+            # perfil aninhado na mesma thread): segue sem amostragem.
+            logging.warning(f"Perfil de '{rotulo}' sem {ferramenta}: {e}")
+        yield perfil
+    finally:
+        if perfil.ferramenta:
+            parar()
+        perfil.duracao_s = time.perf_counter() - inicio
+        if PERFIL_TRACEMALLOC:
+            _parar_tracemalloc(perfil, memoria_inicio)
+        if perfil.ferramenta:
+            try:
+                os.makedirs(DIR_PERFIS, exist_ok=True)
+                perfil.caminho = gravar(_caminho_base(rotulo))
+                _remover_antigos()
+            except OSError as e:
+                logging.warning(f"Não foi possível gravar o perfil de '{rotulo}' em {DIR_PERFIS}: {e}")
+        mensagem = f"Perfil de '{rotulo}' ({perfil.ferramenta or 'sem amostragem'}, {perfil.duracao_s:.2f}s): {perfil.caminho}"
+        if perfil.pico_memoria_bytes is not None:
+            alocacoes = "; ".join(f"{local} {tamanho / 1024:.0f} KB" for local, tamanho in perfil.maiores_alocacoes[:5])
+            mensagem += f". Pico de memória: {perfil.pico_memoria_bytes / 1024 / 1024:.1f} MB. Maiores alocações: {alocacoes}"
+        logging.info(mensagem)
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Monitoramento de uma cópia local da planilha CGIM, com recarga incremental.
+
+O monitor verifica periodicamente o arquivo (data de modificação e tamanho).
+Quando ele muda, calcula um hash do conteúdo de cada aba diretamente do pacote
+.xlsx (sem interpretar o Excel) e relê apenas as abas cujo hash mudou.
+Os índices NCM -> linhas são reconstruídos só para essas abas e a estrutura
+final é publicada com uma única atribuição, de modo que as sessões sempre veem
+uma versão completa da planilha e nunca pagam o custo da leitura.
+
+Com o cache SQLite ativo (cache_persistente), cada aba estruturada fica
+guardada pelo seu hash: outras réplicas do app, ou o próprio app ao reiniciar,
+só interpretam com o pandas as abas que nenhum processo leu ainda.
+"""
+import hashlib
+import logging
+import os
+import posixpath
+import threading
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+
+from modulos.cache_persistente import cache_persistente
+from modulos.processamento import _limpar_aba
+from modulos.config import INTERVALO_MONITOR_PLANILHA
+
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL_DOC = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_NS_REL_PKG = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def _hashes_abas(caminho):
+    """
+    Calcula um hash SHA-256 por aba a partir do XML de cada planilha no .xlsx.
+
+    As strings das células ficam em 'sharedStrings.xml', compartilhado por todas
+    as abas; por isso o hash desse arquivo entra no hash de cada aba (se ele
+    mudar, todas as abas são consideradas alteradas).
+
+    Retorna:
+        dict: {nome_aba: hash}, na ordem das abas da pasta de trabalho.
+    """
+    with zipfile.ZipFile(caminho) as pacote:
+        workbook = ET.fromstring(pacote.read("xl/workbook.xml"))
+        rels = ET.fromstring(pacote.read("xl/_rels/workbook.xml.rels"))
+        destinos = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{_NS_REL_PKG}Relationship")}
+
+        hash_compartilhado = hashlib.sha256()
+        for nome_parte in ("xl/sharedStrings.xml", "xl/styles.xml"):
+            if nome_parte in pacote.namelist():
+                hash_compartilhado.update(pacote.read(nome_parte))
+
+        hashes = {}
+        for aba in workbook.iter(f"{_NS_MAIN}sheet"):
+            destino = destinos.get(aba.get(f"{_NS_REL_DOC}id"), "")
+            parte = destino.lstrip("/") if destino.startswith("/") else posixpath.normpath(posixpath.join("xl", destino))
+            h = hash_compartilhado.copy()
+            h.update(pacote.read(parte))
+            hashes[aba.get("name")] = h.hexdigest()
+    return hashes
+
+
+def _nome_aba_cgim(nomes_abas):
+    """Mesma regra de carregar_dados_excel: aba pelo nome ou, na falta dela, a primeira."""
+    if "NCMs-CGIM-DINTE" in nomes_abas:
+        return "NCMs-CGIM-DINTE"
+    return nomes_abas[0] if nomes_abas else None
+
+
+def _indexar_ncm(df):
+    """Índice NCM -> posições (inteiras) das linhas no DataFrame."""
+    if df is None or df.empty:
+        return {}
+    return df.groupby('NCM', sort=False).indices
+
+
+def _montar_estrutura(abas, ordem, nome_aba_cgim):
+    """
+    Monta o dicionário no formato de carregar_dados_excel a partir das abas já
+    processadas, combinando os índices das abas de entidades com deslocamento
+    (sem reagrupar os dados).
+    """
+    dados = {
+        "NCMs-CGIM-DINTE": pd.DataFrame(),
+        "Entidades": pd.DataFrame(),
+        "_indice_ncm": {"NCMs-CGIM-DINTE": {}, "Entidades": {}},
+    }
+    entidades, indice_entidades, deslocamento = [], {}, 0
+    for nome in ordem:
+        aba = abas.get(nome)
+        if aba is None or aba["df"] is None:
+            continue
+        if nome == nome_aba_cgim:
+            dados["NCMs-CGIM-DINTE"] = aba["df"]
+            dados["_indice_ncm"]["NCMs-CGIM-DINTE"] = aba["indice"]
+            continue
+        for ncm, posicoes in aba["indice"].items():
+            posicoes = posicoes + deslocamento
+            anteriores = indice_entidades.get(ncm)
+            indice_entidades[ncm] = posicoes if anteriores is None else np.concatenate([anteriores, posicoes])
+        entidades.append(aba["df"])
+        deslocamento += len(aba["df"])
+    if entidades:
+        dados["Entidades"] = pd.concat(entidades, ignore_index=True)
+        dados["_indice_ncm"]["Entidades"] = indice_entidades
+    return dados
+
+
+class MonitorPlanilha:
+    """
+    Mantém a planilha CGIM local carregada em memória e a recarrega em segundo
+    plano quando o arquivo muda. Use `dados()` para obter a versão atual.
+    """
+
+    def __init__(self, caminho, intervalo=INTERVALO_MONITOR_PLANILHA):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self._abas = {}          # nome -> {"hash", "df", "indice"}
+        self._ordem = []         # ordem das abas no último carregamento
+        self._nome_aba_cgim = None
+        self._dados = None       # estrutura publicada (substituída por inteiro, nunca alterada)
+        self._assinatura = None  # (mtime_ns, tamanho) do último carregamento bem-sucedido
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def dados(self):
+        """Retorna a estrutura atual da planilha (ou None se nunca foi carregada)."""
+        return self._dados
+
+    def _assinatura_arquivo(self):
+        estado = os.stat(self.caminho)
+        return estado.st_mtime_ns, estado.st_size
+
+    def recarregar(self):
+        """
+        Relê apenas as abas alteradas desde o último carregamento e publica a nova
+        estrutura. Uma aba também conta como alterada quando muda de papel (sem
+        a aba 'NCMs-CGIM-DINTE', a CGIM é a primeira: reordenar as abas troca a
+        CGIM e a antiga passa a ser de entidade, com 'NomeAbaEntidade'). Só a
+        ordem mudou: a estrutura é remontada sem reler nada. Retorna a lista
+        de abas alteradas.
+        """
+        with self._lock:
+            assinatura = self._assinatura_arquivo()
+            hashes = _hashes_abas(self.caminho)
+            ordem = list(hashes)
+            nome_aba_cgim = _nome_aba_cgim(ordem)
+            alteradas = [nome for nome, h in hashes.items()
+                         if nome not in self._abas or self._abas[nome]["hash"] != h]
+            if nome_aba_cgim != self._nome_aba_cgim:
+                alteradas += [nome for nome in (self._nome_aba_cgim, nome_aba_cgim)
+                              if nome in hashes and nome not in alteradas]
+            removidas = [nome for nome in self._abas if nome not in hashes]
+            if not alteradas and not removidas and ordem == self._ordem:
+                self._assinatura = assinatura
+                return []
+
+            inicio = time.perf_counter()
+            abas = {nome: aba for nome, aba in self._abas.items() if nome in hashes}
+            a_ler = []
+            for nome in alteradas:
+                aba = None
+                if cache_persistente is not None:
+                    aba = cache_persistente.obter("planilha_aba", (nome, hashes[nome], nome == nome_aba_cgim))
+                if aba is None:
+                    a_ler.append(nome)
+                else:
+                    abas[nome] = aba
+            if a_ler:
+                lidas = pd.read_excel(self.caminho, sheet_name=a_ler)
+                for nome in a_ler:
+                    df = _limpar_aba(nome, lidas[nome])
+                    if df is not None and nome != nome_aba_cgim:
+                        df['NomeAbaEntidade'] = nome
+                    abas[nome] = {"hash": hashes[nome], "df": df, "indice": _indexar_ncm(df)}
+                    if cache_persistente is not None:
+                        cache_persistente.gravar("planilha_aba", (nome, hashes[nome], nome == nome_aba_cgim), abas[nome])
+
+            # Publicação atômica: a referência é trocada de uma vez só
+            self._dados = _montar_estrutura(abas, ordem, nome_aba_cgim)
+            self._abas = abas
+            self._ordem = ordem
+            self._nome_aba_cgim = nome_aba_cgim
+            self._assinatura = assinatura
+            logging.info(f"Planilha CGIM local recarregada em {time.perf_counter() - inicio:.2f}s. "
+                         f"Abas relidas: {a_ler or 'nenhuma'}. Abas do cache SQLite: "
+                         f"{[nome for nome in alteradas if nome not in a_ler] or 'nenhuma'}. Abas removidas: {removidas or 'nenhuma'}. "
+                         f"Aba CGIM: '{nome_aba_cgim}'.")
+            return alteradas
+
+    def _loop(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                if self._assinatura_arquivo() != self._assinatura:
+                    self.recarregar()
+            except FileNotFoundError:
+                logging.warning(f"Planilha CGIM local '{self.caminho}' não encontrada. Mantendo a versão carregada.")
+            except Exception as e:
+                # Arquivo possivelmente ainda sendo gravado; tenta de novo no próximo ciclo
+                logging.warning(f"Falha ao recarregar a planilha CGIM local: {e}. Mantendo a versão carregada.")
+
+    def iniciar(self):
+        """Faz o carregamento inicial (síncrono) e inicia o monitoramento em segundo plano."""
+        self.recarregar()
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name="monitor-planilha-cgim", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        """Interrompe o monitoramento."""
+        self._parar.set()
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Pré-aquecimento dos NCMs da CGIM a cada nova divulgação do ComexStat.
+
+Sem ele, a primeira pessoa a abrir cada NCM depois de uma divulgação espera a
+busca na API, o processamento das séries e a montagem dos gráficos. O
+pré-aquecedor consulta periodicamente obter_data_ultima_atualizacao(); quando
+o campo 'updated' muda, submete à fila de análises, um NCM por vez e com uma
+pausa entre eles (limite de requisições da API), todos os NCMs da planilha
+CGIM. Cada análise deixa as séries, os dados por país e as figuras no cache
+compartilhado, nas mesmas chaves que a página lê.
+
+O andamento da rodada fica num checkpoint (ARQUIVO_PREAQUECIMENTO), gravado a
+cada NCM: se o processo for interrompido, a rodada continua de onde parou ao
+reiniciar. Na primeira consulta de cada processo, os NCMs do checkpoint cuja
+análise não está mais no cache (em memória ou no SQLite) voltam a ficar
+pendentes: sem o cache SQLite, um reinício refaz a rodada inteira. NCMs com
+erro de API continuam pendentes e são tentados de novo na consulta seguinte.
+
+Com várias réplicas usando o mesmo checkpoint, só uma executa a rodada: a
+que obtém a trava exclusiva (flock) em <checkpoint>.lock; as outras tentam de
+novo na consulta seguinte. Sem fcntl (Windows) não há trava entre processos.
+
+O cache aquecido é o do processo em que o pré-aquecedor roda: no app, ative
+com FICHA_NCM_PREAQUECIMENTO=1. Em primeiro plano (acompanhar uma rodada,
+diagnóstico):
+    python -m modulos.preaquecimento --uma-vez
+    python -m modulos.preaquecimento --estado
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from modulos.api_comex import obter_data_ultima_atualizacao
+from modulos.arquivos import gravar_atomico
+from modulos.cache_compartilhado import cache_compartilhado
+from modulos.config import ARQUIVO_PREAQUECIMENTO, PREAQUECIMENTO_INTERVALO, PREAQUECIMENTO_PAUSA_NCM
+from modulos.fila_analises import fila_analises, versao_dados
+
+
+def ncms_cgim(dados_excel):
+    """NCMs da aba CGIM da planilha estruturada, em ordem crescente."""
+    if not isinstance(dados_excel, dict) or "NCMs-CGIM-DINTE" not in dados_excel:
+        raise ValueError("Planilha CGIM não disponível.")
+    return sorted(set(dados_excel["NCMs-CGIM-DINTE"]["NCM"].dropna()))
+
+
+def ler_checkpoint(arquivo=ARQUIVO_PREAQUECIMENTO):
+    """Estado da última rodada ({} se não houver)."""
+    try:
+        with open(arquivo, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"Checkpoint do pré-aquecimento ilegível ({arquivo}), recomeçando: {e}")
+        return {}
+
+
+def _gravar_checkpoint(arquivo, estado):
+    """Gravação atômica: uma interrupção nunca deixa o checkpoint pela metade."""
+    gravar_atomico(arquivo, json.dumps(estado, ensure_ascii=False, indent=1))
+
+
+@contextlib.contextmanager
+def _trava_rodada(arquivo):
+    """
+    Trava exclusiva da rodada entre processos, liberada ao sair do bloco.
+
+    Yields:
+        bool: True se este processo obteve a trava; False se outro a detém.
+    """
+    if fcntl is None:
+        yield True
+        return
+    caminho = arquivo + ".lock"
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    descritor = os.open(caminho, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(descritor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        os.close(descritor)
+
+
+def _agora():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+class PreAquecedor:
+    """
+    Consulta a data de atualização da API e, a cada divulgação, analisa todos
+    os NCMs de `obter_ncms()` pela fila de análises.
+
+    Args:
+        obter_ncms (callable): Sem argumentos; retorna os NCMs (8 dígitos) a aquecer.
+        arquivo (str): Checkpoint da rodada.
+        intervalo (float): Segundos entre consultas à data de atualização.
+        pausa_ncm (float): Segundos entre as análises de dois NCMs que consultaram a API.
+    """
+
+    def __init__(self, obter_ncms, arquivo=ARQUIVO_PREAQUECIMENTO,
+                 intervalo=PREAQUECIMENTO_INTERVALO, pausa_ncm=PREAQUECIMENTO_PAUSA_NCM):
+        self.obter_ncms = obter_ncms
+        self.arquivo = arquivo
+        self.intervalo = intervalo
+        self.pausa_ncm = pausa_ncm
+        self._parar = threading.Event()
+        self._thread = None
+        self._conferir_cache = True  # primeira consulta do processo: checkpoint x cache
+
+    def estado(self):
+        """Checkpoint atual: versão, NCMs concluídos, com erro e horários da rodada."""
+        return ler_checkpoint(self.arquivo)
+
+    def verificar(self):
+        """
+        Consulta a data de atualização e executa (ou retoma) a rodada da versão atual.
+
+        Returns:
+            bool: True se a rodada da versão atual está completa (False também
+            quando outro processo está com a rodada).
+        """
+        updated, ano, mes = obter_data_ultima_atualizacao()
+        if ano == "Erro" or mes == "Erro":
+            logging.warning("Pré-aquecimento: data de atualização da API indisponível; nova tentativa no próximo ciclo.")
+            return False
+        ano, mes = int(ano), int(mes)
+        with _trava_rodada(self.arquivo) as obtida:
+            if not obtida:
+                logging.info("Pré-aquecimento: rodada em andamento em outro processo; nova tentativa no próximo ciclo.")
+                return False
+            estado = ler_checkpoint(self.arquivo)
+            if estado.get("updated") != updated:
+                if estado:
+                    logging.info(f"Pré-aquecimento: nova divulgação do ComexStat ({estado.get('updated')} -> {updated}).")
+                estado = {"updated": updated, "versao_dados": versao_dados(ano, mes), "iniciada_em": _agora(),
+                          "concluida_em": None, "total": None, "concluidos": [], "com_erro": {}}
+            elif self._conferir_cache:
+                self._conferir_checkpoint(estado)
+            self._conferir_cache = False
+            if estado.get("concluida_em"):
+                return True
+            self._rodada(estado, ano, mes)
+            return bool(estado["concluida_em"])
+
+    def _conferir_checkpoint(self, estado):
+        """Devolve às pendentes os NCMs concluídos cuja análise saiu do cache (ex.: processo reiniciado)."""
+        ausentes = {ncm for ncm in estado["concluidos"]
+                    if not cache_compartilhado.contem("analise", (ncm, estado["versao_dados"]))}
+        if ausentes:
+            logging.info(f"Pré-aquecimento ({estado['versao_dados']}): {len(ausentes)} NCMs do checkpoint "
+                         f"sem análise no cache; voltam a ficar pendentes.")
+            estado["concluidos"] = [ncm for ncm in estado["concluidos"] if ncm not in ausentes]
+            estado["concluida_em"] = None
+
+    def _rodada(self, estado, ano, mes):
+        ncms = self.obter_ncms()
+        concluidos = set(estado["concluidos"])
+        pendentes = [ncm for ncm in ncms if ncm not in concluidos]
+        estado["total"] = len(ncms)
+        logging.info(f"Pré-aquecimento ({estado['versao_dados']}): {len(pendentes)} de {len(ncms)} NCMs pendentes.")
+        for ncm in pendentes:
+            if self._parar.is_set():
+                break
+            tarefa = fila_analises.submeter(ncm, mes, ano)
+            consultou_api = not tarefa.concluida
+            tarefa.aguardar()
+            if tarefa.com_erros or tarefa.resultado is None:
+                estado["com_erro"][ncm] = tarefa.erro or "consulta à API com erro"
+            else:
+                estado["concluidos"].append(ncm)
+                estado["com_erro"].pop(ncm, None)
+            _gravar_checkpoint(self.arquivo, estado)
+            if consultou_api:
+                self._parar.wait(self.pausa_ncm)
+        if len(estado["concluidos"]) >= len(ncms) and not self._parar.is_set():
+            estado["concluida_em"] = _agora()
+            _gravar_checkpoint(self.arquivo, estado)
+            logging.info(f"Pré-aquecimento ({estado['versao_dados']}) concluído: {len(ncms)} NCMs.")
+        elif estado["com_erro"]:
+            logging.warning(f"Pré-aquecimento ({estado['versao_dados']}): {len(estado['com_erro'])} NCMs com erro; "
+                            f"nova tentativa em {self.intervalo:.0f}s.")
+
+    def _loop(self):
+        while not self._parar.is_set():
+            try:
+                self.verificar()
+            except Exception as e:
+                logging.error(f"Falha no pré-aquecimento: {e}", exc_info=True)
+            self._parar.wait(self.intervalo)
+
+    def iniciar(self):
+        """Inicia as consultas periódicas numa thread em segundo plano."""
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._loop, name="preaquecimento", daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        """Interrompe a rodada após o NCM em andamento (o checkpoint guarda o progresso)."""
+        self._parar.set()
+
+
+def main():
+    import modulos.processamento as proc
+    from modulos.config import PLANILHA_CGIM_LOCAL
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--planilha", default=PLANILHA_CGIM_LOCAL or "20241011_NCMs-CGIM-DINTE.xlsx",
+                        help="planilha CGIM (.xlsx)")
+    parser.add_argument("--uma-vez", action="store_true", help="executa a rodada da versão atual e sai")
+    parser.add_argument("--estado", action="store_true", help="mostra o checkpoint e sai")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - [PREAQUECIMENTO] - %(message)s")
+
+    if args.estado:
+        estado = ler_checkpoint()
+        print(json.dumps({**estado, "concluidos": len(estado.get("concluidos", []))}, ensure_ascii=False, indent=1))
+        return
+    with open(args.planilha, "rb") as arquivo:
+        ncms = ncms_cgim(proc.carregar_dados_excel(arquivo))
+    preaquecedor = PreAquecedor(lambda: ncms)
+    try:
+        if args.uma_vez:
+            if not preaquecedor.verificar():
+                raise SystemExit(1)
+        else:
+            preaquecedor.iniciar()
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        preaquecedor.parar()
+
+
+if __name__ == "__main__":
+    main()
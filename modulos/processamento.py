@@ -3,6 +3,8 @@ import pandas as pd
 import logging
 import re # Importado para formatar NCM
 
+from modulos.instrumentacao import medido
+
 # Configuração básica de logging (se não configurado no app.py, pode ser útil aqui)
 # logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [PROCESSAMENTO] - %(message)s')
 
@@ -16,6 +18,38 @@ def formatar_ncm_8digitos(ncm_value):
     ncm_8 = ncm_digits[:8]
     return ncm_8 if len(ncm_8) == 8 else ""
 
+def _limpar_aba(sheet_name, df):
+    """
+    Limpa uma aba do Excel: exige a coluna 'NCM' e a normaliza para 8 dígitos.
+
+    Retorna:
+        pd.DataFrame | None: DataFrame limpo ou None se a aba deve ser ignorada.
+    """
+    logging.info(f"Processando aba: '{sheet_name}'")
+
+    # Verifica se a aba está vazia
+    if df.empty:
+        logging.warning(f"Aba '{sheet_name}' está vazia.")
+        return None
+
+    # Garante que a coluna 'NCM' exista (essencial para ambas as abas)
+    if 'NCM' not in df.columns:
+        logging.warning(f"Coluna 'NCM' não encontrada na aba '{sheet_name}'. Pulando esta aba.")
+        return None
+
+    # Limpa e formata a coluna NCM para 8 dígitos
+    df['NCM'] = df['NCM'].apply(formatar_ncm_8digitos)
+    df = df.dropna(subset=['NCM']) # Remove linhas onde NCM ficou vazio após formatação
+    df = df[df['NCM'] != ""] # Garante que não haja strings vazias
+
+    # Se a aba ficou vazia após limpar NCMs, avisa e pula
+    if df.empty:
+        logging.warning(f"Aba '{sheet_name}' ficou vazia após limpar/filtrar NCMs para 8 dígitos.")
+        return None
+
+    return df
+
+@medido
 def carregar_dados_excel(uploaded_file):
     """
     Lê um arquivo Excel, identifica abas relevantes (CGIM e Entidades),
@@ -52,26 +86,8 @@ def carregar_dados_excel(uploaded_file):
 
         # Processa cada aba
         for sheet_name, df in excel_data.items():
-            logging.info(f"Processando aba: '{sheet_name}'")
-
-            # Verifica se a aba está vazia
-            if df.empty:
-                logging.warning(f"Aba '{sheet_name}' está vazia.")
-                continue
-
-            # Garante que a coluna 'NCM' exista (essencial para ambas as abas)
-            if 'NCM' not in df.columns:
-                logging.warning(f"Coluna 'NCM' não encontrada na aba '{sheet_name}'. Pulando esta aba.")
-                continue
-
-            # Limpa e formata a coluna NCM para 8 dígitos
-            df['NCM'] = df['NCM'].apply(formatar_ncm_8digitos)
-            df = df.dropna(subset=['NCM']) # Remove linhas onde NCM ficou vazio após formatação
-            df = df[df['NCM'] != ""] # Garante que não haja strings vazias
-
-            # Se a aba ficou vazia após limpar NCMs, avisa e pula
-            if df.empty:
-                logging.warning(f"Aba '{sheet_name}' ficou vazia após limpar/filtrar NCMs para 8 dígitos.")
+            df = _limpar_aba(sheet_name, df)
+            if df is None:
                 continue
 
             # Processa a aba CGIM
@@ -104,6 +120,14 @@ def carregar_dados_excel(uploaded_file):
         return None
 
 
+def _filtrar_por_ncm(df, ncm_8digitos, indice=None):
+    """Filtra as linhas de um NCM, usando o índice NCM -> posições quando disponível."""
+    if indice is not None:
+        return df.iloc[indice.get(ncm_8digitos, [])].copy()
+    return df[df['NCM'] == ncm_8digitos].copy()
+
+
+@medido
 def buscar_informacoes_ncm_completo(dados_excel_estruturados, ncm_8digitos):
     """
     Busca informações de um NCM específico na estrutura de dados carregada do Excel.
@@ -126,10 +150,13 @@ def buscar_informacoes_ncm_completo(dados_excel_estruturados, ncm_8digitos):
 
     logging.info(f"Buscando NCM '{ncm_8digitos}' na estrutura do Excel...")
 
+    # Índices NCM -> posições, presentes quando a planilha vem do monitor local (planilha_cgim)
+    indices = dados_excel_estruturados.get("_indice_ncm") or {}
+
     # Busca na aba CGIM
     df_cgim = dados_excel_estruturados.get("NCMs-CGIM-DINTE")
     if isinstance(df_cgim, pd.DataFrame) and not df_cgim.empty and 'NCM' in df_cgim.columns:
-        df_ncm_result = df_cgim[df_cgim['NCM'] == ncm_8digitos].copy()
+        df_ncm_result = _filtrar_por_ncm(df_cgim, ncm_8digitos, indices.get("NCMs-CGIM-DINTE"))
         logging.info(f"Busca na aba CGIM: {len(df_ncm_result)} registro(s) encontrado(s).")
     else:
         logging.warning("Aba CGIM não encontrada ou inválida na estrutura de dados.")
@@ -137,7 +164,7 @@ def buscar_informacoes_ncm_completo(dados_excel_estruturados, ncm_8digitos):
     # Busca nas Entidades
     df_entidades = dados_excel_estruturados.get("Entidades")
     if isinstance(df_entidades, pd.DataFrame) and not df_entidades.empty and 'NCM' in df_entidades.columns:
-        df_entidades_result = df_entidades[df_entidades['NCM'] == ncm_8digitos].copy()
+        df_entidades_result = _filtrar_por_ncm(df_entidades, ncm_8digitos, indices.get("Entidades"))
         # Log detalhado por aba de origem, se a coluna 'NomeAbaEntidade' existir
         if 'NomeAbaEntidade' in df_entidades_result.columns:
              logging.info(f"Buscando em {len(df_entidades['NomeAbaEntidade'].unique())} aba(s) de entidade...")
@@ -166,6 +193,7 @@ def _converter_colunas_numericas(df, colunas):
             df[col] = df[col].astype('Float64') # Usa tipo que suporta NA
     return df
 
+@medido
 def processar_dados_export_import(dados_export, dados_import, last_updated_month):
     """
     Processa dados históricos de exportação e importação, CONSOLIDA POR ANO,
@@ -382,6 +410,7 @@ def _processar_dados_parciais(dados_export, dados_import, ano, last_updated_mont
 
 
 
+@medido
 def processar_dados_ano_anterior(dados_export, dados_import, last_updated_month):
     """Processa dados parciais do ano anterior."""
     # TODO: Obter o ano dinamicamente a partir da data de atualização da API
@@ -389,6 +418,7 @@ def processar_dados_ano_anterior(dados_export, dados_import, last_updated_month)
     ano_anterior = 2024 # Temporariamente fixo
     return _processar_dados_parciais(dados_export, dados_import, ano_anterior, last_updated_month)
 
+@medido
 def processar_dados_ano_atual(dados_export, dados_import, last_updated_month):
     """Processa dados parciais do ano atual."""
     # TODO: Obter o ano dinamicamente a partir da data de atualização da API
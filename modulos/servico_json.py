@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço HTTP local que expõe em JSON os dados das fichas NCM, para outras
+ferramentas internas não precisarem reimplementar a consulta à API
+ComexStat e o processamento das séries.
+
+Uso (na raiz do repositório):
+    python -m modulos.servico_json --porta 8600
+    curl http://127.0.0.1:8600/ncm/84102030/annual
+    curl -X POST --data-binary @pauta.pdf http://127.0.0.1:8600/pauta
+
+Rotas (o NCM aceita 8 dígitos ou o formato xxxx.xx.xx):
+    GET  /versao               data e versão da última atualização da API
+    GET  /ncm/<NCM>            descrição, séries e dados por país
+    GET  /ncm/<NCM>/annual     série anual de exportações e importações
+    GET  /ncm/<NCM>/ytd        acumulado do ano atual e mesmo período do ano anterior
+    GET  /ncm/<NCM>/countries  importações e exportações de 2024 por país
+    POST /pauta                corpo = PDF da pauta; NCMs e páginas em que aparecem
+    GET  /_estatisticas        ocupação do cache compartilhado e tarefas da fila
+
+As análises passam pela fila de análises e ficam no cache compartilhado, como
+no app: pedidos simultâneos do mesmo NCM esperam uma única análise. A
+extração das pautas usa o cache em disco (cache_pdf), que vale também para o
+app quando ambos usam o mesmo DIR_CACHE. As respostas prontas ficam no espaço
+'servico' do cache, por versão dos dados, com ETag calculada do corpo: quem
+reenvia o ETag em If-None-Match (comparação fraca, W/ ignorado; * vale para
+qualquer versão) recebe 304, sem corpo. Respostas sem ETag (erros, corpos
+com erro de API, pautas e estatísticas) vão com Cache-Control: no-store e
+não são guardadas.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from modulos.api_comex import obter_data_ultima_atualizacao
+import modulos.cache_pdf as cache_pdf
+from modulos.cache_compartilhado import cache_compartilhado
+from modulos.cli import resultado_para_json
+from modulos.config import (
+    PLANILHA_CGIM_LOCAL,
+    SERVICO_HOST,
+    SERVICO_PDF_MAXIMO_MB,
+    SERVICO_PORTA,
+    SERVICO_TIMEOUT_ANALISE,
+    SERVICO_TTL_VERSAO,
+)
+from modulos.fila_analises import fila_analises, tem_erros_api, versao_dados
+from modulos.historico_pautas import ncms_8digitos
+from modulos.processamento import formatar_ncm_8digitos
+
+
+class ErroServico(Exception):
+    """Erro com o status HTTP a devolver ao cliente."""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _json_bytes(corpo):
+    return json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+
+
+def _etag(dados):
+    return f'"{hashlib.sha256(dados).hexdigest()[:32]}"'
+
+
+def etag_confere(if_none_match, etag):
+    """Se o cabeçalho If-None-Match casa com `etag` (comparação fraca, RFC 9110 13.1.2)."""
+    if not if_none_match or not etag:
+        return False
+    candidatos = [e.strip() for e in if_none_match.split(",")]
+    return "*" in candidatos or etag.removeprefix("W/") in [e.removeprefix("W/") for e in candidatos]
+
+
+def _versao():
+    """(data, ano, mês) da última atualização da API, consultada no máximo a cada SERVICO_TTL_VERSAO s."""
+    data, ano, mes = cache_compartilhado.obter_ou_calcular(
+        "servico", "versao", obter_data_ultima_atualizacao, ttl=SERVICO_TTL_VERSAO,
+        memorizar=lambda valor: valor[1] != "Erro",
+    )
+    if ano == "Erro" or mes == "Erro":
+        raise ErroServico(502, "Não foi possível obter a data de atualização da API Comex.")
+    return data, int(ano), int(mes)
+
+
+def _resultado(ncm_code, last_updated_month, last_updated_year):
+    """Resultado da análise do NCM, pela fila (reaproveita a análise de qualquer sessão do processo)."""
+    tarefa = fila_analises.submeter(ncm_code, last_updated_month, last_updated_year, preparar_graficos=False)
+    if not tarefa.aguardar(SERVICO_TIMEOUT_ANALISE):
+        raise ErroServico(504, f"A análise do NCM {ncm_code} não terminou em {SERVICO_TIMEOUT_ANALISE:.0f}s; tente de novo.")
+    resultado = tarefa.resultado
+    if resultado is None and tarefa.status == "concluida":
+        # Resultado já saiu do cache compartilhado: refaz a análise
+        resultado = fila_analises.resultado(ncm_code, last_updated_month, last_updated_year)
+    if resultado is None:
+        raise ErroServico(502, f"Falha na análise do NCM {ncm_code}: {tarefa.erro or 'análise indisponível'}")
+    return resultado
+
+
+def _por_pais(registros):
+    """[{país, US$ FOB, participação (%)}] em ordem decrescente de valor."""
+    totais = {}
+    for registro in registros or []:
+        try:
+            valor = float(registro.get("metricFOB") or 0)
+        except (TypeError, ValueError):
+            valor = 0.0
+        totais[registro.get("country")] = totais.get(registro.get("country"), 0.0) + valor
+    total = sum(totais.values())
+    return [{"pais": pais, "fob": valor, "participacao": valor / total * 100 if total else None}
+            for pais, valor in sorted(totais.items(), key=lambda item: -item[1])]
+
+
+def corpo_ncm(ncm_code, rota, last_updated_month, last_updated_year):
+    """
+    Corpo da resposta de /ncm/<NCM>[/rota].
+
+    Returns:
+        tuple: (corpo, com_erros) - respostas com erro de API não são guardadas no cache.
+    """
+    resultado = _resultado(ncm_code, last_updated_month, last_updated_year)
+    completo = resultado_para_json(ncm_code, resultado, last_updated_month, last_updated_year)
+    comum = {chave: completo[chave] for chave in ("ncm", "descricao", "versao_dados")}
+    erros = completo["erros"]
+    if rota == "":
+        corpo = completo
+    elif rota == "annual":
+        corpo = {**comum, "historico_anual": completo["historico_anual"],
+                 "erros": {c: v for c, v in erros.items() if c in ("error_hist", "erro_processamento")}}
+    elif rota == "ytd":
+        corpo = {**comum, "meses": last_updated_month, "ano_anterior": completo["parcial_ano_anterior"],
+                 "ano_atual": completo["parcial_ano_atual"],
+                 "erros": {c: v for c, v in erros.items() if c != "error_hist"}}
+    else:
+        corpo = {**comum, "ano": 2024, **{fluxo: _por_pais(registros) for fluxo, registros in completo["por_pais"].items()}}
+    return corpo, tem_erros_api(resultado)
+
+
+def responder_get(caminho):
+    """
+    Resposta de uma rota GET.
+
+    Returns:
+        tuple: (status, corpo em bytes, ETag ou None). Sem ETag, a resposta
+        não deve ser guardada por clientes nem proxies.
+    """
+    partes = [p for p in caminho.split("/") if p]
+    if partes == ["_estatisticas"]:
+        return 200, _json_bytes({"cache": cache_compartilhado.estatisticas(), "fila": fila_analises.resumo()}), None
+    data, ano, mes = _versao()
+    versao = versao_dados(ano, mes)
+    if partes == ["versao"]:
+        dados = _json_bytes({"updated": data, "ano": ano, "mes": mes, "versao_dados": versao})
+        return 200, dados, _etag(dados)
+    if len(partes) not in (2, 3) or partes[0] != "ncm" or (len(partes) == 3 and partes[2] not in ("annual", "ytd", "countries")):
+        raise ErroServico(404, f"Rota não encontrada: {caminho}")
+    if not re.fullmatch(r"\d{8}|\d{4}\.\d{2}\.\d{2}", partes[1]):
+        raise ErroServico(400, f"NCM inválido: {partes[1]} (use 8 dígitos ou xxxx.xx.xx).")
+    ncm_code = formatar_ncm_8digitos(partes[1])
+    rota = partes[2] if len(partes) == 3 else ""
+    chave = (ncm_code, rota, versao)
+    pronta = cache_compartilhado.obter("servico", chave)
+    if pronta is not None:
+        return 200, *pronta
+    corpo, com_erros = corpo_ncm(ncm_code, rota, mes, ano)
+    dados = _json_bytes(corpo)
+    if com_erros:
+        return 200, dados, None
+    etag = _etag(dados)
+    cache_compartilhado.gravar("servico", chave, (dados, etag))
+    return 200, dados, etag
+
+
+def responder_pauta(pdf_bytes, ncms_cgim=None):
+    """Corpo de POST /pauta: NCMs do PDF (e os da CGIM, se a planilha estiver carregada)."""
+    if not pdf_bytes.startswith(b"%PDF"):
+        raise ErroServico(400, "O corpo da requisição não é um arquivo PDF.")
+    try:
+        registro = cache_pdf.extrair_com_cache(pdf_bytes)
+    except Exception as e:
+        logging.warning(f"Falha ao ler PDF recebido pelo serviço: {e}", exc_info=True)
+        raise ErroServico(422, f"Não foi possível ler o PDF: {e}")
+    ncms = sorted(ncms_8digitos(registro["ncms"]))
+    corpo = {"sha256": registro["sha256"], "num_paginas": registro["num_paginas"], "ncms": ncms,
+             "paginas": {formatar_ncm_8digitos(ncm): paginas for ncm, paginas in registro["paginas"].items()}}
+    if ncms_cgim is not None:
+        corpo["ncms_cgim"] = [ncm for ncm in ncms if ncm in ncms_cgim]
+    return _json_bytes(corpo)
+
+
+class ServicoJson:
+    """
+    Servidor HTTP do serviço, com uma thread por requisição.
+
+    Args:
+        host (str), porta (int): Endereço de escuta (porta 0 = escolhida pelo sistema).
+        monitor_planilha (MonitorPlanilha | None): Planilha CGIM, para filtrar os NCMs das pautas.
+    """
+
+    def __init__(self, host=SERVICO_HOST, porta=SERVICO_PORTA, monitor_planilha=None):
+        self.monitor_planilha = monitor_planilha
+        self._servidor = ThreadingHTTPServer((host, porta), self._manipulador())
+        self._servidor.daemon_threads = True
+
+    @property
+    def url(self):
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def ncms_cgim(self):
+        dados = self.monitor_planilha.dados() if self.monitor_planilha else None
+        return set(dados["NCMs-CGIM-DINTE"]["NCM"].dropna()) if dados else None
+
+    def servir(self):
+        """Atende até ser interrompido (bloqueia a thread atual)."""
+        self._servidor.serve_forever()
+
+    def parar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def _manipulador(self):
+        servico = self
+
+        class Manipulador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, formato, *args):
+                logging.debug(f"{self.address_string()} - {formato % args}")
+
+            def _enviar(self, status, dados, etag=None):
+                if status == 200 and etag_confere(self.headers.get("If-None-Match"), etag):
+                    status, dados = 304, b""
+                self.send_response(status)
+                if status != 304:
+                    self.send_header("Content-Type", "application/json; charset=utf-8")
+                if etag:
+                    self.send_header("ETag", etag)
+                    self.send_header("Cache-Control", f"max-age={int(SERVICO_TTL_VERSAO)}")
+                else:
+                    self.send_header("Cache-Control", "no-store")
+                self.send_header("Content-Length", str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _tratar(self, responder):
+                try:
+                    self._enviar(*responder())
+                except ErroServico as e:
+                    self._enviar(e.status, _json_bytes({"erro": str(e)}))
+                except Exception as e:
+                    logging.error(f"Erro inesperado no serviço JSON ({self.command} {self.path}): {e}", exc_info=True)
+                    self._enviar(500, _json_bytes({"erro": f"Erro inesperado: {e}"}))
+
+            def do_GET(self):
+                self._tratar(lambda: responder_get(urlsplit(self.path).path))
+
+            def do_POST(self):
+                def responder():
+                    if urlsplit(self.path).path.rstrip("/") != "/pauta":
+                        raise ErroServico(404, f"Rota não encontrada: {self.path}")
+                    try:
+                        tamanho = int(self.headers.get("Content-Length") or 0)
+                    except ValueError:
+                        tamanho = -1
+                    if tamanho < 0:
+                        self.close_connection = True
+                        raise ErroServico(400, "Content-Length inválido.")
+                    if tamanho > SERVICO_PDF_MAXIMO_MB * 1024 * 1024:
+                        # Corpo não lido: a conexão não pode ser reaproveitada
+                        self.close_connection = True
+                        raise ErroServico(413, f"PDF maior que {SERVICO_PDF_MAXIMO_MB:.0f} MB.")
+                    return 200, responder_pauta(self.rfile.read(tamanho), servico.ncms_cgim()), None
+                self._tratar(responder)
+
+        return Manipulador
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=SERVICO_HOST)
+    parser.add_argument("--porta", type=int, default=SERVICO_PORTA)
+    parser.add_argument("--planilha", default=PLANILHA_CGIM_LOCAL,
+                        help="planilha CGIM (.xlsx) para indicar os NCMs da CGIM em POST /pauta")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - [SERVICO] - %(message)s")
+
+    monitor = None
+    if args.planilha:
+        from modulos.planilha_cgim import MonitorPlanilha
+        monitor = MonitorPlanilha(args.planilha).iniciar()
+    servico = ServicoJson(args.host, args.porta, monitor)
+    logging.info(f"Serviço JSON das fichas NCM em {servico.url}")
+    try:
+        servico.servir()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if monitor:
+            monitor.parar()
+
+
+if __name__ == "__main__":
+    main()
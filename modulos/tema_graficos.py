@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Tema Plotly enxuto compartilhado pelos gráficos da ficha.
+
+O template vai junto com cada figura no JSON enviado ao navegador. O padrão
+do Streamlit ("streamlit") tem cerca de 3,5 KB, quase todo com estilos de
+tipos de traço que a ficha não usa (heatmap, contour, candlestick...). Este
+tema guarda só o que os gráficos daqui precisam: cores, fonte, grades e os
+separadores decimais do padrão brasileiro (1.234,56 nos eixos e dicas).
+
+As cores de fundo ficam sem definição (transparentes), para que o
+theme="streamlit" do st.plotly_chart siga o tema claro ou escuro do app.
+"""
+import plotly.graph_objects as go
+import plotly.io as pio
+
+TEMA = "ficha_ncm"
+
+# Cores usadas nos gráficos anuais: anos fechados, ano corrente e parcial do ano anterior
+CORES = {"ano": "steelblue", "ano_atual": "midnightblue", "parcial": "darkorange"}
+
+
+def registrar_tema():
+    """Registra o template no plotly.io (uma vez por processo)."""
+    if TEMA not in pio.templates:
+        pio.templates[TEMA] = go.layout.Template(layout=dict(
+            colorway=[CORES["ano"], CORES["parcial"], CORES["ano_atual"], "#d62728", "#2ca02c", "#9467bd"],
+            font=dict(family='"Source Sans Pro", sans-serif'),
+            separators=",.",
+            xaxis=dict(showgrid=False, automargin=True),
+            yaxis=dict(gridcolor="rgba(128,128,128,0.25)", zeroline=False, automargin=True),
+        ))
+    return TEMA
+
+
+def aplicar_tema(fig):
+    """Usa o tema enxuto na figura (no lugar do template padrão) e a devolve."""
+    fig.update_layout(template=registrar_tema())
+    return fig
+
+
+def tamanho_payload(fig):
+    """Bytes do JSON da figura, como enviado ao navegador."""
+    return len(fig.to_json().encode("utf-8"))
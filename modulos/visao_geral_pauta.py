@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Visão geral de todos os NCMs de uma pauta numa única tabela.
+
+Em vez de uma análise completa por NCM, os dados vêm de poucas consultas em
+lote à API (vários NCMs por requisição, detalhados por NCM), feitas em
+paralelo: uma série mensal de importações cobrindo o último ano fechado e o
+ano corrente, e as importações do último ano fechado por país. Os
+indicadores de todos os NCMs são calculados de uma vez sobre esses dados.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modulos.api_comex import obter_dados_ncms_lote
+from modulos.config import VISAO_GERAL_NCMS_POR_LOTE, VISAO_GERAL_REQUISICOES_PARALELAS
+from modulos.instrumentacao import medido
+
+
+def _lotes(ncms, tamanho):
+    return [ncms[i:i + tamanho] for i in range(0, len(ncms), tamanho)]
+
+
+def _buscar_em_lotes(ncms, consultas):
+    """
+    Executa cada consulta para todos os lotes de NCMs, em paralelo.
+
+    Args:
+        consultas (dict): {nome: kwargs de obter_dados_ncms_lote (sem os NCMs)}.
+
+    Returns:
+        tuple: ({nome: DataFrame com os registros de todos os lotes}, erro ou None)
+    """
+    tarefas = [(nome, lote) for nome in consultas for lote in _lotes(ncms, VISAO_GERAL_NCMS_POR_LOTE)]
+    with ThreadPoolExecutor(max_workers=VISAO_GERAL_REQUISICOES_PARALELAS) as executor:
+        respostas = list(executor.map(lambda t: obter_dados_ncms_lote(t[1], **consultas[t[0]]), tarefas))
+    registros = {nome: [] for nome in consultas}
+    erro = None
+    for (nome, lote), (dados, erro_lote) in zip(tarefas, respostas):
+        if erro_lote:
+            logging.error(f"Visão geral: falha na consulta '{nome}' para {len(lote)} NCMs: {erro_lote}")
+            erro = erro or erro_lote
+        registros[nome].extend(dados)
+    logging.info(f"Visão geral: {len(tarefas)} requisições em lote para {len(ncms)} NCMs.")
+    return {nome: pd.DataFrame(r) for nome, r in registros.items()}, erro
+
+
+def _normalizar(df, colunas_numericas):
+    """Código NCM com 8 dígitos e métricas numéricas."""
+    if df.empty or "coNcm" not in df.columns:
+        return pd.DataFrame(columns=["ncm"] + colunas_numericas)
+    df = df.copy()
+    df["ncm"] = df["coNcm"].astype(str).str.zfill(8)
+    for coluna in colunas_numericas:
+        df[coluna] = pd.to_numeric(df.get(coluna), errors="coerce").fillna(0)
+    return df
+
+
+@medido
+def colunas_visao_geral(last_updated_year, last_updated_month):
+    """Nomes das colunas de indicadores da tabela, que dependem do último mês disponível na base."""
+    ano, mes = int(last_updated_year), int(last_updated_month)
+    ano_ant = ano - 1
+    return {
+        "fob": f"Importações {ano_ant} (US$ FOB)",
+        "kg": f"Importações {ano_ant} (KG)",
+        "variacao": f"Var. Jan-{mes:02d} {ano}/{ano_ant} (%)",
+        "preco": f"Preço Médio {ano_ant} (US$ FOB/KG)",
+        "participacao": "Part. Origem (%)",
+        "tendencia": "Importações 12 meses (KG)",
+    }
+
+
+def montar_visao_geral(ncms, last_updated_year, last_updated_month):
+    """
+    Monta a tabela de visão geral das importações dos NCMs da pauta.
+
+    Args:
+        ncms (list): NCMs de 8 dígitos.
+        last_updated_year (int), last_updated_month (int): Último mês disponível na base.
+
+    Returns:
+        tuple: (pd.DataFrame com uma linha por NCM, erro ou None). A coluna de
+        tendência traz a lista das importações mensais (KG) dos últimos 12 meses.
+    """
+    ano, mes = int(last_updated_year), int(last_updated_month)
+    ano_ant = ano - 1
+    consultas = {
+        "mensal": dict(flow="import", periodo_de=f"{ano_ant}-01", periodo_ate=f"{ano}-{mes:02d}", mensal=True),
+        "paises": dict(flow="import", periodo_de=f"{ano_ant}-01", periodo_ate=f"{ano_ant}-12",
+                       detalhes=["country"], metricas=["metricFOB"]),
+    }
+    dados, erro = _buscar_em_lotes(list(ncms), consultas)
+    if erro:
+        return pd.DataFrame(), erro
+
+    mensal = _normalizar(dados["mensal"], ["metricFOB", "metricKG", "year", "monthNumber"])
+    mensal["periodo"] = mensal["year"].astype(int) * 12 + mensal["monthNumber"].astype(int) - 1
+    paises = _normalizar(dados["paises"], ["metricFOB"])
+
+    colunas = colunas_visao_geral(ano, mes)
+    col_fob, col_kg, col_var, col_preco = colunas["fob"], colunas["kg"], colunas["variacao"], colunas["preco"]
+    col_part, col_tendencia = colunas["participacao"], colunas["tendencia"]
+
+    tabela = pd.DataFrame(index=pd.Index(list(ncms), name="ncm"))
+    anual = mensal[mensal["year"] == ano_ant].groupby("ncm")[["metricFOB", "metricKG"]].sum()
+    tabela[col_fob] = anual["metricFOB"]
+    tabela[col_kg] = anual["metricKG"]
+    tabela[[col_fob, col_kg]] = tabela[[col_fob, col_kg]].fillna(0)
+
+    no_acumulado = mensal["monthNumber"] <= mes
+    ytd_atual = mensal[(mensal["year"] == ano) & no_acumulado].groupby("ncm")["metricFOB"].sum().reindex(tabela.index, fill_value=0)
+    ytd_ant = mensal[(mensal["year"] == ano_ant) & no_acumulado].groupby("ncm")["metricFOB"].sum().reindex(tabela.index, fill_value=0)
+    tabela[col_var] = np.where(ytd_ant > 0, (ytd_atual / ytd_ant.where(ytd_ant > 0) - 1) * 100, np.nan)
+    tabela[col_preco] = tabela[col_fob] / tabela[col_kg].where(tabela[col_kg] > 0)
+
+    if not paises.empty and "country" in paises.columns:
+        por_pais = paises.groupby(["ncm", "country"])["metricFOB"].sum()
+        principal = por_pais.loc[por_pais.groupby(level="ncm").idxmax()]
+        total = por_pais.groupby(level="ncm").sum()
+        com_importacao = total > 0
+        tabela["Principal Origem"] = pd.Series(principal.index.get_level_values("country"),
+                                               index=principal.index.get_level_values("ncm")).where(com_importacao)
+        participacao = pd.Series(principal.values, index=principal.index.get_level_values("ncm")) / total
+        tabela[col_part] = participacao.where(com_importacao) * 100
+    else:
+        tabela["Principal Origem"] = None
+        tabela[col_part] = np.nan
+
+    # Tendência: matriz NCM x mês dos últimos 12 meses, com zero nos meses sem registro
+    ultimo = ano * 12 + mes - 1
+    meses = range(ultimo - 11, ultimo + 1)
+    matriz = (mensal[mensal["periodo"].between(ultimo - 11, ultimo)]
+              .pivot_table(index="ncm", columns="periodo", values="metricKG", aggfunc="sum")
+              .reindex(index=tabela.index, columns=meses, fill_value=0).fillna(0))
+    tabela[col_tendencia] = matriz.values.tolist()
+
+    tabela = tabela.reset_index()
+    tabela.insert(0, "NCM", tabela.pop("ncm").map(lambda n: f"{n[:4]}.{n[4:6]}.{n[6:]}"))
+    return tabela.sort_values(col_fob, ascending=False, ignore_index=True), None